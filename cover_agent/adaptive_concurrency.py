@@ -0,0 +1,250 @@
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from cover_agent.custom_logger import CustomLogger
+
+# Commands starting one of these run a build tool: a JVM, dependency resolution and compilation per run
+HEAVY_COMMANDS = ("mvn", "mvnw", "mvnd", "gradle", "gradlew", "sbt", "bazel", "ant")
+
+HEAVY_POOL = "build_tool"
+LIGHT_POOL = "lightweight"
+# Build tool commands in the project checkout itself, which share its target/ or build/ directory
+CHECKOUT_POOL = "build_tool_checkout"
+
+
+def cpu_load() -> Optional[float]:
+    """The 1-minute load average per CPU, or None where the platform does not report it."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def available_memory_fraction() -> Optional[float]:
+    """The fraction of memory still available (MemAvailable / MemTotal), or None without /proc/meminfo."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            values = {}
+            for line in meminfo:
+                name, value = line.split(":", 1)
+                values[name] = int(value.split()[0])
+        return values["MemAvailable"] / values["MemTotal"]
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        return None
+
+
+class AdaptivePool:
+    """
+    A semaphore whose limit follows AIMD (additive increase, multiplicative decrease).
+
+    After every run the limit grows by 1 / limit, i.e. by one slot per limit runs, as long as the pool was
+    saturated and the machine is not congested. It is multiplied by decrease_factor when the CPU load or memory
+    pressure crosses its watermark, or when the smoothed run latency exceeds latency_tolerance times the fastest
+    it has been. Only runs started after the last decrease can decrease the limit again, so one congested
+    period is not punished once per run that overlapped it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        max_limit: int,
+        min_limit: int = 1,
+        adaptive: bool = True,
+        cpu_high_watermark: float = 0.9,
+        memory_low_watermark: float = 0.1,
+        latency_tolerance: float = 2.0,
+        decrease_factor: float = 0.5,
+        load_probe: Callable[[], Optional[float]] = cpu_load,
+        memory_probe: Callable[[], Optional[float]] = available_memory_fraction,
+        logger: Optional[CustomLogger] = None,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.adaptive = adaptive
+        self.cpu_high_watermark = cpu_high_watermark
+        self.memory_low_watermark = memory_low_watermark
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.load_probe = load_probe
+        self.memory_probe = memory_probe
+        self.logger = logger
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.increases = 0
+        self.decreases = 0
+        self.latency_ewma = None
+        self.fastest_latency_ewma = None
+        self._last_decrease = 0.0
+        self._started = {}
+        self._condition = asyncio.Condition()
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    async def acquire(self) -> float:
+        """Waits for a free slot. Returns the start time to hand back to release."""
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.in_flight < self.current_limit)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return time.monotonic()
+
+    async def release(self, started: float):
+        """Frees the slot taken at started and adapts the limit to what the run observed."""
+        async with self._condition:
+            saturated = self.in_flight >= self.current_limit or self.waiting > 0
+            self.in_flight -= 1
+            self.completed += 1
+            if self.adaptive:
+                self._adapt(time.monotonic() - started, started, saturated)
+            self._condition.notify_all()
+
+    async def __aenter__(self):
+        # Entered and exited by the same task, like asyncio.Semaphore
+        self._started[asyncio.current_task()] = await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release(self._started.pop(asyncio.current_task()))
+
+    def _congestion(self) -> Optional[str]:
+        load = self.load_probe() if self.load_probe else None
+        if load is not None and load > self.cpu_high_watermark:
+            return f"CPU load {load:.2f} per CPU"
+        memory = self.memory_probe() if self.memory_probe else None
+        if memory is not None and memory < self.memory_low_watermark:
+            return f"only {memory:.0%} of memory available"
+        if self.fastest_latency_ewma and self.latency_ewma > self.latency_tolerance * self.fastest_latency_ewma:
+            return f"runs take {self.latency_ewma:.1f}s against {self.fastest_latency_ewma:.1f}s at best"
+        return None
+
+    def _adapt(self, duration: float, started: float, saturated: bool):
+        self.latency_ewma = duration if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * duration
+        if self.fastest_latency_ewma is None or self.latency_ewma < self.fastest_latency_ewma:
+            self.fastest_latency_ewma = self.latency_ewma
+        congestion = self._congestion()
+
+        previous_limit = self.current_limit
+        if congestion:
+            if started >= self._last_decrease and self.limit > self.min_limit:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+        elif saturated and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.increases += 1
+
+        if self.logger and self.current_limit != previous_limit:
+            reason = f" ({congestion})" if congestion else ""
+            self.logger.info(
+                f"Concurrency of {self.name} test commands changed from {previous_limit} to {self.current_limit}{reason}."
+            )
+
+    def metrics(self) -> dict:
+        return {
+            "limit": self.current_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "latency_ewma_sec": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+        }
+
+
+class AdaptiveConcurrencyController:
+    """
+    Limits how many test commands run at once, with separate AIMD pools for build tool commands (Maven, Gradle,
+    ...) and lightweight ones (pytest, go test, ...), since a build tool run costs far more CPU and memory.
+
+    Used where a semaphore was passed before: pool_for(command) returns the pool to hold while the command runs.
+
+    Build tool runs in one checkout overwrite each other's compiled classes and reports, so the build tool pool
+    only grows past one run when validation runs candidates in workspaces of their own. Build tool runs in the
+    checkout then go through a separate pool of one run.
+    """
+
+    def __init__(self, pools: Dict[str, AdaptivePool], heavy_commands: Iterable[str] = HEAVY_COMMANDS):
+        self.pools = pools
+        self.heavy_commands = tuple(heavy_commands)
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: dict,
+        max_limit: Optional[int] = None,
+        logger: Optional[CustomLogger] = None,
+        isolated_builds: bool = False,
+    ) -> "AdaptiveConcurrencyController":
+        """
+        Builds the controller from the [concurrency] settings.
+
+        Args:
+            settings (dict): The [concurrency] settings.
+            max_limit (int, optional): Caps the limits of both pools, e.g. to 1 when concurrent runs would share
+                one coverage report.
+            logger (CustomLogger, optional): Logs every change of a pool's limit.
+            isolated_builds (bool): Whether build tool commands can run in validation workspaces, each with its
+                own build directory. Otherwise the build tool pool is capped at one run.
+        """
+        cpus = os.cpu_count() or 1
+        pools = {}
+        for name, prefix, default_initial, default_max in ((HEAVY_POOL, "heavy", 1, 4), (LIGHT_POOL, "light", 2, cpus)):
+            pool_max = settings.get(f"{prefix}_max_limit", default_max) or cpus
+            if max_limit is not None:
+                pool_max = min(pool_max, max_limit)
+            if name == HEAVY_POOL and not isolated_builds:
+                pool_max = 1
+            pools[name] = AdaptivePool(
+                name,
+                initial_limit=settings.get(f"{prefix}_initial_limit", default_initial),
+                max_limit=pool_max,
+                adaptive=settings.get("adaptive", True),
+                cpu_high_watermark=settings.get("cpu_high_watermark", 0.9),
+                memory_low_watermark=settings.get("memory_low_watermark", 0.1),
+                latency_tolerance=settings.get("latency_tolerance", 2.0),
+                decrease_factor=settings.get("decrease_factor", 0.5),
+                logger=logger,
+            )
+        if isolated_builds:
+            pools[CHECKOUT_POOL] = AdaptivePool(
+                CHECKOUT_POOL, initial_limit=1, max_limit=1, adaptive=False, logger=logger
+            )
+        return cls(pools, settings.get("heavy_commands", HEAVY_COMMANDS))
+
+    def is_heavy(self, command: str) -> bool:
+        """Whether the command runs a build tool, e.g. "touch Test.java && ./mvnw test"."""
+        return any(os.path.basename(token) in self.heavy_commands for token in command.split())
+
+    def pool_for(self, command: str, isolated: bool = False) -> AdaptivePool:
+        """
+        The pool to hold while the command runs.
+
+        Args:
+            command (str): The test command.
+            isolated (bool): Whether the command runs in a validation workspace rather than the project checkout.
+        """
+        if not self.is_heavy(command):
+            return self.pools[LIGHT_POOL]
+        if not isolated and CHECKOUT_POOL in self.pools:
+            return self.pools[CHECKOUT_POOL]
+        return self.pools[HEAVY_POOL]
+
+    def metrics(self) -> Dict[str, dict]:
+        """The current limit, load and adaptation counters of each pool."""
+        return {name: pool.metrics() for name, pool in self.pools.items()}
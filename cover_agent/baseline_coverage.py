@@ -0,0 +1,208 @@
+import os
+from typing import Dict, Optional, Tuple
+
+from cover_agent.adaptive_concurrency import AdaptiveConcurrencyController
+from cover_agent.coverage_contexts import (
+    best_matching_paths,
+    context_matches_test_file,
+    context_test_id,
+    is_coverage_py_data_file,
+    read_coverage_py_contexts,
+    read_lcov_test_names,
+)
+from cover_agent.coverage_processor import CoverageProcessor
+from cover_agent.custom_logger import CustomLogger
+from cover_agent.line_coverage import LineCoverage
+from cover_agent.runner import Runner
+from cover_agent.settings.config_loader import get_settings
+
+# Formats whose reports are parsed per source class rather than per file, so no whole-report index is built
+PER_CLASS_FORMATS = ("jacoco", "jacoco_xml", "jacoco_csv")
+
+
+class BaselineCoverage:
+    """
+    Coverage of the whole test suite from a single run, shared by every agent of a full-repo run.
+
+    The suite runs once and its report is parsed once into a per-file index. Each agent is handed the slice for
+    its source file instead of running the suite itself. Agents whose test command is narrowed to their own test
+    file need the coverage of that file's tests only, which is taken from the per-test contexts of the run
+    (coverage.py dynamic contexts or LCOV TN: records). Without those, slice_for returns None and the agent
+    runs its own baseline.
+    """
+
+    def __init__(
+        self,
+        test_command: str,
+        test_command_dir: str,
+        code_coverage_report_path: str,
+        coverage_type: str,
+        max_run_time_sec: Optional[int] = None,
+        contexts_path: Optional[str] = None,
+        execution_data_path: Optional[str] = None,
+        logger: Optional[CustomLogger] = None,
+        generate_log_files: bool = True,
+    ):
+        """
+        Args:
+            test_command (str): The command running the whole test suite with coverage.
+            test_command_dir (str): The directory to run the command in. Relative report paths are resolved
+                against it.
+            code_coverage_report_path (str): The coverage report written by the command.
+            coverage_type (str): The type of the coverage report.
+            max_run_time_sec (int, optional): Time limit of the suite run.
+            contexts_path (str, optional): A coverage.py data file recorded with per-test contexts.
+            execution_data_path (str, optional): The JaCoCo .exec file written by the command.
+            logger (CustomLogger, optional): The logger object for logging messages.
+            generate_log_files (bool): Whether or not to generate logs.
+        """
+        self.test_command = test_command
+        self.test_command_dir = test_command_dir
+        self.code_coverage_report_path = os.path.join(test_command_dir, str(code_coverage_report_path))
+        self.coverage_type = coverage_type.value if hasattr(coverage_type, "value") else coverage_type
+        self.max_run_time_sec = max_run_time_sec
+        self.contexts_path = os.path.join(test_command_dir, contexts_path) if contexts_path else None
+        self.execution_data_path = (
+            os.path.join(test_command_dir, str(execution_data_path)) if execution_data_path else None
+        )
+        self.generate_log_files = generate_log_files
+        self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
+        self.available = False
+        self.report_index = None
+        self._source_slices = {}
+        self._test_contexts = {}
+
+    async def run(self, semaphore=None) -> bool:
+        """
+        Runs the test suite once and verifies that it wrote the coverage report.
+
+        Args:
+            semaphore (asyncio.Semaphore | AdaptiveConcurrencyController, optional): Held while the suite runs.
+
+        Returns:
+            bool: True if the baseline can be handed to agents. On failure the agents run their own baselines.
+        """
+        self.logger.info(f'Running the test suite once for the shared baseline coverage: "{self.test_command}"')
+        test_settings = get_settings().get("tests", {})
+        if isinstance(semaphore, AdaptiveConcurrencyController):
+            semaphore = semaphore.pool_for(self.test_command)
+        stdout, stderr, exit_code, time_of_test_command = await Runner.async_run_command(
+            command=self.test_command,
+            cwd=self.test_command_dir,
+            max_run_time_sec=self.max_run_time_sec,
+            semaphore=semaphore,
+            logger=self.logger,
+            memory_limit_mb=test_settings.get("memory_limit_mb", 0) or None,
+            cpu_limit_sec=test_settings.get("cpu_limit_sec", 0) or None,
+            max_output_bytes=test_settings.get("max_output_bytes", 0) or None,
+        )
+        if exit_code != 0:
+            self.logger.warning(
+                f"Shared baseline run failed with exit code {exit_code}, each test file runs its own baseline.\n"
+                f"Stdout:\n{stdout}\nStderr:\n{stderr}"
+            )
+            return False
+        try:
+            self._processor("").verify_report_update(time_of_test_command)
+        except AssertionError as e:
+            self.logger.warning(f"Shared baseline run did not write its coverage report: {e}")
+            return False
+
+        self.available = True
+        return True
+
+    def _processor(self, src_file_path: str, use_report_coverage_feature_flag: bool = False) -> CoverageProcessor:
+        return CoverageProcessor(
+            file_path=self.code_coverage_report_path,
+            src_file_path=src_file_path,
+            coverage_type=self.coverage_type,
+            test_command_dir=self.test_command_dir,
+            use_report_coverage_feature_flag=use_report_coverage_feature_flag,
+            execution_data_path=self.execution_data_path,
+            streaming=True,
+            logger=self.logger,
+            generate_log_files=self.generate_log_files,
+        )
+
+    def _report_format_name(self) -> Optional[str]:
+        report_format = self._processor("").resolve_report_format()
+        return report_format.name if report_format else None
+
+    def _get_report_index(self) -> Optional[Dict[str, tuple]]:
+        """
+        Parses the whole report once into report path -> (covered, missed, percentage). None for formats that
+        are parsed per source class.
+        """
+        if self.report_index is None:
+            if self._report_format_name() in PER_CLASS_FORMATS:
+                return None
+            self.report_index = self._processor("", use_report_coverage_feature_flag=True).parse_coverage_report()
+        return self.report_index
+
+    def _source_slice(self, src_file_path: str) -> Optional[Tuple[LineCoverage, LineCoverage, float]]:
+        """The whole suite's covered and missed lines of a source file, or None if the report does not list it."""
+        if src_file_path in self._source_slices:
+            return self._source_slices[src_file_path]
+
+        index = self._get_report_index()
+        if index is None:
+            try:
+                result = self._processor(src_file_path).parse_coverage_report()
+            except (ValueError, FileNotFoundError) as e:
+                self.logger.warning(f"Could not read the shared baseline coverage of {src_file_path}: {e}")
+                result = None
+        else:
+            paths = best_matching_paths(index, src_file_path)
+            if paths:
+                covered, missed = LineCoverage(), LineCoverage()
+                for path in paths:
+                    covered, missed = covered | index[path][0], missed | index[path][1]
+                result = CoverageProcessor._summarize_lines(covered, missed)
+            else:
+                result = None
+        self._source_slices[src_file_path] = result
+        return result
+
+    def _contexts_for_source(self, src_file_path: str) -> Dict[str, LineCoverage]:
+        """The lines of the source file covered by each test of the run, by full test id."""
+        if src_file_path not in self._test_contexts:
+            if self.contexts_path and is_coverage_py_data_file(self.contexts_path):
+                contexts = read_coverage_py_contexts(self.contexts_path, src_file_path, key=context_test_id)
+            elif self._report_format_name() == "lcov":
+                contexts = read_lcov_test_names(self.code_coverage_report_path, src_file_path, key=context_test_id)
+            else:
+                contexts = {}
+            self._test_contexts[src_file_path] = contexts
+        return self._test_contexts[src_file_path]
+
+    def slice_for(
+        self, src_file_path: str, test_file_path: Optional[str] = None
+    ) -> Optional[Tuple[LineCoverage, LineCoverage, float]]:
+        """
+        Returns the baseline coverage of a source file.
+
+        Args:
+            src_file_path (str): The source file.
+            test_file_path (str, optional): Only count the lines covered by the tests in this file, for agents
+                whose test command runs this file alone.
+
+        Returns:
+            Tuple[LineCoverage, LineCoverage, float]: The covered and missed lines and the coverage percentage, or
+            None if the shared run cannot provide them and the agent has to run its own baseline.
+        """
+        if not self.available:
+            return None
+        whole_suite = self._source_slice(src_file_path)
+        if whole_suite is None or test_file_path is None:
+            return whole_suite
+
+        contexts = self._contexts_for_source(src_file_path)
+        if not contexts:
+            return None
+        covered = LineCoverage()
+        for context, lines in contexts.items():
+            if context_matches_test_file(context, test_file_path):
+                covered = covered | lines
+        measured_lines = whole_suite[0] | whole_suite[1]
+        covered = covered & measured_lines
+        return CoverageProcessor._summarize_lines(covered, measured_lines - covered)
@@ -1,10 +1,18 @@
 import os
+import shlex
 import shutil
 import platform
 from pathlib import Path
 
 from abc import ABC, abstractmethod
 from cover_agent.lsp_logic.utils.utils import is_forbidden_directory
+from cover_agent.runner import Runner
+from cover_agent.settings.config_loader import get_settings
+
+# Time allowed for starting or stopping a build daemon
+DAEMON_COMMAND_TIMEOUT_SEC = 600
+# Output directory name of the shared baseline run of the whole suite
+BASELINE_OUTPUT_NAME = "cover-agent-baseline"
 
 class BuiltToolAdapterABC(ABC):
     '''
@@ -22,6 +30,28 @@ class BuiltToolAdapterABC(ABC):
     def get_coverage_path(self, test_file_relative_path: str) -> Path:
         pass
 
+    def get_execution_data_path(self, test_file_relative_path: str):
+        '''
+        Path of the raw coverage data (e.g. a JaCoCo .exec file) written next to the coverage report, if any.
+        '''
+        return None
+
+    def adapt_baseline_command(self):
+        '''
+        Adapts the general test command to run the whole test suite once, writing its coverage to
+        get_baseline_coverage_path. None if the general test command can be run as is.
+        '''
+        return None
+
+    def get_baseline_coverage_path(self):
+        '''
+        Path of the coverage report written by the baseline command, if it differs from the configured report.
+        '''
+        return None
+
+    def get_baseline_execution_data_path(self):
+        return None
+
     @abstractmethod
     def prepare_environment(self):
         '''
@@ -38,18 +68,19 @@ class MavenAdapter(BuiltToolAdapterABC):
     An adapter to adapt command line argument for maven.
     '''
 
-    def __init__(self, repo_test_command: str, project_root: str):
+    MAVEN_EXECUTABLES = ("mvn", "mvnw", "mvn.cmd", "mvnw.cmd")
+
+    def __init__(self, repo_test_command: str, project_root: str, use_daemon: bool = False):
         self.backup_path = Path('pom.xml.bak')
         self.repo_test_command= repo_test_command
         self.project_root = Path(project_root)
         self.output_directory_variable = "custom.outputDirectory"
         self.default_output_path = Path("target") / Path("vCover")
+        # Run through mvnd, which keeps a warm JVM with the loaded project model between test runs
+        self.use_daemon = use_daemon
+        self.daemon_executable = None
 
-    def adapt_test_command(self, test_file_relative_path: str) -> str:
-        file_name = os.path.basename(test_file_relative_path)
-        class_name = os.path.splitext(file_name)[0]
-        test_file_relative_path = Path(test_file_relative_path)
-
+    def _repo_args(self) -> list:
         # Remove existing -Dtest arguments
         args = self.repo_test_command.split()
         new_args = []
@@ -59,6 +90,24 @@ class MavenAdapter(BuiltToolAdapterABC):
                 continue
             new_args.append(arg)
 
+        if self.daemon_executable and new_args and os.path.basename(new_args[0]) in self.MAVEN_EXECUTABLES:
+            new_args[0] = self.daemon_executable
+        return new_args
+
+    def _output_args(self, name: str) -> list:
+        execution_data_path = self.default_output_path / Path(f'jacoco-{name}.exec')
+        return [
+            f"-Djacoco.destFile={execution_data_path}",
+            f"-Djacoco.dataFile={execution_data_path}",
+            f"-D{self.output_directory_variable}={self.default_output_path / Path(name)}",
+        ]
+
+    def adapt_test_command(self, test_file_relative_path: str) -> str:
+        file_name = os.path.basename(test_file_relative_path)
+        class_name = os.path.splitext(file_name)[0]
+        test_file_relative_path = Path(test_file_relative_path)
+        new_args = self._repo_args()
+
         # touch to modify file time so that maven recompiles file
         if platform.system() == "Windows":
             new_args.insert(0, f"(Get-Item {test_file_relative_path.resolve()}).LastWriteTime = Get-Date")
@@ -67,9 +116,10 @@ class MavenAdapter(BuiltToolAdapterABC):
         new_args.insert(1, "&&")
             
         new_args.append(f"-Dtest={class_name}")
-        new_args.append(f"-Djacoco.destFile={self.default_output_path / Path(f'jacoco-{class_name}.exec')}")
-        new_args.append(f"-Djacoco.dataFile={self.default_output_path / Path(f'jacoco-{class_name}.exec')}")
-        new_args.append(f"-D{self.output_directory_variable}={self.default_output_path / Path(class_name)}")
+        new_args.extend(self._output_args(class_name))
+        # Only recompile stale sources, i.e. the touched test class, instead of the whole module. The
+        # compiler plugin's "incremental" mode recompiles every source once it detects any change.
+        new_args.append("-Dmaven.compiler.useIncrementalCompilation=false")
         # TODO: maybe split this part out? so adapt_test_command only adapt maven command to run single test?
         return " ".join(new_args)
 
@@ -78,8 +128,41 @@ class MavenAdapter(BuiltToolAdapterABC):
         class_name = os.path.splitext(file_name)[0]
         return self.default_output_path / Path(class_name) / Path("jacoco.xml")
 
+    def get_execution_data_path(self, test_file_relative_path: str):
+        file_name = os.path.basename(test_file_relative_path)
+        class_name = os.path.splitext(file_name)[0]
+        return self.default_output_path / Path(f'jacoco-{class_name}.exec')
+
+    def adapt_baseline_command(self) -> str:
+        return " ".join(self._repo_args() + self._output_args(BASELINE_OUTPUT_NAME))
+
+    def get_baseline_coverage_path(self):
+        return self.default_output_path / Path(BASELINE_OUTPUT_NAME) / Path("jacoco.xml")
+
+    def get_baseline_execution_data_path(self):
+        return self.default_output_path / Path(f'jacoco-{BASELINE_OUTPUT_NAME}.exec')
+
     def prepare_environment(self):
         self._edit_pom()
+        if self.use_daemon:
+            self._start_daemon()
+
+    def _start_daemon(self):
+        """
+        Starts an mvnd daemon for the project, so the first test run does not pay for JVM start-up and loading
+        the project model. Test commands keep using mvn when mvnd is not installed or does not start.
+        """
+        executable = shutil.which("mvnd")
+        if executable is None:
+            print("Warning: mvnd was not found on the PATH, running tests with mvn.")
+            return
+        _, stderr, exit_code, _ = Runner.run_command(
+            f"{executable} -q validate", max_run_time_sec=DAEMON_COMMAND_TIMEOUT_SEC, cwd=str(self.project_root)
+        )
+        if exit_code != 0:
+            print(f"Warning: mvnd could not load the project, running tests with mvn: {stderr}")
+            return
+        self.daemon_executable = executable
 
     def _edit_pom(self):
         import xml.etree.ElementTree as ET
@@ -143,23 +226,142 @@ class MavenAdapter(BuiltToolAdapterABC):
         shutil.move(absolute_bak_path, absolute_pom_path)
         if self.default_output_path.exists():
             shutil.rmtree(self.default_output_path, ignore_errors=True)
+        if self.daemon_executable:
+            Runner.run_command(
+                f"{self.daemon_executable} --stop", max_run_time_sec=DAEMON_COMMAND_TIMEOUT_SEC, cwd=str(self.project_root)
+            )
+            self.daemon_executable = None
 
 class GradleAdapter(BuiltToolAdapterABC):
     '''
     An adapter to adapt command line argument for gradle.
+
+    Each test class writes its JaCoCo execution data and XML report to its own directory under build/vCover,
+    set up by an init script, so that test files processed concurrently do not overwrite each other's coverage.
+    Gradle compiles test sources incrementally, so a run only recompiles the changed test class.
     '''
 
-    def __init__(self):
-        pass
+    INIT_SCRIPT_NAME = "cover-agent.init.gradle"
+    OUTPUT_PROPERTY = "coverAgentOutput"
+    INIT_SCRIPT = '''allprojects {
+    plugins.withId("jacoco") {
+        def output = findProperty("%(property)s")
+        if (output != null) {
+            def outputDir = rootProject.file(output)
+            tasks.withType(Test).configureEach {
+                extensions.getByType(JacocoTaskExtension).destinationFile = new File(outputDir, "jacoco.exec")
+            }
+            tasks.withType(JacocoReport).configureEach {
+                executionData.setFrom(new File(outputDir, "jacoco.exec"))
+                reports.xml.required.set(true)
+                reports.xml.outputLocation.set(new File(outputDir, "jacoco.xml"))
+            }
+        }
+    }
+}
+'''
+
+    def __init__(self, repo_test_command: str, project_root: str, use_daemon: bool = False, offline: bool = True):
+        self.repo_test_command = repo_test_command
+        self.project_root = Path(project_root)
+        self.default_output_path = Path("build") / Path("vCover")
+        self.init_script_path = self.project_root / self.INIT_SCRIPT_NAME
+        # Keep a Gradle daemon with the configuration cache between test runs, optionally without network access
+        self.use_daemon = use_daemon
+        self.offline = offline
+        self.daemon_started = False
+
+    def _adapt_command(self, output_name: str, class_name: str = None) -> str:
+        # Remove existing test filters, output directories and daemon arguments
+        args = self.repo_test_command.split()
+        new_args = []
+        skip_value = False
+        for arg in args:
+            if skip_value:
+                skip_value = False
+                continue
+            if arg in ("--tests", "--init-script", "-I"):
+                skip_value = True
+                continue
+            if arg.startswith("--tests=") or arg.startswith("--init-script=") or arg.startswith(f"-P{self.OUTPUT_PROPERTY}="):
+                continue
+            if self.use_daemon and arg in ("--no-daemon", "--daemon", "--configuration-cache", "--no-configuration-cache", "--offline"):
+                continue
+            new_args.append(arg)
 
-    def adapt_test_command(self, command, test_file):
-        return None
+        if not any(arg.endswith("jacocoTestReport") for arg in new_args):
+            new_args.append("jacocoTestReport")
+        # The command runs in a shell, the project path and the test file name may hold spaces or metacharacters
+        if class_name:
+            new_args.append(f"--tests {shlex.quote(class_name)}")
+        new_args.append(f"--init-script {shlex.quote(str(self.init_script_path.resolve()))}")
+        new_args.append(shlex.quote(f"-P{self.OUTPUT_PROPERTY}={self.default_output_path / Path(output_name)}"))
+        if self.use_daemon:
+            new_args.append("--daemon")
+            new_args.append("--configuration-cache")
+            if self.offline:
+                new_args.append("--offline")
+        return " ".join(new_args)
 
-    def prepare_environment(self, command: str, project_root: str, unique_id: int):
-        pass
+    def adapt_test_command(self, test_file_relative_path: str) -> str:
+        file_name = os.path.basename(test_file_relative_path)
+        class_name = os.path.splitext(file_name)[0]
+        return self._adapt_command(class_name, class_name)
+
+    def adapt_baseline_command(self) -> str:
+        return self._adapt_command(BASELINE_OUTPUT_NAME)
+
+    def get_baseline_coverage_path(self):
+        return self.default_output_path / Path(BASELINE_OUTPUT_NAME) / Path("jacoco.xml")
+
+    def get_baseline_execution_data_path(self):
+        return self.default_output_path / Path(BASELINE_OUTPUT_NAME) / Path("jacoco.exec")
+
+    def get_coverage_path(self, test_file_relative_path: str):
+        file_name = os.path.basename(test_file_relative_path)
+        class_name = os.path.splitext(file_name)[0]
+        return self.default_output_path / Path(class_name) / Path("jacoco.xml")
+
+    def get_execution_data_path(self, test_file_relative_path: str):
+        file_name = os.path.basename(test_file_relative_path)
+        class_name = os.path.splitext(file_name)[0]
+        return self.default_output_path / Path(class_name) / Path("jacoco.exec")
+
+    def _gradle_executable(self) -> str:
+        args = self.repo_test_command.split()
+        return args[0] if args else "gradle"
+
+    def prepare_environment(self):
+        self.init_script_path.write_text(self.INIT_SCRIPT % {"property": self.OUTPUT_PROPERTY})
+        if self.use_daemon:
+            self._start_daemon()
+
+    def _start_daemon(self):
+        '''
+        Starts the Gradle daemon and configures the build once, so the first test run does not pay for it.
+        '''
+        offline = " --offline" if self.offline else ""
+        _, stderr, exit_code, _ = Runner.run_command(
+            f"{self._gradle_executable()} help --daemon -q{offline}",
+            max_run_time_sec=DAEMON_COMMAND_TIMEOUT_SEC,
+            cwd=str(self.project_root),
+        )
+        if exit_code != 0:
+            print(f"Warning: the Gradle daemon could not configure the project: {stderr}")
+            return
+        self.daemon_started = True
 
     def cleanup_environment(self):
-        pass
+        if self.init_script_path.exists():
+            self.init_script_path.unlink()
+        output_path = self.project_root / self.default_output_path
+        if output_path.exists():
+            shutil.rmtree(output_path, ignore_errors=True)
+        if self.daemon_started:
+            Runner.run_command(
+                f"{self._gradle_executable()} --stop", max_run_time_sec=DAEMON_COMMAND_TIMEOUT_SEC, cwd=str(self.project_root)
+            )
+            self.daemon_started = False
 
 class PytestAdapter(BuiltToolAdapterABC):
     '''
@@ -180,11 +382,17 @@ class PytestAdapter(BuiltToolAdapterABC):
 
 # add in support for other built tool here if needed
 def get_built_tool_adapter(command: str, project_root: str, language: str) -> BuiltToolAdapterABC:
+    build_tool_settings = get_settings().get("build_tool", {})
     for dirpath, dirnames, filenames in os.walk(project_root):
         if not is_forbidden_directory(project_root.__add__(os.sep), language):
             if "pom.xml" in filenames or "mvn" in command:
-                return MavenAdapter(command, project_root)
+                return MavenAdapter(command, project_root, use_daemon=build_tool_settings.get("maven_daemon", False))
             elif "build.gradle" in filenames or "gradle" in command:
-                return GradleAdapter()
+                return GradleAdapter(
+                    command,
+                    project_root,
+                    use_daemon=build_tool_settings.get("gradle_daemon", False),
+                    offline=build_tool_settings.get("gradle_offline", True),
+                )
             elif "pytest.ini" in filenames or "pytest" in command: 
                 return PytestAdapter()
@@ -1,5 +1,6 @@
 import datetime
 import os
+import re
 import shutil
 import sys
 import asyncio
@@ -11,9 +12,13 @@ import wandb
 from cover_agent.agent_completion_abc import AgentCompletionABC
 from cover_agent.ai_caller import AICaller
 from cover_agent.ai_caller_replay import AICallerReplay
+from cover_agent.baseline_coverage import BaselineCoverage
 from cover_agent.custom_logger import CustomLogger
 from cover_agent.default_agent_completion import DefaultAgentCompletion
+from cover_agent.line_coverage import LineCoverage
 from cover_agent.record_replay_manager import RecordReplayManager
+from cover_agent.run_journal import RunJournal
+from cover_agent.settings.config_loader import get_settings
 from cover_agent.settings.config_schema import CoverAgentConfig
 from cover_agent.unit_test_db import UnitTestDB
 from cover_agent.unit_test_generator import UnitTestGenerator
@@ -23,6 +28,39 @@ from cover_agent.build_tool_adapter import *
 from cover_agent.lsp_logic.utils.utils_adapt_command import adapt_test_command
 
 
+def _normalize_code(code: str) -> str:
+    return " ".join(code.split())
+
+
+class GenerationPrefetch:
+    """
+    The next batch of tests, requested from the coverage of the current iteration while its tests are validated,
+    so the LLM call overlaps the test runs instead of following them.
+    """
+
+    def __init__(self, agent: "CoverAgent", failed_test_runs, language, test_framework, coverage_report):
+        self.agent = agent
+        self.snapshot = (list(failed_test_runs), language, test_framework, coverage_report)
+        self.missed_lines = LineCoverage.coerce(agent.test_validator.last_lines_missed)
+        self.in_flight_tests = []
+        self.task = None
+
+    def start(self, generated_tests_dict):
+        """Requests the next batch once the current one is generated, asking for tests other than those."""
+        if isinstance(generated_tests_dict, dict):
+            self.in_flight_tests = [test for test in generated_tests_dict.get("new_tests", []) if isinstance(test, dict)]
+        self.task = asyncio.create_task(self.agent.generate_tests(*self.snapshot, in_flight_tests=self.in_flight_tests))
+
+    async def result(self) -> tuple:
+        if self.task is None:
+            raise RuntimeError("The current batch was never generated")
+        return await self.task
+
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+
+
 class CoverAgent:
     """
     A class that manages the generation and validation of unit tests to achieve desired code coverage.
@@ -38,6 +76,8 @@ class CoverAgent:
         agent_completion: AgentCompletionABC = None,
         built_tool_adapter: Optional[BuiltToolAdapterABC] = None,
         logger: Optional[CustomLogger] = None,
+        baseline_coverage: Optional[BaselineCoverage] = None,
+        run_journal: Optional[RunJournal] = None,
     ):
         """
         Initialize the CoverAgent instance.
@@ -50,6 +90,10 @@ class CoverAgent:
                 in which case method calls will fall back to default value
             logger (Optional[CustomLogger], optional): Custom logger instance. Defaults to None,
                 in which case a default logger is created.
+            baseline_coverage (BaselineCoverage, optional): A shared run of the whole suite to take the initial
+                coverage from instead of running the test command. Defaults to None.
+            run_journal (RunJournal, optional): The journal of a full-repo run, which every finished iteration is
+                recorded in. Defaults to None.
 
         Attributes:
             logger (CustomLogger): Logger instance for logging messages.
@@ -59,6 +103,9 @@ class CoverAgent:
         self.config = config
         self.generate_log_files = not config.suppress_log_files
         self.adapter = built_tool_adapter
+        self.baseline_coverage = baseline_coverage
+        self.run_journal = run_journal
+        self._journaled_tokens = (0, 0)
         self.task_id = task_id
         self.total_input_token_count = 0
         self.total_output_token_count = 0
@@ -66,6 +113,10 @@ class CoverAgent:
         self.generated_tests_per_iteration = []
         self.accepted_tests_per_iteration = []
 
+        generation_settings = get_settings().get("generation", {})
+        self.prefetch_generation = generation_settings.get("prefetch", False)
+        self.stale_coverage_fraction = generation_settings.get("stale_coverage_fraction", 0.5)
+
         # Initialize logger with file generation flag
         self.logger = logger or CustomLogger.get_logger(__name__, task_id, os.path.basename(config.test_file_path), generate_log_files=self.generate_log_files)
         if config.suppress_log_files:
@@ -164,8 +215,17 @@ class CoverAgent:
             generate_log_files=self.generate_log_files,
             task_id=self.task_id,
             semaphore=self.semaphore,
+            execution_data_path=self.adapter.get_execution_data_path(test_file_relative_path) if self.adapter else None,
         )
 
+        if self.baseline_coverage is not None:
+            # A command narrowed to this test file only counts the coverage of this file's tests
+            baseline = self.baseline_coverage.slice_for(
+                self.config.source_file_path, self.config.test_file_path if new_command_line else None
+            )
+            if self.test_validator.seed_baseline_coverage(baseline):
+                self.logger.info("Using the shared baseline coverage instead of an initial test run.")
+
 
     @classmethod
     async def create(
@@ -176,11 +236,13 @@ class CoverAgent:
         built_tool_adapter: Optional[BuiltToolAdapterABC] = None,
         semaphore: asyncio.Semaphore = None,
         logger: Optional[CustomLogger] = None,
+        baseline_coverage: Optional[BaselineCoverage] = None,
+        run_journal: Optional[RunJournal] = None,
     ):
         '''
         factory method to hanlde two phase __init__ method and async _setup method
         '''
-        cover_agent = cls(config, task_id, agent_completion, built_tool_adapter, logger)
+        cover_agent = cls(config, task_id, agent_completion, built_tool_adapter, logger, baseline_coverage, run_journal)
         await cover_agent._setup(semaphore)
         return cover_agent
 
@@ -297,7 +359,28 @@ class CoverAgent:
 
         return failed_test_runs, language, test_framework, coverage_report
 
-    async def generate_and_validate_tests(self, failed_test_runs, language, test_framework, coverage_report):
+    async def generate_tests(self, failed_test_runs, language, test_framework, coverage_report, in_flight_tests=None):
+        """
+        Generate new tests.
+
+        Parameters:
+            failed_test_runs (list): Previously failed test executions
+            language (str): Detected programming language
+            test_framework (str): Identified testing framework
+            coverage_report (dict): Current coverage metrics
+            in_flight_tests (list, optional): Tests still being validated, which the new tests should not repeat
+
+        Returns:
+            tuple: The generated tests and the prompt they were generated from.
+        """
+        generated_tests_dict = await self.test_gen.generate_tests(
+            failed_test_runs, language, test_framework, coverage_report, in_flight_tests=in_flight_tests
+        )
+        return generated_tests_dict, self.test_gen.prompt
+
+    async def generate_and_validate_tests(
+        self, failed_test_runs, language, test_framework, coverage_report, generation=None, on_generated=None
+    ):
         """
         Generate new tests and validate their effectiveness.
 
@@ -306,18 +389,23 @@ class CoverAgent:
             language (str): Detected programming language
             test_framework (str): Identified testing framework
             coverage_report (dict): Current coverage metrics
+            generation (tuple, optional): Tests generated ahead of time with their prompt, validated instead of
+                generating new ones
+            on_generated (callable, optional): Called with the generated tests before they are validated
         """
         self.log_coverage()
         self.logger.info("Starting test generation and validation.")
-        generated_tests_dict = await self.test_gen.generate_tests(failed_test_runs, language, test_framework, coverage_report)
+        if generation is None:
+            generation = await self.generate_tests(failed_test_runs, language, test_framework, coverage_report)
+        generated_tests_dict, prompt = generation
+        if on_generated:
+            on_generated(generated_tests_dict)
 
         num_generated_tests_dict = len(generated_tests_dict.get("new_tests", []))
         self.generated_tests_per_iteration.append(num_generated_tests_dict)
 
         try:
-            test_results = [
-                await self.test_validator.validate_test(test) for test in generated_tests_dict.get("new_tests", [])
-            ]
+            test_results = await self.test_validator.validate_tests(generated_tests_dict.get("new_tests", []))
 
             num_accepted = sum(1 for r in test_results if r.get("status") == "PASS")
             self.accepted_tests_per_iteration.append(num_accepted)
@@ -325,12 +413,58 @@ class CoverAgent:
             # Insert results into database
             if self.has_test_db():
                 for result in test_results:
-                    result["prompt"] = self.test_gen.prompt
+                    result["prompt"] = prompt
                     self.test_db.insert_attempt(result)
 
         except AttributeError as e:
             self.logger.error(f"Failed to validate the tests within {generated_tests_dict}. Error: {e}")
 
+    async def take_prefetched_generation(self, prefetch: "GenerationPrefetch") -> Optional[tuple]:
+        """
+        Waits for the tests prefetched during the last iteration and drops those the iteration made stale.
+
+        A prefetched test is stale when it repeats a test of the last iteration or one already in the test file.
+        The whole batch is stale when the accepted tests covered at least stale_coverage_fraction of the lines
+        that were missed when it was requested, since the batch targeted those lines.
+
+        Returns:
+            tuple: The remaining tests and their prompt, or None to generate the next batch from the new coverage.
+        """
+        try:
+            generated_tests_dict, prompt = await prefetch.result()
+        except Exception as e:
+            self.logger.error(f"Prefetched test generation failed: {e}")
+            return None
+        if not isinstance(generated_tests_dict, dict):
+            return None
+
+        missed_lines = prefetch.missed_lines
+        newly_covered = LineCoverage.coerce(self.test_validator.verified_lines_covered) & missed_lines
+        if missed_lines and len(newly_covered) >= self.stale_coverage_fraction * len(missed_lines):
+            self.logger.info(
+                f"Discarding prefetched tests: {len(newly_covered)} of the {len(missed_lines)} lines they targeted "
+                f"are covered now."
+            )
+            return None
+
+        validated_code = {_normalize_code(test.get("test_code", "")) for test in prefetch.in_flight_tests}
+        validated_names = {test.get("test_name") for test in prefetch.in_flight_tests}
+        test_file_content = self.test_validator.test_file.content
+        fresh_tests = []
+        for test in generated_tests_dict.get("new_tests", []):
+            name = test.get("test_name") or ""
+            if _normalize_code(test.get("test_code", "")) in validated_code or name in validated_names:
+                continue
+            if name and re.search(rf"\b{re.escape(name)}\b", test_file_content):
+                continue
+            fresh_tests.append(test)
+
+        if not fresh_tests:
+            self.logger.info("Discarding prefetched tests: all of them repeat earlier tests.")
+            return None
+        self.logger.info(f"Using {len(fresh_tests)} prefetched tests for the next iteration.")
+        return {**generated_tests_dict, "new_tests": fresh_tests}, prompt
+
     def has_test_db(self) -> bool:
         """
         Check if the test database is initialized.
@@ -352,8 +486,43 @@ class CoverAgent:
         failed_runs, lang, framework, report = await self.test_validator.get_coverage()
         self.logger.info("Coverage for new iteration obtained.")
         target_reached = self.test_validator.current_coverage >= (self.test_validator.desired_coverage / 100)
+        if self.run_journal is not None:
+            self.journal_iteration(target_reached)
         return failed_runs, lang, framework, report, target_reached
 
+    def token_counts(self) -> (int, int):
+        """The input and output tokens used so far by the test generator, the validator and the agent itself."""
+        return (
+            self.test_gen.total_input_token_count
+            + self.test_validator.total_input_token_count
+            + self.total_input_token_count,
+            self.test_gen.total_output_token_count
+            + self.test_validator.total_output_token_count
+            + self.total_output_token_count,
+        )
+
+    def journal_iteration(self, target_reached: bool):
+        """Records the iteration just finished in the run journal, with the tokens used since the last one."""
+        input_tokens, output_tokens = self.token_counts()
+        journaled_input, journaled_output = self._journaled_tokens
+        self._journaled_tokens = (input_tokens, output_tokens)
+        generated = self.generated_tests_per_iteration[-1] if self.generated_tests_per_iteration else 0
+        # Validation that failed midway left no accepted count for this iteration
+        accepted = (
+            self.accepted_tests_per_iteration[-1]
+            if len(self.accepted_tests_per_iteration) == len(self.generated_tests_per_iteration)
+            else 0
+        )
+        self.run_journal.record_iteration(
+            self.config.test_file_path,
+            generated=generated,
+            accepted=accepted,
+            coverage=self.test_validator.current_coverage,
+            target_reached=target_reached,
+            input_tokens=input_tokens - journaled_input,
+            output_tokens=output_tokens - journaled_output,
+        )
+
     def finalize_test_generation(self, iteration_count) -> (int, int):
         """
         Complete the test generation process and produce final reports.
@@ -388,17 +557,10 @@ class CoverAgent:
             else:
                 self.logger.info(failure_message)
 
+        self.test_validator.cleanup_workspaces()
+
         # Log token usage
-        total_input_token = (
-            self.test_gen.total_input_token_count
-            + self.test_validator.total_input_token_count
-            + self.total_input_token_count
-        )
-        total_output_token = (
-            self.test_gen.total_output_token_count
-            + self.test_validator.total_output_token_count
-            + self.total_output_token_count
-        )
+        total_input_token, total_output_token = self.token_counts()
         self.logger.info(
             f"Total number of input tokens used for LLM model {self.config.model}: "
             f"{total_input_token}"
@@ -444,17 +606,35 @@ class CoverAgent:
         """
         iteration_count = 0
         failed_test_runs, language, test_framework, coverage_report = await self.init()
+        generation = None
 
         while iteration_count < self.config.max_iterations:
             self.logger.info(f"Iteration {iteration_count + 1} of {self.config.max_iterations}.")
-            await self.generate_and_validate_tests(failed_test_runs, language, test_framework, coverage_report)
-
-            failed_test_runs, language, test_framework, coverage_report, target_reached = (
-                await self.check_iteration_progress()
-            )
+            prefetch = None
+            if self.prefetch_generation and iteration_count + 1 < self.config.max_iterations:
+                prefetch = GenerationPrefetch(self, failed_test_runs, language, test_framework, coverage_report)
+            try:
+                await self.generate_and_validate_tests(
+                    failed_test_runs,
+                    language,
+                    test_framework,
+                    coverage_report,
+                    generation=generation,
+                    on_generated=prefetch.start if prefetch else None,
+                )
+                failed_test_runs, language, test_framework, coverage_report, target_reached = (
+                    await self.check_iteration_progress()
+                )
+            except BaseException:
+                if prefetch:
+                    prefetch.cancel()
+                raise
             if target_reached:
+                if prefetch:
+                    prefetch.cancel()
                 break
 
+            generation = await self.take_prefetched_generation(prefetch) if prefetch else None
             iteration_count += 1
 
         return (*self.finalize_test_generation(iteration_count), target_reached, self.generated_tests_per_iteration, self.accepted_tests_per_iteration)
@@ -0,0 +1,104 @@
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Tuple
+
+from cover_agent.line_coverage import LineCoverage
+
+
+class CoverageAggregate(Mapping):
+    """
+    Whole-report coverage maintained as running totals.
+
+    Each file is stored with a digest of its entries in the report. On update only the files whose digest
+    changed are re-parsed, and their old line counts are swapped for the new ones in the totals, so the cost of
+    an update is proportional to the number of changed files rather than the size of the report.
+
+    The aggregate reads like the dict returned by the whole-report parsers:
+    { filename: (covered_lines, missed_lines, coverage_percent) }.
+    """
+
+    def __init__(self):
+        self._files = {}
+        self._digests = {}
+        self.percentages = {}
+        self.total_covered = 0
+        self.total_missed = 0
+        self.changed = []
+        # Files changed by any update since the last sync_percentages call
+        self.unsynced = set()
+
+    def __getitem__(self, filename: str) -> Tuple[LineCoverage, LineCoverage, float]:
+        return self._files[filename]
+
+    def __iter__(self):
+        return iter(self._files)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    @property
+    def total_lines(self) -> int:
+        """Number of measured lines over all files."""
+        return self.total_covered + self.total_missed
+
+    @property
+    def percentage(self) -> float:
+        """Coverage over all files, 0 when the report has no measured lines."""
+        return self.total_covered / self.total_lines if self.total_lines else 0
+
+    def update(self, digests: Dict[str, bytes], parse_files: Callable[[List[str]], dict]) -> List[str]:
+        """
+        Brings the aggregate in line with a new report.
+
+        Args:
+            digests (Dict[str, bytes]): Digest of every file's entries in the new report.
+            parse_files (Callable[[List[str]], dict]): Parses the given files from the new report and returns
+                { filename: (covered_lines, missed_lines, coverage_percent) }.
+
+        Returns:
+            List[str]: The files that were added, changed or removed, also kept in `changed`.
+        """
+        changed = [filename for filename, digest in digests.items() if self._digests.get(filename) != digest]
+        removed = [filename for filename in self._digests if filename not in digests]
+        for filename in removed:
+            self._remove(filename)
+
+        parsed = parse_files(changed) if changed else {}
+        for filename in changed:
+            self._remove(filename)
+            covered, missed, percentage = parsed.get(filename, (LineCoverage(), LineCoverage(), 0))
+            self._files[filename] = (covered, missed, percentage)
+            self._digests[filename] = digests[filename]
+            self.percentages[filename] = percentage
+            self.total_covered += len(covered)
+            self.total_missed += len(missed)
+
+        self.changed = changed + removed
+        self.unsynced.update(self.changed)
+        return self.changed
+
+    def sync_percentages(self, percentages: dict) -> dict:
+        """
+        Brings a copy of `percentages` taken at the previous sync up to date, touching only the files changed
+        since then rather than copying the whole dict.
+
+        Args:
+            percentages (dict): The copy to update in place.
+
+        Returns:
+            dict: The updated copy.
+        """
+        for filename in self.unsynced:
+            if filename in self.percentages:
+                percentages[filename] = self.percentages[filename]
+            else:
+                percentages.pop(filename, None)
+        self.unsynced.clear()
+        return percentages
+
+    def _remove(self, filename: str):
+        entry = self._files.pop(filename, None)
+        self._digests.pop(filename, None)
+        self.percentages.pop(filename, None)
+        if entry is not None:
+            self.total_covered -= len(entry[0])
+            self.total_missed -= len(entry[1])
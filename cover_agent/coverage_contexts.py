@@ -0,0 +1,177 @@
+import os
+import re
+import sqlite3
+from typing import Callable, Dict, Iterable
+
+import numpy as np
+
+from cover_agent.line_coverage import LineCoverage
+
+# The header every SQLite database file starts with, used to tell a coverage.py data file from other files
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+_PARAMETERS_PATTERN = re.compile(r"\[.*\]$")
+_CONTEXT_SEPARATORS = re.compile(r"[/\\.:#()\[\]]+")
+
+
+def context_test_name(context: str) -> str:
+    """
+    Reduces a per-test context or test name to the bare test name generated tests are known by.
+
+    Handles pytest-cov's "--cov-context=test" contexts ("tests/test_calc.py::TestCalc::test_add[1-2]|run"),
+    coverage.py's "dynamic_context = test_function" contexts ("tests.test_calc.TestCalc.test_add") and JUnit
+    style names ("CalcTest.testAdd()").
+
+    Args:
+        context (str): The context or test name.
+
+    Returns:
+        str: e.g. "test_add", or an empty string for the empty context of code run outside any test.
+    """
+    name = context.split("|")[0]
+    name = name.split("::")[-1] if "::" in name else name.split(".")[-1]
+    return _PARAMETERS_PATTERN.sub("", name.split("(")[0]).strip()
+
+
+def context_test_id(context: str) -> str:
+    """Strips the phase from a per-test context, keeping the full test id, e.g. "tests/test_calc.py::test_add"."""
+    return context.split("|")[0]
+
+
+def context_matches_test_file(context: str, test_file_path: str) -> bool:
+    """
+    Returns True if a per-test context or test id names a test in the given test file, e.g.
+    "tests/test_calc.py::TestCalc::test_add|run" or "com.example.CalcTest.testAdd" for tests/test_calc.py or
+    CalcTest.java.
+    """
+    test_file_stem = os.path.splitext(os.path.basename(test_file_path))[0]
+    return test_file_stem in _CONTEXT_SEPARATORS.split(context_test_id(context))
+
+
+def numbits_to_lines(numbits: bytes) -> LineCoverage:
+    """Decodes a coverage.py numbits blob, where bit n % 8 of byte n // 8 is set when line n ran."""
+    bits = np.unpackbits(np.frombuffer(numbits, dtype=np.uint8), bitorder="little").astype(bool)
+    return LineCoverage.from_bits(bits)
+
+
+def best_matching_paths(paths: Iterable[str], src_file_path: str) -> list:
+    """Returns the paths sharing the most trailing path components with the source file."""
+    source_components = os.path.abspath(src_file_path).replace(os.sep, "/").split("/")
+    best_length, best_paths = 0, []
+    for path in paths:
+        match_length = 0
+        for report_part, source_part in zip(reversed(path.replace("\\", "/").split("/")), reversed(source_components)):
+            if report_part != source_part:
+                break
+            match_length += 1
+        if match_length and match_length > best_length:
+            best_length, best_paths = match_length, [path]
+        elif match_length and match_length == best_length:
+            best_paths.append(path)
+    return best_paths
+
+
+def read_coverage_py_contexts(
+    data_file: str, src_file_path: str, key: Callable[[str], str] = context_test_name
+) -> Dict[str, LineCoverage]:
+    """
+    Reads the lines of the source file each test ran from a coverage.py data file (.coverage) recorded with
+    dynamic contexts, e.g. pytest --cov-context=test.
+
+    The setup, run and teardown phases of a test are combined. With branch coverage the data file has arcs
+    instead of line bits, and the lines are taken from both ends of each arc.
+
+    Args:
+        data_file (str): The path to the coverage.py SQLite data file.
+        src_file_path (str): The source file, matched against the measured paths by trailing path components.
+        key (Callable[[str], str]): Maps a context to the name tests are grouped by. Defaults to the bare test name.
+
+    Returns:
+        Dict[str, LineCoverage]: The lines run by each test, by test name.
+    """
+    contexts = {}
+    connection = sqlite3.connect(f"file:{data_file}?mode=ro", uri=True)
+    try:
+        files = dict(connection.execute("select path, id from file"))
+        file_ids = [files[path] for path in best_matching_paths(files, src_file_path)]
+        if not file_ids:
+            return {}
+        placeholders = ",".join("?" * len(file_ids))
+        tables = {row[0] for row in connection.execute("select name from sqlite_master where type = 'table'")}
+
+        if "line_bits" in tables:
+            rows = connection.execute(
+                "select context.context, line_bits.numbits from line_bits join context "
+                f"on context.id = line_bits.context_id where line_bits.file_id in ({placeholders})",
+                file_ids,
+            )
+            for context, numbits in rows:
+                name = key(context)
+                if name:
+                    contexts[name] = contexts.get(name, LineCoverage()) | numbits_to_lines(numbits)
+
+        if "arc" in tables:
+            rows = connection.execute(
+                "select context.context, arc.fromno, arc.tono from arc join context "
+                f"on context.id = arc.context_id where arc.file_id in ({placeholders})",
+                file_ids,
+            )
+            arc_lines = {}
+            for context, from_line, to_line in rows:
+                name = key(context)
+                if name:
+                    # Negative line numbers mark entering or leaving a code object
+                    arc_lines.setdefault(name, set()).update(line for line in (from_line, to_line) if line > 0)
+            for name, lines in arc_lines.items():
+                contexts[name] = contexts.get(name, LineCoverage()) | LineCoverage(lines)
+    finally:
+        connection.close()
+    return contexts
+
+
+def read_lcov_test_names(
+    report_path: str, src_file_path: str, key: Callable[[str], str] = context_test_name
+) -> Dict[str, LineCoverage]:
+    """
+    Reads the lines of the source file each test covered from an LCOV tracefile with per-test records, i.e.
+    records preceded by a "TN:<test name>" line.
+
+    Args:
+        report_path (str): The path to the LCOV tracefile.
+        src_file_path (str): The source file, matched against the SF: paths by trailing path components.
+        key (Callable[[str], str]): Maps a test name to the name tests are grouped by. Defaults to the bare test name.
+
+    Returns:
+        Dict[str, LineCoverage]: The covered lines of each named test, by test name.
+    """
+    records = {}
+    test_name, source = "", None
+    with open(report_path, "r") as report_file:
+        for line in report_file:
+            line = line.strip()
+            if line.startswith("TN:"):
+                test_name = key(line[3:])
+            elif line.startswith("SF:"):
+                source = line[3:]
+            elif line == "end_of_record":
+                source = None
+            elif line.startswith("DA:") and test_name and source is not None:
+                line_number, hits = line[3:].split(",")[:2]
+                lines = records.setdefault(source, {}).setdefault(test_name, set())
+                if int(hits) > 0:
+                    lines.add(int(line_number))
+
+    contexts = {}
+    for source in best_matching_paths(records, src_file_path):
+        for name, lines in records[source].items():
+            contexts[name] = contexts.get(name, LineCoverage()) | LineCoverage(lines)
+    return contexts
+
+
+def is_coverage_py_data_file(path: str) -> bool:
+    """Returns True if path is an SQLite database, as coverage.py data files are."""
+    try:
+        with open(path, "rb") as data_file:
+            return data_file.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    except OSError:
+        return False
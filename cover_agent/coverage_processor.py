@@ -1,17 +1,36 @@
+import asyncio
 import csv
+import hashlib
 import json
+import mmap
+import multiprocessing
 import os
 import re
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
-from typing import List, Optional, Tuple, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
+import numpy as np
+
+from cover_agent.coverage_aggregate import CoverageAggregate
+from cover_agent.coverage_contexts import (
+    context_test_name,
+    is_coverage_py_data_file,
+    read_coverage_py_contexts,
+    read_lcov_test_names,
+)
 from cover_agent.custom_logger import CustomLogger
+from cover_agent.jacoco_exec import read_execution_data
+from cover_agent.line_coverage import LineCoverage
 from cover_agent.settings.config_schema import CoverageType
 
 
 class CoverageProcessor:
+    _parse_executor = None
+
     def __init__(
         self,
         file_path: str,
@@ -22,6 +41,14 @@ class CoverageProcessor:
         diff_coverage_report_path: str = None,
         logger: Optional[CustomLogger] = None,
         generate_log_files: bool = True,
+        streaming: bool = False,
+        build_index: bool = False,
+        cache_results: bool = False,
+        hash_reports: bool = False,
+        execution_data_path: str = None,
+        incremental_aggregate: bool = False,
+        parse_workers: int = 0,
+        contexts_path: str = None,
     ):
         """
         Initializes a CoverageProcessor object.
@@ -32,6 +59,18 @@ class CoverageProcessor:
             coverage_type (CoverageType): The type of coverage report being processed.
             logger (CustomLogger): The logger object for logging messages.
             generate_log_files (bool): Whether or not to generate logs.
+            streaming (bool): Parse Cobertura reports incrementally with iterparse instead of loading the whole tree.
+            build_index (bool): When streaming, keep a filename -> (covered, missed) index of the whole report.
+            cache_results (bool): Reuse the parsed result while the report's path, mtime and size are unchanged.
+            hash_reports (bool): Also key the result cache on a content hash of the report.
+            execution_data_path (str): The JaCoCo .exec file written by the same run as a JaCoCo XML report. When set,
+                the lines parsed from the XML report are remembered per probe vector and reused for later runs whose
+                probes are identical.
+            incremental_aggregate (bool): With the report coverage feature flag and Cobertura reports, keep a
+                CoverageAggregate of the whole report and only re-parse the files whose <class> blocks changed.
+            parse_workers (int): Size of the shared process pool used by aprocess_coverage_report. 0 parses inline.
+            contexts_path (str): A coverage.py data file recorded with per-test contexts, read by
+                parse_test_contexts.
 
         Attributes:
             file_path (str): The path to the coverage report file.
@@ -45,12 +84,27 @@ class CoverageProcessor:
         self.file_path = file_path
         self.test_command_dir = test_command_dir
         self.src_file_path = src_file_path
-        self.coverage_type = coverage_type
+        self.coverage_type = coverage_type.value if isinstance(coverage_type, CoverageType) else coverage_type
+        self.detected_coverage_type = None
         self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
         self.use_report_coverage_feature_flag = use_report_coverage_feature_flag
         self.diff_coverage_report_path = diff_coverage_report_path
-
-    def process_coverage_report(self, time_of_test_command: int) -> Tuple[list, list, float]:
+        self.streaming = streaming
+        self.build_index = build_index
+        self.cobertura_index = None
+        self._cobertura_index_signature = None
+        self.cache_results = cache_results
+        self.hash_reports = hash_reports
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._result_cache = {}
+        self.execution_data_path = execution_data_path
+        self._jacoco_probe_map = {}
+        self.aggregate = CoverageAggregate() if incremental_aggregate else None
+        self.parse_workers = parse_workers
+        self.contexts_path = contexts_path
+
+    def process_coverage_report(self, time_of_test_command: int) -> Tuple[LineCoverage, LineCoverage, float]:
         """
         Verifies the coverage report's existence and update time, and then
         parses the report based on its type to extract coverage data.
@@ -59,7 +113,7 @@ class CoverageProcessor:
             time_of_test_command (int): The time the test command was run, in milliseconds.
 
         Returns:
-            Tuple[list, list, float]: A tuple containing lists of covered and missed line numbers, and the coverage percentage.
+            Tuple[LineCoverage, LineCoverage, float]: A tuple containing the covered and missed lines, and the coverage percentage.
         """
         self.verify_report_update(time_of_test_command)
         return self.parse_coverage_report()
@@ -89,37 +143,168 @@ class CoverageProcessor:
                 f"The coverage report file was not updated after the test command. file_mod_time_ms: {file_mod_time_ms}, time_of_test_command: {time_of_test_command}. {file_mod_time_ms > time_of_test_command}"
             )
 
-    def parse_coverage_report(self) -> Tuple[list, list, float]:
+    def parse_coverage_report(self) -> Tuple[LineCoverage, LineCoverage, float]:
         """
         Parses a code coverage report to extract covered and missed line numbers for a specific file,
         and calculates the coverage percentage, based on the specified coverage report type.
 
         Returns:
-            Tuple[list, list, float]: A tuple containing lists of covered and missed line numbers, and the coverage percentage.
+            Tuple[LineCoverage, LineCoverage, float]: A tuple containing the covered and missed lines, and the coverage percentage.
+        """
+        cache_key = self._result_cache_key()
+        if cache_key is None:
+            return self._parse_coverage_report_uncached()
+
+        cached = self._cached_result(cache_key)
+        if cached is not None:
+            return cached
+
+        result = self._parse_coverage_report_uncached()
+        self._store_result(cache_key, result)
+        return result
+
+    def _result_cache_key(self) -> Optional[tuple]:
+        """Key of the current report in the result cache, or None when caching is off or the report is missing."""
+        if not self.cache_results:
+            return None
+
+        report_path = self.diff_coverage_report_path if self.coverage_type == "diff_cover_json" else self.file_path
+        signature = self._report_signature(report_path, with_hash=self.hash_reports)
+        if signature is None:
+            return None
+        return (signature, self.coverage_type, self.use_report_coverage_feature_flag, self.src_file_path)
+
+    def _cached_result(self, cache_key: tuple):
+        """Returns the cached result for cache_key and counts the hit or miss."""
+        if cache_key in self._result_cache:
+            self.cache_hits += 1
+            self.logger.info(f"Coverage report {cache_key[0][0]} is unchanged since it was last parsed, reusing the cached result.")
+            return self._result_cache[cache_key]
+
+        self.cache_misses += 1
+        return None
+
+    def _store_result(self, cache_key: tuple, result):
+        # Only the latest report matters, older entries can never be hit again once the report is rewritten
+        self._result_cache = {cache_key: result}
+
+    async def aprocess_coverage_report(self, time_of_test_command: int) -> Union[Tuple[LineCoverage, LineCoverage, float], dict]:
+        """
+        Async counterpart of process_coverage_report that keeps the event loop free while the report is parsed.
+
+        Parsing runs in the shared process pool sized by parse_workers, and the result comes back with its line
+        bitmaps packed eight lines per byte. The result cache is checked in this process first, so an unchanged
+        report is never sent to the pool. Parsers that keep state between reports (the incremental aggregate and
+        the JaCoCo probe map) run in a worker thread of this process instead, and with parse_workers = 0 the
+        report is parsed inline as before.
+
+        Args:
+            time_of_test_command (int): The time the test command was run, in milliseconds.
+
+        Returns:
+            Tuple[LineCoverage, LineCoverage, float]: A tuple containing the covered and missed lines, and the coverage percentage.
+        """
+        self.verify_report_update(time_of_test_command)
+        if self.parse_workers <= 0:
+            return self.parse_coverage_report()
+        if self.coverage_type == "auto":
+            # Sniff here so the pool worker is handed a concrete format
+            self.resolve_report_format()
+        if self._has_parser_state():
+            return await asyncio.to_thread(self.parse_coverage_report)
+
+        cache_key = self._result_cache_key()
+        if cache_key is not None:
+            cached = self._cached_result(cache_key)
+            if cached is not None:
+                return cached
+
+        loop = asyncio.get_running_loop()
+        packed = await loop.run_in_executor(
+            self.get_parse_executor(self.parse_workers), _parse_coverage_report_in_worker, self._worker_arguments()
+        )
+        result = _unpack_coverage_result(packed)
+        if cache_key is not None:
+            self._store_result(cache_key, result)
+        return result
+
+    def _has_parser_state(self) -> bool:
+        """True when parsing updates state on this instance that a pool worker could not hand back."""
+        coverage_type = self.detected_coverage_type if self.coverage_type == "auto" else self.coverage_type
+        if coverage_type in ("jacoco", "jacoco_xml") and self.execution_data_path:
+            return True
+        return self.aggregate is not None and self.use_report_coverage_feature_flag and coverage_type == "cobertura"
+
+    def _worker_arguments(self) -> dict:
+        """The constructor arguments needed to repeat this processor's parse in a pool worker."""
+        return {
+            "file_path": self.file_path,
+            "src_file_path": self.src_file_path,
+            "coverage_type": self.detected_coverage_type if self.coverage_type == "auto" else self.coverage_type,
+            "test_command_dir": self.test_command_dir,
+            "use_report_coverage_feature_flag": self.use_report_coverage_feature_flag,
+            "diff_coverage_report_path": self.diff_coverage_report_path,
+            "streaming": self.streaming,
+            "build_index": self.build_index,
+            "cache_results": self.cache_results,
+            "hash_reports": self.hash_reports,
+        }
+
+    @classmethod
+    def get_parse_executor(cls, max_workers: int) -> ProcessPoolExecutor:
         """
+        Returns the process pool shared by all processors, creating it with max_workers on first use.
+
+        Workers are spawned rather than forked so they do not inherit the event loop or LSP threads.
+        """
+        if cls._parse_executor is None:
+            cls._parse_executor = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return cls._parse_executor
+
+    @classmethod
+    def shutdown_parse_executor(cls):
+        """Shuts down the shared parse pool, if one was started."""
+        if cls._parse_executor is not None:
+            cls._parse_executor.shutdown(wait=True, cancel_futures=True)
+            cls._parse_executor = None
+
+    def _parse_coverage_report_uncached(self) -> Union[Tuple[LineCoverage, LineCoverage, float], dict]:
+        """Dispatches to the parser registered for the configured (or detected) coverage report format."""
+        report_format = self.resolve_report_format()
         if self.use_report_coverage_feature_flag:
-            if self.coverage_type == "cobertura":
-                return self.parse_coverage_report_cobertura()
-            elif self.coverage_type == "lcov":
-                return self.parse_coverage_report_lcov()
-            elif self.coverage_type == "jacoco":
-                return self.parse_coverage_report_jacoco()
-            else:
-                raise ValueError(f"Unsupported coverage report type: {self.coverage_type}")
-        else:
-            if self.coverage_type == "cobertura":
-                # Default behavior is to parse out a single file from the report
-                return self.parse_coverage_report_cobertura(filename=os.path.basename(self.src_file_path))
-            elif self.coverage_type == "lcov":
-                return self.parse_coverage_report_lcov()
-            elif self.coverage_type == "jacoco":
-                return self.parse_coverage_report_jacoco()
-            elif self.coverage_type == "diff_cover_json":
-                return self.parse_json_diff_coverage_report()
-            else:
+            if report_format is None or report_format.parse_report is None:
                 raise ValueError(f"Unsupported coverage report type: {self.coverage_type}")
+            return report_format.parse_report(self)
 
-    def parse_coverage_report_cobertura(self, filename: str = None) -> Union[Tuple[list, list, float], dict]:
+        if report_format is None:
+            raise ValueError(f"Unsupported coverage report type: {self.coverage_type}")
+        return report_format.parse_file(self)
+
+    def resolve_report_format(self) -> Optional["CoverageReportFormat"]:
+        """
+        Looks up the registered format for coverage_type. With coverage_type "auto" the format is sniffed from the
+        first bytes of the report.
+
+        Returns:
+            CoverageReportFormat: The format, or None if coverage_type is not registered.
+
+        Raises:
+            ValueError: If coverage_type is "auto" and no registered format recognizes the report.
+        """
+        if self.coverage_type != "auto":
+            return COVERAGE_REPORT_FORMATS.get(self.coverage_type)
+
+        detected = sniff_coverage_format(self.file_path)
+        if detected is None:
+            raise ValueError(f"Could not detect the format of coverage report {self.file_path}")
+        if detected != self.detected_coverage_type:
+            self.logger.info(f"Detected {detected} coverage report format for {self.file_path}")
+            self.detected_coverage_type = detected
+        return COVERAGE_REPORT_FORMATS[detected]
+
+    def parse_coverage_report_cobertura(self, filename: str = None) -> Union[Tuple[LineCoverage, LineCoverage, float], dict]:
         """
         Parses a Cobertura XML code coverage report to extract covered and missed line numbers
         for a specific file or for all files (if filename is None). Aggregates coverage data from
@@ -132,6 +317,9 @@ class CoverageProcessor:
             If filename is provided, returns (covered_lines, missed_lines, coverage_percent).
             If filename is None, returns a dict: { filename: (covered_lines, missed_lines, coverage_percent) }.
         """
+        if self.streaming:
+            return self.parse_coverage_report_cobertura_streaming(filename=filename)
+
         tree = ET.parse(self.file_path)
         root = tree.getroot()
 
@@ -146,12 +334,7 @@ class CoverageProcessor:
                     all_missed.extend(c_missed)
 
             # Deduplicate and compute coverage
-            covered_set = set(all_covered)
-            missed_set = set(all_missed) - covered_set
-            total_lines = len(covered_set) + len(missed_set)
-            coverage_percentage = (len(covered_set) / total_lines) if total_lines else 0
-
-            return list(covered_set), list(missed_set), coverage_percentage
+            return self._summarize_lines(all_covered, all_missed)
 
         else:
             # Collect coverage for every <class>, grouping by filename
@@ -167,20 +350,187 @@ class CoverageProcessor:
                     file_map[cls_filename][0].extend(c_covered)
                     file_map[cls_filename][1].extend(c_missed)
 
-            # Convert raw lists to sets, compute coverage, store results
+            # Deduplicate, compute coverage, store results
             for f_name, (c_covered, c_missed) in file_map.items():
-                covered_set = set(c_covered)
-                missed_set = set(c_missed) - covered_set
-                total_lines = len(covered_set) + len(missed_set)
-                coverage_percentage = (len(covered_set) / total_lines) if total_lines else 0
-                coverage_data[f_name] = (
-                    list(covered_set),
-                    list(missed_set),
-                    coverage_percentage,
-                )
+                coverage_data[f_name] = self._summarize_lines(c_covered, c_missed)
 
             return coverage_data
 
+    def parse_coverage_report_cobertura_streaming(self, filename: str = None) -> Union[Tuple[LineCoverage, LineCoverage, float], dict]:
+        """
+        Streaming variant of parse_coverage_report_cobertura. The report is read with ET.iterparse and every
+        <class> element is cleared as soon as its lines have been collected, so memory stays bounded by the
+        largest single class rather than the whole report.
+
+        When build_index is set, the whole report is parsed once into self.cobertura_index and later lookups
+        against the same report are served from it.
+
+        Args:
+            filename (str, optional): Filename to process. If None, process all files.
+
+        Returns:
+            Same contract as parse_coverage_report_cobertura.
+        """
+        if self.build_index:
+            index = self._get_cobertura_index()
+            if filename:
+                covered, missed = LineCoverage(), LineCoverage()
+                for f_name, (c_covered, c_missed) in index.items():
+                    if f_name.endswith(filename):
+                        covered, missed = covered | c_covered, missed | c_missed
+                return self._summarize_lines(covered, missed)
+            return {f_name: self._summarize_lines(c_covered, c_missed) for f_name, (c_covered, c_missed) in index.items()}
+
+        file_map = self._iterparse_cobertura(filename=filename)
+        if filename:
+            covered_set, missed_set = set(), set()
+            for c_covered, c_missed in file_map.values():
+                covered_set.update(c_covered)
+                missed_set.update(c_missed)
+            return self._summarize_lines(covered_set, missed_set)
+        return {f_name: self._summarize_lines(c_covered, c_missed) for f_name, (c_covered, c_missed) in file_map.items()}
+
+    def _get_cobertura_index(self) -> dict:
+        """
+        Returns the filename -> (covered, missed) index for the current report, rebuilding it when the report
+        on disk has changed since the index was built.
+        """
+        signature = self._report_signature(self.file_path)
+        if self.cobertura_index is None or signature is None or signature != self._cobertura_index_signature:
+            file_map = self._iterparse_cobertura()
+            self.cobertura_index = {
+                f_name: self._summarize_lines(c_covered, c_missed)[:2] for f_name, (c_covered, c_missed) in file_map.items()
+            }
+            self._cobertura_index_signature = signature
+
+        return self.cobertura_index
+
+    def _iterparse_cobertura(self, filename: str = None) -> dict:
+        """
+        Single pass over a Cobertura report collecting line hits per <class> filename.
+
+        Args:
+            filename (str, optional): If given, only classes whose filename ends with it are collected. The whole
+                report is read, as the tree parser does, since files with the same name can sit in several
+                packages.
+
+        Returns:
+            dict: { filename: (covered_set, missed_set) }
+        """
+        file_map = {}
+        current_filename = None
+        class_covered, class_missed = [], []
+
+        for event, elem in ET.iterparse(self.file_path, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if tag == "class":
+                    current_filename = elem.get("filename")
+                    class_covered, class_missed = [], []
+                continue
+
+            if tag == "line":
+                if current_filename is not None:
+                    if int(elem.get("hits", 0)) > 0:
+                        class_covered.append(int(elem.get("number")))
+                    else:
+                        class_missed.append(int(elem.get("number")))
+            elif tag == "class":
+                if current_filename and (not filename or current_filename.endswith(filename)):
+                    covered, missed = file_map.setdefault(current_filename, (set(), set()))
+                    covered.update(class_covered)
+                    missed.update(class_missed)
+                current_filename = None
+                elem.clear()
+            elif tag == "package":
+                elem.clear()
+
+        return file_map
+
+    _CLASS_BLOCK_PATTERN = re.compile(rb'<class\b[^>]*?\bfilename="([^"]*)"[^>]*?(?:/>|>.*?</class>)', re.DOTALL)
+
+    def parse_coverage_report_cobertura_incremental(self) -> CoverageAggregate:
+        """
+        Updates the whole-report aggregate from a Cobertura report, re-parsing only the files whose <class>
+        blocks differ from the previous report.
+
+        The report is scanned once for <class> blocks, which are hashed per filename; only the blocks of files
+        with a new digest are handed to the XML parser.
+
+        Returns:
+            CoverageAggregate: The updated aggregate, a mapping of { filename: (covered_lines, missed_lines, coverage_percent) }.
+        """
+        blocks = self._cobertura_class_blocks()
+        changed = self.aggregate.update(
+            {filename: digest for filename, (digest, _) in blocks.items()},
+            lambda filenames: {filename: self._parse_cobertura_blocks(blocks[filename][1]) for filename in filenames},
+        )
+        self.logger.info(f"Coverage aggregate updated: {len(changed)} of {len(blocks)} files changed.")
+        return self.aggregate
+
+    def _cobertura_class_blocks(self) -> dict:
+        """
+        Returns { filename: (digest, [block_bytes, ...]) } for every <class> block in the Cobertura report.
+        Files split over several <class> elements get one digest over all their blocks, in report order.
+        """
+        hashers, blocks = {}, {}
+        with open(self.file_path, "rb") as report_file:
+            data = LcovIndex._map(report_file)
+            try:
+                for match in self._CLASS_BLOCK_PATTERN.finditer(data):
+                    filename = match.group(1).decode(errors="ignore")
+                    block = match.group(0)
+                    hashers.setdefault(filename, hashlib.blake2b(digest_size=16)).update(block)
+                    blocks.setdefault(filename, []).append(block)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        return {filename: (hashers[filename].digest(), blocks[filename]) for filename in blocks}
+
+    def _parse_cobertura_blocks(self, blocks: List[bytes]) -> Tuple[LineCoverage, LineCoverage, float]:
+        """Parses the <class> blocks of one file and merges their lines."""
+        all_covered, all_missed = [], []
+        for block in blocks:
+            c_covered, c_missed, _ = self.parse_coverage_data_for_class(ET.fromstring(block))
+            all_covered.extend(c_covered)
+            all_missed.extend(c_missed)
+        return self._summarize_lines(all_covered, all_missed)
+
+    @staticmethod
+    def _report_signature(report_path: str, with_hash: bool = False) -> Optional[tuple]:
+        """
+        Builds a cheap identity for a report file from a single stat() call, optionally extended with a
+        content hash for filesystems with coarse mtime resolution.
+
+        Returns:
+            tuple: (absolute path, mtime_ns, size[, digest]) or None if the report cannot be read.
+        """
+        try:
+            stat = os.stat(report_path)
+        except (OSError, TypeError, ValueError):
+            return None
+
+        signature = (os.path.abspath(report_path), stat.st_mtime_ns, stat.st_size)
+        if with_hash:
+            digest = hashlib.blake2b(digest_size=16)
+            with open(report_path, "rb") as report_file:
+                for chunk in iter(lambda: report_file.read(1 << 20), b""):
+                    digest.update(chunk)
+            signature += (digest.hexdigest(),)
+        return signature
+
+    @staticmethod
+    def _summarize_lines(covered, missed) -> Tuple[LineCoverage, LineCoverage, float]:
+        """
+        Builds the covered and missed bitmaps for a file and computes the coverage ratio. A line reported as
+        both covered and missed (e.g. by two <class> blocks) counts as covered.
+        """
+        covered = LineCoverage.coerce(covered)
+        missed = LineCoverage.coerce(missed) - covered
+        total_lines = covered.count() + missed.count()
+        coverage_percentage = (covered.count() / total_lines) if total_lines else 0
+        return covered, missed, coverage_percentage
+
     def parse_coverage_data_for_class(self, cls) -> Tuple[list, list, float]:
         """
         Parses coverage data for a single class.
@@ -207,38 +557,49 @@ class CoverageProcessor:
 
         return lines_covered, lines_missed, coverage_percentage
 
-    def parse_coverage_report_lcov(self):
+    def parse_coverage_report_lcov(self, filename: str = None, all_files: bool = False) -> Union[Tuple[LineCoverage, LineCoverage, float], dict]:
+        """
+        Parses an LCOV tracefile through a shared LcovIndex, so only the SF: records that match are decoded.
 
-        lines_covered, lines_missed = [], []
-        filename = os.path.basename(self.src_file_path)
+        Args:
+            filename (str, optional): Suffix of the SF: path to extract. Defaults to the basename of the source file.
+            all_files (bool): Return coverage for every source in the report instead of a single file.
+
+        Returns:
+            If all_files is False, returns (covered_lines, missed_lines, coverage_percent) aggregated over every
+            record whose SF: path ends with filename.
+            If all_files is True, returns a dict: { source_path: (covered_lines, missed_lines, coverage_percent) }.
+        """
         try:
-            with open(self.file_path, "r") as file:
-                for line in file:
-                    line = line.strip()
-                    if line.startswith("SF:"):
-                        if line.endswith(filename):
-                            for line in file:
-                                line = line.strip()
-                                if line.startswith("DA:"):
-                                    line_number = line.replace("DA:", "").split(",")[0]
-                                    hits = line.replace("DA:", "").split(",")[1]
-                                    if int(hits) > 0:
-                                        lines_covered.append(int(line_number))
-                                    else:
-                                        lines_missed.append(int(line_number))
-                                elif line.startswith("end_of_record"):
-                                    break
+            index = LcovIndex.for_report(self.file_path)
+            if all_files:
+                return index.parse_sources(index.sources())
 
+            filename = filename or os.path.basename(self.src_file_path)
+            matching_sources = [source for source in index.sources() if source.endswith(filename)]
+            return index.parse_merged(matching_sources)
         except (FileNotFoundError, IOError) as e:
             self.logger.error(f"Error reading file {self.file_path}: {e}")
             raise
 
-        total_lines = len(lines_covered) + len(lines_missed)
-        coverage_percentage = (len(lines_covered) / total_lines) if total_lines > 0 else 0
+    def parse_coverage_report_lcov_files(self, filenames: List[str]) -> dict:
+        """
+        Extracts coverage for several source files from the LCOV report in one go.
 
-        return lines_covered, lines_missed, coverage_percentage
+        Args:
+            filenames (List[str]): Suffixes of the SF: paths to extract.
 
-    def parse_coverage_report_jacoco(self) -> Tuple[list, list, float]:
+        Returns:
+            dict: { filename: (covered_lines, missed_lines, coverage_percent) } for every requested filename.
+        """
+        index = LcovIndex.for_report(self.file_path)
+        sources = index.sources()
+        return {
+            filename: index.parse_merged([source for source in sources if source.endswith(filename)])
+            for filename in filenames
+        }
+
+    def parse_coverage_report_jacoco(self, report_format: str = None) -> Tuple[LineCoverage, LineCoverage, float]:
         """
         Parses a JaCoCo XML code coverage report to extract covered and missed line numbers for a specific file,
         and calculates the coverage percentage.
@@ -261,11 +622,12 @@ class CoverageProcessor:
             self.logger.warn(f"Unsupported Bytecode Language: {source_file_extension}. Using default Java logic.")
             package_name, class_name = self.extract_package_and_class_java()
 
-        file_extension = self.get_file_extension(self.file_path)
+        # The report format is taken from the extension unless the caller already knows it, e.g. from sniffing
+        file_extension = report_format or self.get_file_extension(self.file_path)
 
         missed, covered = 0, 0
         if file_extension == "xml":
-            lines_missed, lines_covered = self.parse_missed_covered_lines_jacoco_xml(class_name)
+            lines_missed, lines_covered = self.parse_missed_covered_lines_jacoco(package_name, class_name)
             missed, covered = len(lines_missed), len(lines_covered)
         elif file_extension == "csv":
             missed, covered = self.parse_missed_covered_lines_jacoco_csv(package_name, class_name)
@@ -275,7 +637,94 @@ class CoverageProcessor:
         total_lines = missed + covered
         coverage_percentage = (float(covered) / total_lines) if total_lines > 0 else 0
 
-        return lines_covered, lines_missed, coverage_percentage
+        return LineCoverage(lines_covered), LineCoverage(lines_missed), coverage_percentage
+
+    def parse_missed_covered_lines_jacoco(self, package_name: str, class_name: str) -> tuple[list, list]:
+        """
+        Returns the missed and covered lines of a class, reusing the lines of an earlier XML report when the
+        class's probes in the execution data are identical to that earlier run.
+
+        JaCoCo line coverage is a function of the probe hits of the class, so identical probe vectors (for the same
+        class ids, i.e. the same compiled classes) always produce identical lines.
+        """
+        probe_key = self._jacoco_probe_key(package_name, class_name)
+        if probe_key is not None and probe_key in self._jacoco_probe_map:
+            self.logger.info(f"Probes of {class_name} in {self.execution_data_path} match an earlier run, skipping the XML report.")
+            return self._jacoco_probe_map[probe_key]
+
+        lines = self.parse_missed_covered_lines_jacoco_xml(class_name)
+        if probe_key is not None:
+            self._jacoco_probe_map[probe_key] = lines
+        return lines
+
+    def _jacoco_probe_key(self, package_name: str, class_name: str) -> Optional[tuple]:
+        """Builds a hashable key from the probe arrays of a class and its nested classes, or None if unavailable."""
+        if not self.execution_data_path or not os.path.exists(self.execution_data_path):
+            return None
+        try:
+            execution_data = read_execution_data(self.execution_data_path)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read JaCoCo execution data {self.execution_data_path}: {e}")
+            return None
+
+        return self._probe_key(execution_data.classes_for_source(package_name, class_name))
+
+    @staticmethod
+    def _probe_key(classes: list) -> Optional[tuple]:
+        if not classes:
+            return None
+        return tuple(
+            (class_data.name, class_data.id, class_data.probes.size, np.packbits(class_data.probes).tobytes())
+            for class_data in classes
+        )
+
+    def parse_test_contexts(self) -> Dict[str, LineCoverage]:
+        """
+        Reads which lines of the source file each test covered, from the per-test data of a single run:
+        coverage.py dynamic contexts in contexts_path, the TN: test names of an LCOV report, or the sessions of
+        JaCoCo execution data dumped once per test.
+
+        Returns:
+            Dict[str, LineCoverage]: The covered lines of each test, by test name. Empty if the run recorded no
+            per-test data.
+        """
+        if self.contexts_path and is_coverage_py_data_file(self.contexts_path):
+            return read_coverage_py_contexts(self.contexts_path, self.src_file_path)
+
+        coverage_type = self.detected_coverage_type if self.coverage_type == "auto" else self.coverage_type
+        if coverage_type == "lcov":
+            return read_lcov_test_names(self.file_path, self.src_file_path)
+        if coverage_type in ("jacoco", "jacoco_xml") and self.execution_data_path:
+            return self.parse_jacoco_session_lines()
+        return {}
+
+    def parse_jacoco_session_lines(self) -> Dict[str, LineCoverage]:
+        """
+        Returns the covered lines of each JaCoCo session whose probes for the source class match a probe vector
+        already resolved to lines from an XML report.
+
+        Probes cannot be mapped to lines without analyzing the class files, so sessions with unseen probe vectors
+        are left out and callers treat those tests as unattributed.
+        """
+        if not os.path.exists(self.execution_data_path):
+            return {}
+        try:
+            execution_data = read_execution_data(self.execution_data_path)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read JaCoCo execution data {self.execution_data_path}: {e}")
+            return {}
+
+        if self.get_file_extension(self.src_file_path) == "kt":
+            package_name, class_name = self.extract_package_and_class_kotlin()
+        else:
+            package_name, class_name = self.extract_package_and_class_java()
+        contexts = {}
+        for session in execution_data.sessions:
+            probe_key = self._probe_key(execution_data.classes_for_source(package_name, class_name, session.id))
+            if probe_key in self._jacoco_probe_map:
+                _, lines_covered = self._jacoco_probe_map[probe_key]
+                contexts[context_test_name(session.id)] = LineCoverage(lines_covered)
+        return contexts
 
     def parse_missed_covered_lines_jacoco_xml(self, class_name: str) -> tuple[list, list]:
         """Parses a JaCoCo XML code coverage report to extract covered and missed line numbers for a specific file."""
@@ -370,15 +819,16 @@ class CoverageProcessor:
 
         return package_name, class_name
 
-    def parse_json_diff_coverage_report(self) -> Tuple[List[int], List[int], float]:
+    def parse_json_diff_coverage_report(self) -> Tuple[LineCoverage, LineCoverage, float]:
         """
         Parses a JSON-formatted diff coverage report to extract covered lines, missed lines,
         and the coverage percentage for the specified src_file_path.
         Returns:
-            Tuple[List[int], List[int], float]: A tuple containing lists of covered and missed lines,
-                                                and the coverage percentage.
+            Tuple[LineCoverage, LineCoverage, float]: A tuple containing the covered and missed lines,
+                                                      and the coverage percentage.
         """
-        with open(self.diff_coverage_report_path, "r") as file:
+        # A diff-cover report passed as the coverage report itself (e.g. detected with coverage_type "auto")
+        with open(self.diff_coverage_report_path or self.file_path, "r") as file:
             report_data = json.load(file)
 
         # Create relative path components of `src_file_path` for matching
@@ -408,8 +858,385 @@ class CoverageProcessor:
             violation_lines = []
             coverage_percentage = 0.0
 
-        return covered_lines, violation_lines, coverage_percentage
+        return LineCoverage(covered_lines), LineCoverage(violation_lines), coverage_percentage
+
+    def parse_coverage_report_go(self, all_files: bool = False) -> Union[Tuple[LineCoverage, LineCoverage, float], dict]:
+        """
+        Parses a Go coverage profile (go test -coverprofile). Each block line reads
+        "path/file.go:startLine.startCol,endLine.endCol numStmts count" and marks lines startLine..endLine as covered
+        when count > 0. The profile is read line by line.
+
+        Args:
+            all_files (bool): Return coverage for every file in the profile instead of only the source file.
+
+        Returns:
+            If all_files is False, returns (covered_lines, missed_lines, coverage_percent) for the source file.
+            Otherwise returns a dict: { filename: (covered_lines, missed_lines, coverage_percent) }.
+        """
+        file_map = {}
+        with open(self.file_path, "r") as report_file:
+            for line in report_file:
+                match = self._GO_BLOCK_PATTERN.match(line)
+                if not match:
+                    continue
+                path, start_line, end_line, count = match.group(1), int(match.group(2)), int(match.group(3)), int(match.group(4))
+                covered, missed = file_map.setdefault(path, (set(), set()))
+                (covered if count > 0 else missed).update(range(start_line, end_line + 1))
+
+        return self._summarize_report_files(file_map, all_files)
+
+    def parse_coverage_report_coverage_py_json(self, all_files: bool = False) -> Union[Tuple[LineCoverage, LineCoverage, float], dict]:
+        """
+        Parses a coverage.py JSON report (coverage json), using the executed_lines and missing_lines of each file.
+
+        Args:
+            all_files (bool): Return coverage for every file in the report instead of only the source file.
+
+        Returns:
+            If all_files is False, returns (covered_lines, missed_lines, coverage_percent) for the source file.
+            Otherwise returns a dict: { filename: (covered_lines, missed_lines, coverage_percent) }.
+        """
+        with open(self.file_path, "r") as report_file:
+            report_data = json.load(report_file)
+
+        file_map = {
+            path: (stats.get("executed_lines", []), stats.get("missing_lines", []))
+            for path, stats in report_data.get("files", {}).items()
+        }
+        return self._summarize_report_files(file_map, all_files)
+
+    _GO_BLOCK_PATTERN = re.compile(r"^(.+):(\d+)\.\d+,(\d+)\.\d+ \d+ (\d+)\s*$")
+
+    def _summarize_report_files(self, file_map: dict, all_files: bool) -> Union[Tuple[LineCoverage, LineCoverage, float], dict]:
+        """
+        Summarizes { report_path: (covered, missed) } either for every file or for the report paths that best match
+        the source file, i.e. share the most trailing path components with it.
+        """
+        if all_files:
+            return {path: self._summarize_lines(covered, missed) for path, (covered, missed) in file_map.items()}
+
+        source_components = os.path.abspath(self.src_file_path).replace(os.sep, "/").split("/")
+        best_length, all_covered, all_missed = 0, [], []
+        for path, (covered, missed) in file_map.items():
+            match_length = 0
+            for report_part, source_part in zip(reversed(path.replace("\\", "/").split("/")), reversed(source_components)):
+                if report_part != source_part:
+                    break
+                match_length += 1
+            if match_length == 0 or match_length < best_length:
+                continue
+            if match_length > best_length:
+                best_length, all_covered, all_missed = match_length, [], []
+            all_covered.extend(covered)
+            all_missed.extend(missed)
+
+        return self._summarize_lines(all_covered, all_missed)
 
     def get_file_extension(self, filename: str) -> str | None:
         """Get the file extension from a given filename."""
         return os.path.splitext(filename)[1].lstrip(".")
+
+
+@dataclass(frozen=True)
+class CoverageReportFormat:
+    """
+    A coverage report format known to CoverageProcessor.
+
+    Attributes:
+        name (str): The coverage_type value selecting the format.
+        sniff (Callable[[memoryview], bool]): Recognizes the format from the first bytes of a report, used when
+            coverage_type is "auto". Formats that cannot be told apart from their contents use a sniffer that
+            never matches.
+        parse_file (Callable[[CoverageProcessor], tuple]): Parses the source file's coverage from the report.
+        parse_report (Callable[[CoverageProcessor], dict]): Parses every file in the report, used with the report
+            coverage feature flag. None if the format does not support it.
+        streaming (bool): Whether the parser reads the report incrementally rather than loading it whole.
+    """
+
+    name: str
+    sniff: Callable[[memoryview], bool]
+    parse_file: Callable[["CoverageProcessor"], tuple]
+    parse_report: Optional[Callable[["CoverageProcessor"], dict]] = None
+    streaming: bool = False
+
+
+COVERAGE_REPORT_FORMATS: Dict[str, CoverageReportFormat] = {}
+
+# Only the head of the report is looked at when sniffing
+SNIFF_BYTES = 4096
+
+
+def register_coverage_format(report_format: CoverageReportFormat) -> CoverageReportFormat:
+    """
+    Registers a coverage report format. Formats are sniffed in registration order.
+
+    Args:
+        report_format (CoverageReportFormat): The format to register, replacing any format with the same name.
+
+    Returns:
+        CoverageReportFormat: The registered format.
+    """
+    COVERAGE_REPORT_FORMATS[report_format.name] = report_format
+    return report_format
+
+
+def sniff_coverage_format(file_path: str) -> Optional[str]:
+    """
+    Detects the format of a coverage report from its first SNIFF_BYTES bytes, read through an mmap'd view
+    without copying the report.
+
+    Args:
+        file_path (str): The path to the coverage report.
+
+    Returns:
+        str: The name of the first registered format whose sniffer matches, or None.
+    """
+    with open(file_path, "rb") as report_file:
+        data = LcovIndex._map(report_file)
+        head = memoryview(data)[:SNIFF_BYTES]
+        try:
+            for report_format in COVERAGE_REPORT_FORMATS.values():
+                if report_format.sniff(head):
+                    return report_format.name
+            return None
+        finally:
+            head.release()
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+def _sniff_pattern(pattern: bytes) -> Callable[[memoryview], bool]:
+    compiled = re.compile(pattern, re.MULTILINE)
+    return lambda head: compiled.search(head) is not None
+
+
+def _never(head: memoryview) -> bool:
+    return False
+
+
+register_coverage_format(
+    CoverageReportFormat(
+        name="cobertura",
+        sniff=_sniff_pattern(rb"<coverage\b[^>]*>|<!DOCTYPE coverage\b"),
+        parse_file=lambda processor: processor.parse_coverage_report_cobertura(
+            filename=os.path.basename(processor.src_file_path)
+        ),
+        parse_report=lambda processor: (
+            processor.parse_coverage_report_cobertura_incremental()
+            if processor.aggregate is not None
+            else processor.parse_coverage_report_cobertura()
+        ),
+        streaming=True,
+    )
+)
+register_coverage_format(
+    CoverageReportFormat(
+        name="jacoco_xml",
+        sniff=_sniff_pattern(rb"<!DOCTYPE report PUBLIC \"-//JACOCO//|<report\b[^>]*>\s*<sessioninfo\b"),
+        parse_file=lambda processor: processor.parse_coverage_report_jacoco(report_format="xml"),
+        parse_report=lambda processor: processor.parse_coverage_report_jacoco(report_format="xml"),
+    )
+)
+register_coverage_format(
+    CoverageReportFormat(
+        name="jacoco_csv",
+        sniff=_sniff_pattern(rb"\A\s*GROUP,PACKAGE,CLASS,"),
+        parse_file=lambda processor: processor.parse_coverage_report_jacoco(report_format="csv"),
+        parse_report=lambda processor: processor.parse_coverage_report_jacoco(report_format="csv"),
+    )
+)
+register_coverage_format(
+    CoverageReportFormat(
+        name="jacoco",
+        sniff=_never,
+        parse_file=lambda processor: processor.parse_coverage_report_jacoco(),
+        parse_report=lambda processor: processor.parse_coverage_report_jacoco(),
+    )
+)
+register_coverage_format(
+    CoverageReportFormat(
+        name="lcov",
+        sniff=_sniff_pattern(rb"^(?:TN|SF):"),
+        parse_file=lambda processor: processor.parse_coverage_report_lcov(),
+        parse_report=lambda processor: processor.parse_coverage_report_lcov(all_files=True),
+        streaming=True,
+    )
+)
+register_coverage_format(
+    CoverageReportFormat(
+        name="go",
+        sniff=_sniff_pattern(rb"\Amode: (?:set|count|atomic)\s*$"),
+        parse_file=lambda processor: processor.parse_coverage_report_go(),
+        parse_report=lambda processor: processor.parse_coverage_report_go(all_files=True),
+        streaming=True,
+    )
+)
+register_coverage_format(
+    CoverageReportFormat(
+        name="diff_cover_json",
+        sniff=_sniff_pattern(rb'\A\s*\{\s*"report_name"\s*:|"diff_name"\s*:'),
+        parse_file=lambda processor: processor.parse_json_diff_coverage_report(),
+    )
+)
+register_coverage_format(
+    CoverageReportFormat(
+        name="coverage_py_json",
+        sniff=_sniff_pattern(rb'\A\s*\{\s*"meta"\s*:\s*\{[^}]*"(?:format|show_contexts|branch_coverage)"'),
+        parse_file=lambda processor: processor.parse_coverage_report_coverage_py_json(),
+        parse_report=lambda processor: processor.parse_coverage_report_coverage_py_json(all_files=True),
+    )
+)
+
+
+def _pack_lines(lines) -> tuple:
+    return LineCoverage.coerce(lines).to_packed()
+
+
+def _pack_coverage_result(result) -> tuple:
+    """Packs a parser result (a single file tuple or a { filename: tuple } dict) for transfer between processes."""
+    if isinstance(result, dict):
+        return "files", {
+            filename: (_pack_lines(covered), _pack_lines(missed), percentage)
+            for filename, (covered, missed, percentage) in result.items()
+        }
+    covered, missed, percentage = result
+    return "file", (_pack_lines(covered), _pack_lines(missed), percentage)
+
+
+def _unpack_coverage_result(packed: tuple):
+    """Inverse of _pack_coverage_result."""
+    kind, payload = packed
+
+    def unpack(entry):
+        covered, missed, percentage = entry
+        return LineCoverage.from_packed(*covered), LineCoverage.from_packed(*missed), percentage
+
+    if kind == "files":
+        return {filename: unpack(entry) for filename, entry in payload.items()}
+    return unpack(payload)
+
+
+# Processors of a parse pool worker by report and settings, so the filename index and the result cache of a
+# report outlive a single parse and are shared by the agents whose source files it covers
+_worker_processors = {}
+
+
+def _parse_coverage_report_in_worker(arguments: dict) -> tuple:
+    """Entry point of the parse pool: parses the report described by arguments and returns the packed result."""
+    key = tuple(sorted((name, value) for name, value in arguments.items() if name != "src_file_path"))
+    processor = _worker_processors.get(key)
+    if processor is None:
+        processor = _worker_processors[key] = CoverageProcessor(generate_log_files=False, **arguments)
+    processor.src_file_path = arguments["src_file_path"]
+    return _pack_coverage_result(processor.parse_coverage_report())
+
+
+class LcovIndex:
+    """
+    Byte-offset index of the SF: records in an LCOV tracefile.
+
+    The index is built in a single pass over an mmap of the report and maps every source path to the
+    (start, end) byte ranges of its records. Requests for specific sources then decode only those ranges.
+    Indexes are shared per report and rebuilt when the report's mtime or size changes, so concurrent
+    agents reading the same lcov.info only scan it once.
+    """
+
+    _DA_PATTERN = re.compile(rb"^[ \t]*DA:(\d+),(\d+)", re.MULTILINE)
+    _shared = {}
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.records = {}
+        self._build()
+
+    @classmethod
+    def for_report(cls, file_path: str) -> "LcovIndex":
+        """Returns the shared index for file_path, rebuilding it if the report changed on disk."""
+        signature = CoverageProcessor._report_signature(file_path)
+        if signature is None:
+            return cls(file_path)
+
+        cached = cls._shared.get(signature[0])
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        index = cls(file_path)
+        cls._shared[signature[0]] = (signature, index)
+        return index
+
+    def _build(self):
+        with open(self.file_path, "rb") as report_file:
+            data = self._map(report_file)
+            try:
+                size = len(data)
+                position = 0
+                while True:
+                    start = data.find(b"SF:", position)
+                    if start == -1:
+                        break
+                    line_start = data.rfind(b"\n", 0, start) + 1
+                    if data[line_start:start].strip():
+                        # "SF:" in the middle of a line, not a record header
+                        position = start + 3
+                        continue
+
+                    line_end = data.find(b"\n", start)
+                    line_end = size if line_end == -1 else line_end
+                    source = data[start + 3 : line_end].strip().decode(errors="ignore")
+
+                    record_end = data.find(b"end_of_record", line_end)
+                    record_end = size if record_end == -1 else record_end
+                    self.records.setdefault(source, []).append((line_end, record_end))
+                    position = record_end
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+    @staticmethod
+    def _map(report_file):
+        """Memory-maps the report, falling back to a plain read for empty files and non-mappable streams."""
+        try:
+            return mmap.mmap(report_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return report_file.read()
+
+    def sources(self) -> List[str]:
+        """Returns every SF: path in the report, in report order."""
+        return list(self.records)
+
+    def _read_lines(self, data, sources: List[str]) -> Tuple[set, set]:
+        covered, missed = set(), set()
+        for source in sources:
+            for start, end in self.records.get(source, []):
+                for line_number, hits in self._DA_PATTERN.findall(data, start, end):
+                    if hits != b"0":
+                        covered.add(int(line_number))
+                    else:
+                        missed.add(int(line_number))
+        return covered, missed
+
+    def _with_data(self, callback):
+        if not self.records:
+            return callback(b"")
+        with open(self.file_path, "rb") as report_file:
+            data = self._map(report_file)
+            try:
+                return callback(data)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+    def parse_merged(self, sources: List[str]) -> Tuple[LineCoverage, LineCoverage, float]:
+        """Aggregates coverage over the records of all given sources."""
+        covered, missed = self._with_data(lambda data: self._read_lines(data, sources))
+        return CoverageProcessor._summarize_lines(covered, missed)
+
+    def parse_sources(self, sources: List[str]) -> dict:
+        """Returns { source: (covered_lines, missed_lines, coverage_percent) } for each given source."""
+
+        def read_all(data):
+            return {
+                source: CoverageProcessor._summarize_lines(*self._read_lines(data, [source])) for source in sources
+            }
+
+        return self._with_data(read_all)
@@ -0,0 +1,97 @@
+import os
+from typing import Dict, Optional, Tuple
+
+from diff_cover.diff_reporter import GitDiffReporter
+from diff_cover.git_diff import GitDiffTool
+
+from cover_agent.custom_logger import CustomLogger
+from cover_agent.line_coverage import LineCoverage
+
+
+class DiffCoverageEngine:
+    """
+    Computes diff coverage in-process.
+
+    The lines changed against the comparison branch are read from git once, on first use, and kept for the
+    rest of the session. Each evaluation then intersects them with the covered and missed lines of a freshly
+    parsed coverage report, giving the same numbers diff-cover would write to its JSON report without running
+    diff-cover or reading the JSON back.
+
+    Only the source file's changed lines are looked up; generated tests modify the test file, not the source
+    file, so its changed lines stay valid for the whole session.
+    """
+
+    def __init__(
+        self,
+        comparison_branch: str,
+        diff_reporter: Optional[GitDiffReporter] = None,
+        logger: Optional[CustomLogger] = None,
+        generate_log_files: bool = True,
+    ):
+        """
+        Initializes a DiffCoverageEngine.
+
+        Args:
+            comparison_branch (str): The branch to diff against, as passed to diff-cover's --compare-branch.
+            diff_reporter (GitDiffReporter, optional): The reporter to read changed lines from. Defaults to one
+                configured like the diff-cover command line defaults.
+            logger (CustomLogger, optional): The logger object for logging messages.
+            generate_log_files (bool): Whether or not to generate logs.
+        """
+        self.comparison_branch = comparison_branch
+        self.diff_reporter = diff_reporter or GitDiffReporter(
+            comparison_branch, git_diff=GitDiffTool("...", ignore_whitespace=False)
+        )
+        self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
+        self._changed_lines = None
+
+    @property
+    def changed_lines(self) -> Dict[str, LineCoverage]:
+        """Changed lines per path relative to the repository root, read from git on first access."""
+        if self._changed_lines is None:
+            self._changed_lines = {
+                path: LineCoverage(self.diff_reporter.lines_changed(path))
+                for path in self.diff_reporter.src_paths_changed()
+            }
+            self.logger.info(
+                f"Computed diff against {self.comparison_branch}: {len(self._changed_lines)} changed files."
+            )
+        return self._changed_lines
+
+    def changed_lines_for(self, src_file_path: str) -> LineCoverage:
+        """
+        Returns the changed lines of a source file.
+
+        Args:
+            src_file_path (str): The path to the source file. Matched against the diff paths by trailing path
+                components, the same way the diff-cover JSON report is matched.
+
+        Returns:
+            LineCoverage: The changed lines, empty if the file is not part of the diff.
+        """
+        src_components = os.path.abspath(src_file_path).split(os.sep)
+        for path, lines in self.changed_lines.items():
+            path_components = path.split("/")
+            if src_components[-len(path_components) :] == path_components:
+                return lines
+        return LineCoverage()
+
+    def evaluate(self, src_file_path: str, lines_covered, lines_missed) -> Tuple[LineCoverage, LineCoverage, float]:
+        """
+        Restricts the coverage of a source file to its changed lines.
+
+        Args:
+            src_file_path (str): The path to the source file.
+            lines_covered (LineCoverage | Iterable[int]): Lines the coverage report marks as covered.
+            lines_missed (LineCoverage | Iterable[int]): Lines the coverage report marks as missed.
+
+        Returns:
+            Tuple[LineCoverage, LineCoverage, float]: The covered changed lines, the missed changed lines (diff-cover's
+            violation lines), and the diff coverage percentage.
+        """
+        changed = self.changed_lines_for(src_file_path)
+        covered = LineCoverage.coerce(lines_covered) & changed
+        missed = LineCoverage.coerce(lines_missed) & changed
+        total = covered.count() + missed.count()
+        percentage = covered.count() / total if total else 0.0
+        return covered, missed, percentage
@@ -0,0 +1,177 @@
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Block types and header constants of the JaCoCo execution data format (see org.jacoco.core.data.ExecutionDataWriter)
+BLOCK_HEADER = 0x01
+BLOCK_SESSIONINFO = 0x10
+BLOCK_EXECUTIONDATA = 0x11
+MAGIC_NUMBER = 0xC0C0
+FORMAT_VERSION = 0x1007
+
+
+@dataclass
+class SessionInfo:
+    """A JaCoCo session: the agent id and the start and dump timestamps in milliseconds."""
+
+    id: str
+    start: int
+    dump: int
+
+
+@dataclass
+class ClassExecutionData:
+    """
+    Probe hits of a single class.
+
+    Attributes:
+        id (int): The CRC64 of the class bytes, which changes whenever the class is recompiled differently.
+        name (str): The VM name of the class, e.g. "com/example/Calculator".
+        probes (np.ndarray): Boolean array with one entry per probe inserted by the JaCoCo agent.
+    """
+
+    id: int
+    name: str
+    probes: np.ndarray
+
+
+@dataclass
+class ExecutionData:
+    """
+    The contents of a jacoco.exec file.
+
+    Attributes:
+        sessions (List[SessionInfo]): The sessions in file order.
+        classes (Dict[str, ClassExecutionData]): The merged execution data of all sessions, by class name.
+        session_classes (Dict[str, Dict[str, ClassExecutionData]]): The execution data dumped by each session, by
+            session id. When the agent is dumped once per test with the test name as session id, this is the
+            coverage of each test.
+    """
+
+    sessions: List[SessionInfo] = field(default_factory=list)
+    classes: Dict[str, ClassExecutionData] = field(default_factory=dict)
+    session_classes: Dict[str, Dict[str, ClassExecutionData]] = field(default_factory=dict)
+
+    def classes_for_source(
+        self, package_name: str, class_name: str, session_id: Optional[str] = None
+    ) -> List[ClassExecutionData]:
+        """
+        Returns the execution data of the top level class and its nested and anonymous classes, sorted by name.
+
+        Args:
+            package_name (str): The dotted package name, e.g. "com.example". Empty for the default package.
+            class_name (str): The simple name of the top level class.
+            session_id (str, optional): Only return the data dumped by this session. Defaults to all sessions.
+        """
+        classes = self.classes if session_id is None else self.session_classes.get(session_id, {})
+        vm_name = f"{package_name.replace('.', '/')}/{class_name}" if package_name else class_name
+        return [
+            classes[name]
+            for name in sorted(classes)
+            if name == vm_name or name.startswith(vm_name + "$")
+        ]
+
+
+class _ExecReader:
+    """Reads the Java DataOutput primitives used by the execution data format."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def at_end(self) -> bool:
+        return self.pos >= len(self.data)
+
+    def read(self, size: int) -> bytes:
+        if self.pos + size > len(self.data):
+            raise ValueError("Truncated JaCoCo execution data")
+        chunk = self.data[self.pos : self.pos + size]
+        self.pos += size
+        return chunk
+
+    def read_byte(self) -> int:
+        return self.read(1)[0]
+
+    def read_char(self) -> int:
+        return struct.unpack(">H", self.read(2))[0]
+
+    def read_long(self) -> int:
+        return struct.unpack(">q", self.read(8))[0]
+
+    def read_utf(self) -> str:
+        # Java's modified UTF-8 only differs from UTF-8 for NUL and supplementary characters, neither of
+        # which appears in class names
+        length = self.read_char()
+        return self.read(length).decode("utf-8", errors="replace")
+
+    def read_var_int(self) -> int:
+        value, shift = 0, 0
+        while True:
+            byte = self.read_byte()
+            value |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def read_boolean_array(self) -> np.ndarray:
+        length = self.read_var_int()
+        packed = np.frombuffer(self.read((length + 7) // 8), dtype=np.uint8)
+        # Probes are packed eight per byte, least significant bit first
+        return np.unpackbits(packed, bitorder="little")[:length].astype(bool)
+
+
+def _merge_class_data(classes: Dict[str, ClassExecutionData], class_data: ClassExecutionData):
+    existing = classes.get(class_data.name)
+    probes = class_data.probes
+    if existing is not None and existing.id == class_data.id and existing.probes.size == probes.size:
+        probes = existing.probes | probes
+    classes[class_data.name] = ClassExecutionData(id=class_data.id, name=class_data.name, probes=probes)
+
+
+def read_execution_data(path: str) -> ExecutionData:
+    """
+    Reads a JaCoCo execution data file (jacoco.exec) without going through the XML report.
+
+    Files that were appended to by several agent runs contain several header blocks; their sessions and
+    classes are merged, with probes of the same class combined the way JaCoCo merges them.
+
+    Args:
+        path (str): The path to the .exec file.
+
+    Returns:
+        ExecutionData: The sessions and per-class probe arrays found in the file.
+
+    Raises:
+        ValueError: If the file is not a JaCoCo execution data file or uses an unsupported format version.
+    """
+    with open(path, "rb") as exec_file:
+        reader = _ExecReader(exec_file.read())
+
+    execution_data = ExecutionData()
+    # The execution data of a dump follows the session info block of that dump
+    session_id = None
+    while not reader.at_end():
+        block_type = reader.read_byte()
+        if block_type == BLOCK_HEADER:
+            if reader.read_char() != MAGIC_NUMBER:
+                raise ValueError(f"{path} is not a JaCoCo execution data file")
+            version = reader.read_char()
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported JaCoCo execution data version: {hex(version)}")
+        elif block_type == BLOCK_SESSIONINFO:
+            session = SessionInfo(id=reader.read_utf(), start=reader.read_long(), dump=reader.read_long())
+            execution_data.sessions.append(session)
+            session_id = session.id
+        elif block_type == BLOCK_EXECUTIONDATA:
+            class_data = ClassExecutionData(
+                id=reader.read_long(), name=reader.read_utf(), probes=reader.read_boolean_array()
+            )
+            if session_id is not None:
+                _merge_class_data(execution_data.session_classes.setdefault(session_id, {}), class_data)
+            _merge_class_data(execution_data.classes, class_data)
+        else:
+            raise ValueError(f"Unknown block type {hex(block_type)} in JaCoCo execution data {path}")
+
+    return execution_data
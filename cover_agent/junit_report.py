@@ -0,0 +1,64 @@
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class JUnitTestResult:
+    """
+    The outcome of one test case in a JUnit XML report.
+
+    Attributes:
+        name (str): The test name without parametrization or parentheses, e.g. "test_add" for pytest's
+            "test_add[1-2]" or JUnit 5's "test_add()".
+        passed (bool): False if any run of the test failed or errored.
+        message (str): The failure or error message and details of the first failing run, if any.
+    """
+
+    name: str
+    passed: bool
+    message: str = ""
+
+
+def _report_files(report_path: str, modified_since: float) -> List[str]:
+    if os.path.isdir(report_path):
+        candidates = [
+            os.path.join(report_path, name)
+            for name in sorted(os.listdir(report_path))
+            if name.endswith(".xml")
+        ]
+    else:
+        candidates = [report_path]
+    return [path for path in candidates if os.path.isfile(path) and os.path.getmtime(path) >= modified_since]
+
+
+def parse_junit_report(report_path: str, modified_since: float = 0) -> Optional[Dict[str, JUnitTestResult]]:
+    """
+    Reads per-test outcomes from a JUnit XML report, as written by pytest's --junitxml, Maven Surefire or
+    Gradle.
+
+    Args:
+        report_path (str): A report file, or a directory of report files such as target/surefire-reports.
+        modified_since (float): Ignore report files last modified before this time, in seconds since the epoch,
+            so that reports left over from earlier runs are not read.
+
+    Returns:
+        Dict[str, JUnitTestResult]: The outcome of every test case by name, or None if no report was written.
+    """
+    files = _report_files(report_path, modified_since)
+    if not files:
+        return None
+
+    results = {}
+    for path in files:
+        for testcase in ET.parse(path).getroot().iter("testcase"):
+            name = testcase.get("name", "").split("[")[0].split("(")[0]
+            failure = testcase.find("failure")
+            if failure is None:
+                failure = testcase.find("error")
+            result = results.setdefault(name, JUnitTestResult(name=name, passed=True))
+            if failure is not None and result.passed:
+                result.passed = False
+                result.message = "\n".join(filter(None, [failure.get("message", ""), failure.text or ""]))
+    return results
@@ -0,0 +1,189 @@
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+
+
+class LineCoverage:
+    """
+    A set of source line numbers backed by a NumPy boolean bitmap indexed by line number.
+
+    Coverage parsers return covered and missed lines as LineCoverage objects instead of lists of ints, so
+    unions, differences and counts are vectorized and large files do not allocate one Python int per line.
+    For prompts the lines are rendered as compact ranges such as "12-40,55".
+    """
+
+    __slots__ = ("_bits",)
+
+    def __init__(self, lines: Iterable[int] = ()):
+        """
+        Initializes a LineCoverage object.
+
+        Args:
+            lines (Iterable[int]): Line numbers to include. Duplicates are ignored.
+        """
+        numbers = np.fromiter((int(line) for line in lines), dtype=np.int64)
+        if numbers.size and numbers.min() < 0:
+            raise ValueError("Line numbers must be non-negative")
+        bits = np.zeros(int(numbers.max()) + 1 if numbers.size else 0, dtype=bool)
+        bits[numbers] = True
+        self._bits = bits
+
+    @classmethod
+    def from_bits(cls, bits: np.ndarray) -> "LineCoverage":
+        """Wraps an existing boolean bitmap where bits[n] is True when line n is in the set."""
+        instance = cls.__new__(cls)
+        instance._bits = np.asarray(bits, dtype=bool)
+        return instance
+
+    @classmethod
+    def coerce(cls, value: Union["LineCoverage", Iterable[int], None]) -> "LineCoverage":
+        """Returns value unchanged if it already is a LineCoverage, otherwise builds one from an iterable of lines."""
+        if isinstance(value, LineCoverage):
+            return value
+        return cls(value or ())
+
+    @classmethod
+    def from_ranges(cls, ranges: str) -> "LineCoverage":
+        """Parses the output of to_ranges(), e.g. "12-40,55"."""
+        bits = np.zeros(0, dtype=bool)
+        for part in filter(None, (chunk.strip() for chunk in ranges.split(","))):
+            start, _, end = part.partition("-")
+            start, end = int(start), int(end or start)
+            if end >= bits.size:
+                bits = np.concatenate([bits, np.zeros(end + 1 - bits.size, dtype=bool)])
+            bits[start : end + 1] = True
+        return cls.from_bits(bits)
+
+    @classmethod
+    def from_packed(cls, packed: bytes, size: int) -> "LineCoverage":
+        """Rebuilds a set serialized with to_packed()."""
+        bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=size).astype(bool)
+        return cls.from_bits(bits)
+
+    def to_packed(self) -> tuple:
+        """
+        Serializes the bitmap with eight lines per byte, for handing results between processes.
+
+        Returns:
+            tuple: (packed_bytes, bitmap_size), accepted by from_packed().
+        """
+        return np.packbits(self._bits).tobytes(), int(self._bits.size)
+
+    @property
+    def bits(self) -> np.ndarray:
+        """The underlying boolean bitmap."""
+        return self._bits
+
+    def _aligned(self, other: "LineCoverage") -> tuple:
+        other = LineCoverage.coerce(other)
+        size = max(self._bits.size, other._bits.size)
+        return np.pad(self._bits, (0, size - self._bits.size)), np.pad(other._bits, (0, size - other._bits.size))
+
+    def union(self, other: "LineCoverage") -> "LineCoverage":
+        """Lines present in either set."""
+        left, right = self._aligned(other)
+        return LineCoverage.from_bits(left | right)
+
+    def intersection(self, other: "LineCoverage") -> "LineCoverage":
+        """Lines present in both sets."""
+        left, right = self._aligned(other)
+        return LineCoverage.from_bits(left & right)
+
+    def difference(self, other: "LineCoverage") -> "LineCoverage":
+        """Lines present in this set but not in other."""
+        left, right = self._aligned(other)
+        return LineCoverage.from_bits(left & ~right)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def count(self) -> int:
+        """Number of lines in the set (popcount of the bitmap)."""
+        return int(np.count_nonzero(self._bits))
+
+    def tolist(self) -> list:
+        """Sorted list of line numbers."""
+        return np.flatnonzero(self._bits).tolist()
+
+    def to_ranges(self) -> str:
+        """
+        Serializes the set as comma separated ranges of consecutive lines.
+
+        Returns:
+            str: e.g. "12-40,55", or an empty string for an empty set.
+        """
+        if not self._bits.any():
+            return ""
+        padded = np.concatenate(([False], self._bits, [False])).astype(np.int8)
+        edges = np.flatnonzero(np.diff(padded))
+        starts, ends = edges[::2], edges[1::2] - 1
+        return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in zip(starts, ends))
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __bool__(self) -> bool:
+        return bool(self._bits.any())
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.tolist())
+
+    def __contains__(self, line: int) -> bool:
+        return 0 <= line < self._bits.size and bool(self._bits[line])
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, LineCoverage):
+            try:
+                other = LineCoverage(other)
+            except (TypeError, ValueError):
+                return NotImplemented
+        left, right = self._aligned(other)
+        return bool(np.array_equal(left, right))
+
+    __hash__ = None
+
+    def __str__(self) -> str:
+        return self.to_ranges()
+
+    def __repr__(self) -> str:
+        return f'LineCoverage("{self.to_ranges()}")'
+
+
+@dataclass
+class CoverageDelta:
+    """
+    The difference in covered lines of a source file between two coverage runs.
+
+    Attributes:
+        newly_covered (LineCoverage): Lines covered by the new run that were not covered before.
+        no_longer_covered (LineCoverage): Lines covered before that the new run did not cover.
+    """
+
+    newly_covered: LineCoverage
+    no_longer_covered: LineCoverage
+
+    @classmethod
+    def between(cls, previous_covered, current_covered) -> "CoverageDelta":
+        """
+        Diffs the covered lines of two runs.
+
+        Args:
+            previous_covered (LineCoverage | Iterable[int]): Lines covered by the earlier run.
+            current_covered (LineCoverage | Iterable[int]): Lines covered by the later run.
+
+        Returns:
+            CoverageDelta: The lines gained and lost between the two runs.
+        """
+        previous_covered = LineCoverage.coerce(previous_covered)
+        current_covered = LineCoverage.coerce(current_covered)
+        return cls(
+            newly_covered=current_covered - previous_covered,
+            no_longer_covered=previous_covered - current_covered,
+        )
+
+    @property
+    def increased(self) -> bool:
+        """True when the later run covers at least one line the earlier run did not."""
+        return bool(self.newly_covered)
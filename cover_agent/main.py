@@ -1,13 +1,16 @@
 import argparse
+import multiprocessing
 import os
 import asyncio
 
 from dynaconf import Dynaconf
 
 from cover_agent.cover_agent_ import CoverAgent
+from cover_agent.coverage_processor import CoverageProcessor
 from cover_agent.settings.config_loader import get_settings
 from cover_agent.settings.config_schema import CoverAgentConfig
 from cover_agent.version import __version__
+from cover_agent.warm_pytest import WarmPytestWorker
 
 
 def parse_args(settings: Dynaconf) -> argparse.Namespace:
@@ -178,12 +181,22 @@ def parse_args(settings: Dynaconf) -> argparse.Namespace:
     return parser.parse_args()
 
 
+async def run_agent(config: CoverAgentConfig):
+    try:
+        agent = await CoverAgent.create(config)
+        return await agent.run()
+    finally:
+        CoverageProcessor.shutdown_parse_executor()
+        await WarmPytestWorker.stop_all()
+
+
 def main():
+    # The coverage parse pool spawns its workers, which re-run this entry point in a frozen executable
+    multiprocessing.freeze_support()
     settings = get_settings().get("default")
     args = parse_args(settings)
     config = CoverAgentConfig.from_cli_args_with_defaults(args)
-    agent = CoverAgent.create(config)
-    asyncio.run(agent.run())
+    asyncio.run(run_agent(config))
 
 
 if __name__ == "__main__":
@@ -1,24 +1,34 @@
 import asyncio
 import argparse
 import copy
+import multiprocessing
 import logging
 import datetime
 import os
 import argparse
+import socket
 from typing import Union, Optional
 from pathlib import Path
 
+from cover_agent.adaptive_concurrency import AdaptiveConcurrencyController
 from cover_agent.ai_caller import AICaller
+from cover_agent.baseline_coverage import BaselineCoverage
 from cover_agent.cover_agent_ import CoverAgent
+from cover_agent.coverage_processor import CoverageProcessor
 from cover_agent.lsp_logic.ContextHelper import ContextHelper
+from cover_agent.run_journal import RunJournal, TestFileProgress
 from cover_agent.settings.config_loader import get_settings
 from cover_agent.settings.config_schema import CoverAgentConfig
 from cover_agent.utils import find_test_files, parse_args_full_repo
 from cover_agent.testable_file_finder import TestableFileFinder
+from cover_agent.test_file_scheduler import TestFileScheduler
 from cover_agent.test_file_generator import TestFileGenerator
+from cover_agent.test_file_transaction import TestFileTransaction
 from cover_agent.build_tool_adapter import MavenAdapter, BuiltToolAdapterABC, get_built_tool_adapter
 from cover_agent.custom_logger import CustomLogger
 from cover_agent.lsp_logic.utils.utils import remove_duplicate_included_files
+from cover_agent.warm_pytest import WarmPytestWorker
+from cover_agent.work_queue import WorkQueue, WorkUnit
 
 
 async def process_test_file(
@@ -26,12 +36,16 @@ async def process_test_file(
         adapter: BuiltToolAdapterABC,
         context_helper: ContextHelper,
         args: argparse.Namespace,
-        semaphore: asyncio.Semaphore = None,
+        semaphore: Union[asyncio.Semaphore, AdaptiveConcurrencyController] = None,
         task_id: int = None,
-        logger: Optional[CustomLogger] = None
+        logger: Optional[CustomLogger] = None,
+        baseline_coverage: Optional[BaselineCoverage] = None,
+        run_journal: Optional[RunJournal] = None,
 ) -> (str, int, int, bool, bool, str):
     """
     Process a single test file asynchronously.
+    With a run journal, a test file completed by an interrupted run is skipped, and one it started continues
+    from its journaled context and iterations. The result is recorded in the journal.
     Returns:
         test_file (str): The initialized AI caller instance
         input_token_count (int): The amount of token used as input for processing this file
@@ -40,7 +54,120 @@ async def process_test_file(
         success (bool): Whether generation was a success or not
         error (str): The error string, if any
     """
+    progress = run_journal.progress(test_file) if run_journal is not None else TestFileProgress()
+    if progress.completed:
+        (logger or CustomLogger.get_logger(__name__, generate_log_files=False)).info(
+            f"Skipping {test_file}, completed by the interrupted run"
+        )
+        return progress.result
+
+    result = await _process_test_file(
+        test_file, adapter, context_helper, args, semaphore, task_id, logger, baseline_coverage, run_journal, progress
+    )
+    if run_journal is not None:
+        run_journal.record_result(result)
+    return result
+
+
+async def find_test_file_context(
+        test_file: Union[str, Path],
+        context_helper: ContextHelper,
+        args: argparse.Namespace,
+        task_id: int,
+        logger: CustomLogger,
+) -> dict:
+    """
+    Finds the source file a test file tests and the context files to include in its prompts.
+    Returns:
+        dict: source_file, included_files and all_included_files for the CoverAgent, and the input_tokens and
+        output_tokens used to find them.
+    """
+    # Find the context files for the test file
+    all_context: list[tuple] = await context_helper.find_all_context(test_file)
+    deduped_context = remove_duplicate_included_files(all_context)
+    context_files: set[Path] = { context_file for context_file, _, _, _, _ in deduped_context }
+    logger.info("All context files:\n{}".format("".join(f"{f}\n" for f in deduped_context)))
+    logger.info("Set of context file paths\n{}".format("".join(f"{f}\n" for f in context_files)))
+
+    generate_log_files = not args.suppress_log_files
+    api_base = getattr(args, "api_base", "")
+
+    ai_caller = AICaller(task_id=task_id, test_file=test_file, model=args.model, api_base=api_base, generate_log_files=generate_log_files)
+    # Analyze the test file against the context files
+    logger.info(f"\nAnalyzing test file against context files...")
+    source_file, context_files_include, context_input_token, context_output_token = await context_helper.analyze_context(
+        test_file, context_files, ai_caller
+    )
+    # print("[=================================================]")
+    # print("source file is:")
+    # print(source_file)
+    all_context_no_test_no_source = []
+    for context_file in deduped_context:
+        if Path(context_file[0]).resolve() != Path(test_file).resolve() and Path(context_file[0]).resolve() != Path(source_file).resolve():
+            all_context_no_test_no_source.append(context_file)
+    # print("context file are:")
+    # print(all_context_no_test)
+    return {
+        "source_file": source_file,
+        "included_files": context_files_include,
+        "all_included_files": all_context_no_test_no_source,
+        "input_tokens": context_input_token,
+        "output_tokens": context_output_token,
+    }
+
+
+async def run_cover_agent(
+        test_file: Union[str, Path],
+        context: dict,
+        adapter: BuiltToolAdapterABC,
+        args: argparse.Namespace,
+        semaphore: Union[asyncio.Semaphore, AdaptiveConcurrencyController],
+        task_id: int,
+        baseline_coverage: Optional[BaselineCoverage] = None,
+        run_journal: Optional[RunJournal] = None,
+        max_iterations: Optional[int] = None,
+) -> (int, int, bool, list, list):
+    """
+    Runs the CoverAgent of a test file with the context found by find_test_file_context.
+    Returns:
+        The result of CoverAgent.run: input and output token counts, whether the coverage target was reached, and
+        the tests generated and accepted per iteration.
+    """
+    args_copy = copy.deepcopy(args)
+    args_copy.source_file_path = context["source_file"]
+    args_copy.test_command_dir = args.project_root
+    args_copy.test_file_path = test_file
+    args_copy.included_files = context["included_files"]
+    args_copy.all_included_files = context["all_included_files"]
+    # args_copy.test_command = adapter.adapt_test_command(test_file)
+    args_copy.code_coverage_report_path = adapter.get_coverage_path(test_file)
+    if max_iterations is not None:
+        args_copy.max_iterations = max_iterations
+
+    config = CoverAgentConfig.from_cli_args_with_defaults(args_copy)
+    agent = await CoverAgent.create(
+        config=config,
+        task_id=task_id,
+        built_tool_adapter=adapter,
+        semaphore=semaphore,
+        baseline_coverage=baseline_coverage,
+        run_journal=run_journal,
+    )
+    return await agent.run()
+
 
+async def _process_test_file(
+        test_file: Union[str, Path],
+        adapter: BuiltToolAdapterABC,
+        context_helper: ContextHelper,
+        args: argparse.Namespace,
+        semaphore: Union[asyncio.Semaphore, AdaptiveConcurrencyController],
+        task_id: int,
+        logger: Optional[CustomLogger],
+        baseline_coverage: Optional[BaselineCoverage],
+        run_journal: Optional[RunJournal],
+        progress: TestFileProgress,
+) -> (str, int, int, bool, bool, str):
     total_input_token = 0
     total_output_token = 0
     generated_tests = []
@@ -50,56 +177,40 @@ async def process_test_file(
         logger = logger or CustomLogger.get_logger(__name__, task_id, os.path.basename(test_file), generate_log_files=False)
         logger.info(f"Test file is: {test_file}")
 
-        # Find the context files for the test file
-        all_context: list[tuple] = await context_helper.find_all_context(test_file)
-        deduped_context = remove_duplicate_included_files(all_context)
-        context_files: set[Path] = { context_file for context_file, _, _, _, _ in deduped_context }
-        logger.info("All context files:\n{}".format("".join(f"{f}\n" for f in deduped_context)))
-        logger.info("Set of context file paths\n{}".format("".join(f"{f}\n" for f in context_files)))
-
-        generate_log_files = not args.suppress_log_files
-        api_base = getattr(args, "api_base", "")
-
-        ai_caller = AICaller(task_id=task_id, test_file=test_file, model=args.model, api_base=api_base, generate_log_files=generate_log_files)
-        # Analyze the test file against the context files
-        logger.info(f"\nAnalyzing test file against context files...")
-        source_file, context_files_include, context_input_token, context_output_token = await context_helper.analyze_context(
-            test_file, context_files, ai_caller
-        )
-        # print("[=================================================]")
-        # print("source file is:")
-        # print(source_file)
-        all_context_no_test_no_source = []
-        for context_file in deduped_context:
-            if Path(context_file[0]).resolve() != Path(test_file).resolve() and Path(context_file[0]).resolve() != Path(source_file).resolve():
-                all_context_no_test_no_source.append(context_file)
-        # print("context file are:")
-        # print(all_context_no_test)
-        total_input_token += context_input_token
-        total_output_token += context_output_token
-        target_reached = False
-
-
-        if source_file:
+        # A candidate test the interrupted run was validating is neither accepted nor journaled
+        if TestFileTransaction.recover(test_file):
+            logger.info("Rolled back the generated test the interrupted run left in the test file")
+
+        if progress.context is not None:
+            logger.info(f"Continuing after {len(progress.iterations)} iterations of the interrupted run")
+            context = dict(progress.context)
+            context["all_included_files"] = [tuple(entry) for entry in context["all_included_files"]]
+        else:
+            context = await find_test_file_context(test_file, context_helper, args, task_id, logger)
+            if run_journal is not None:
+                run_journal.record_context(test_file, **context)
+        source_file = context["source_file"]
+        total_input_token += context["input_tokens"] + sum(iteration["input_tokens"] for iteration in progress.iterations)
+        total_output_token += context["output_tokens"] + sum(iteration["output_tokens"] for iteration in progress.iterations)
+        generated_tests = [iteration["generated"] for iteration in progress.iterations]
+        accepted_tests = [iteration["accepted"] for iteration in progress.iterations]
+        target_reached = progress.target_reached
+        remaining_iterations = args.max_iterations - len(progress.iterations)
+
+
+        if source_file and (target_reached or remaining_iterations <= 0):
+            logger.info("The interrupted run finished all iterations of this test file")
+            return (test_file, total_input_token, total_output_token, target_reached, generated_tests, accepted_tests, True, None)
+        elif source_file:
             try:
                 # Run the CoverAgent for the test file
-                args_copy = copy.deepcopy(args)
-                args_copy.source_file_path = source_file
-                args_copy.test_command_dir = args.project_root
-                args_copy.test_file_path = test_file
-                args_copy.included_files = context_files_include
-                args_copy.all_included_files = all_context_no_test_no_source 
-                # args_copy.test_command = adapter.adapt_test_command(test_file)
-                args_copy.code_coverage_report_path = adapter.get_coverage_path(test_file)
-
-                config = CoverAgentConfig.from_cli_args_with_defaults(args_copy)
-                agent = await CoverAgent.create(config=config, task_id=task_id, built_tool_adapter=adapter, semaphore=semaphore)
-
-                input_token, output_token, target_reached, generated_tests, accepted_tests = await agent.run()
+                input_token, output_token, target_reached, new_generated_tests, new_accepted_tests = await run_cover_agent(
+                    test_file, context, adapter, args, semaphore, task_id, baseline_coverage, run_journal, remaining_iterations
+                )
                 total_input_token += input_token
                 total_output_token += output_token
-                generated_tests = generated_tests 
-                accepted_tests = accepted_tests 
+                generated_tests = generated_tests + new_generated_tests
+                accepted_tests = accepted_tests + new_accepted_tests
                 return (test_file, total_input_token, total_output_token, target_reached, generated_tests, accepted_tests,  True, None)
             except Exception as e:
                 logger.error(f"Error running CoverAgent: {e}")
@@ -111,6 +222,37 @@ async def process_test_file(
         return (test_file, total_input_token, total_output_token, False, [], [], False, f"Processing error: {str(e)}")
 
 
+async def run_shared_baseline(
+        args: argparse.Namespace,
+        adapter: Optional[BuiltToolAdapterABC],
+        semaphore: Union[asyncio.Semaphore, AdaptiveConcurrencyController] = None,
+) -> Optional[BaselineCoverage]:
+    """
+    Runs the whole test suite once for the baseline coverage of every test file, instead of one baseline run
+    per CoverAgent.
+    Returns:
+        BaselineCoverage: The shared baseline, or None if it is disabled or the run failed, in which case each
+        CoverAgent runs its own baseline.
+    """
+    coverage_settings = get_settings().get("coverage", {})
+    if not coverage_settings.get("shared_baseline", False):
+        return None
+
+    baseline_coverage = BaselineCoverage(
+        test_command=(adapter.adapt_baseline_command() if adapter else None) or args.test_command,
+        test_command_dir=args.project_root,
+        code_coverage_report_path=(adapter.get_baseline_coverage_path() if adapter else None) or args.code_coverage_report_path,
+        coverage_type=args.coverage_type,
+        max_run_time_sec=args.max_run_time_sec,
+        contexts_path=coverage_settings.get("contexts_data_file", "") or None,
+        execution_data_path=adapter.get_baseline_execution_data_path() if adapter else None,
+        generate_log_files=not args.suppress_log_files,
+    )
+    if not await baseline_coverage.run(semaphore=semaphore):
+        return None
+    return baseline_coverage
+
+
 async def generate_test_file(source_file, test_file_path, test_content, context_helper, task_id):
     """Generate an empty test file for a source file using LSP for context."""
     try:
@@ -132,6 +274,216 @@ async def generate_test_file(source_file, test_file_path, test_content, context_
         return (source_file, test_file_path, False, str(e))
 
 
+def _isolated_builds() -> bool:
+    """Whether candidates are validated in workspaces of their own, so build tool runs can overlap there."""
+    return get_settings().get("validation", {}).get("parallel_workers", 1) > 1
+
+
+async def run_coordinator(
+        args: argparse.Namespace,
+        test_files: list,
+        source_files_by_test: dict,
+        context_helper: ContextHelper,
+        baseline_coverage: Optional[BaselineCoverage] = None,
+) -> list:
+    """
+    Finds the context of every test file and puts it on the work queue for the workers, highest expected yield
+    first, then collects the results they stream back and writes the test files they extended into this
+    checkout.
+    Returns:
+        list: The result tuples of the test files, as process_test_file returns them.
+    """
+    settings = get_settings().get("distributed", {})
+    poll_interval_sec = settings.get("poll_interval_sec", 2)
+    logger = CustomLogger.get_logger(__name__, generate_log_files=not args.suppress_log_files)
+    queue = WorkQueue(args.queue_path, reset=not args.resume)
+    queue.reopen()
+    queued = queue.test_files()
+
+    scheduler = TestFileScheduler(
+        [
+            TestFileScheduler.estimate(task_id, test_file, source_files_by_test.get(str(test_file)), baseline_coverage)
+            for task_id, test_file in enumerate(test_files, 1)
+        ]
+    )
+    context_slots = asyncio.Semaphore(settings.get("context_max_in_flight", 8))
+
+    async def put(item):
+        test_file = WorkQueue.relative(item.test_file, args.project_root)
+        if test_file in queued:
+            return
+        task_logger = CustomLogger.get_logger(__name__, item.task_id, os.path.basename(item.test_file), generate_log_files=False)
+        try:
+            async with context_slots:
+                context = await find_test_file_context(item.test_file, context_helper, args, item.task_id, task_logger)
+            with open(item.test_file, "r") as f:
+                test_file_content = f.read()
+        except Exception as e:
+            task_logger.error(f"Error processing: {e}")
+            unit_id = queue.put(item.task_id, test_file, {})
+            queue.complete(unit_id, (test_file, 0, 0, False, [], [], False, f"Processing error: {str(e)}"))
+            return
+
+        queued_context = dict(
+            context,
+            source_file=WorkQueue.relative(context["source_file"], args.project_root),
+            included_files=[WorkQueue.relative(path, args.project_root) for path in context["included_files"] or []],
+            all_included_files=[
+                (WorkQueue.relative(entry[0], args.project_root), *entry[1:]) for entry in context["all_included_files"]
+            ],
+        )
+        unit_id = queue.put(item.task_id, test_file, queued_context, scheduler.score(item), test_file_content)
+        if not context["source_file"]:
+            queue.complete(
+                unit_id,
+                (test_file, context["input_tokens"], context["output_tokens"], False, [], [], False, "No source file found"),
+            )
+
+    async def put_all():
+        # The context slots are taken in this order, so the units workers need first are put first
+        items = sorted(scheduler.items, key=lambda item: (-scheduler.score(item), item.task_id))
+        await asyncio.gather(*(put(item) for item in items))
+        queue.close()
+
+    logger.info(f"Putting {len(test_files)} test files on the work queue {queue.path}")
+    enqueue = asyncio.create_task(put_all())
+    try:
+        while True:
+            requeued = queue.requeue_stale(settings.get("lease_sec", 300), settings.get("max_attempts", 2))
+            if requeued:
+                logger.warning(f"Took back {len(requeued)} test files from workers that stopped responding")
+            for unit in queue.take_unreported():
+                result = unit.result_tuple
+                if result[6] and unit.result_content is not None:
+                    # The worker's checkout holds the accepted tests, this one gets them from the result
+                    test_file = TestFileTransaction(WorkQueue.absolute(unit.test_file, args.project_root))
+                    test_file.write(unit.result_content)
+                    test_file.commit()
+                logger.info(f"Finished {unit.test_file} ({'succeeded' if result[6] else result[7]}), {queue.counts()}")
+            if enqueue.done():
+                enqueue.result()
+                if queue.drained():
+                    break
+            await asyncio.sleep(poll_interval_sec)
+    finally:
+        if not enqueue.done():
+            enqueue.cancel()
+
+    return [
+        (WorkQueue.absolute(unit.test_file, args.project_root), *unit.result_tuple[1:])
+        for unit in queue.results()
+    ]
+
+
+async def process_work_unit(
+        unit: WorkUnit,
+        queue: WorkQueue,
+        adapter: BuiltToolAdapterABC,
+        args: argparse.Namespace,
+        semaphore: Union[asyncio.Semaphore, AdaptiveConcurrencyController] = None,
+        baseline_coverage: Optional[BaselineCoverage] = None,
+) -> tuple:
+    """
+    Runs the CoverAgent of a unit of the work queue in this checkout and stores its result in the queue.
+    Returns:
+        tuple: The result tuple, with the test file relative to the project root.
+    """
+    test_file = WorkQueue.absolute(unit.test_file, args.project_root)
+    logger = CustomLogger.get_logger(__name__, unit.task_id, os.path.basename(test_file), generate_log_files=False)
+    logger.info(f"Test file is: {test_file}")
+    context = unit.context
+    total_input_token = context["input_tokens"]
+    total_output_token = context["output_tokens"]
+    target_reached = False
+    generated_tests = []
+    accepted_tests = []
+    try:
+        TestFileTransaction.recover(test_file)
+        # Start from the test file as the coordinator has it, including tests other workers added before
+        if unit.test_file_content is not None and (
+            not os.path.isfile(test_file) or Path(test_file).read_text() != unit.test_file_content
+        ):
+            os.makedirs(os.path.dirname(test_file), exist_ok=True)
+            with open(test_file, "w", encoding="utf-8") as f:
+                f.write(unit.test_file_content)
+
+        context["source_file"] = WorkQueue.absolute(context["source_file"], args.project_root)
+        context["included_files"] = [WorkQueue.absolute(path, args.project_root) for path in context["included_files"]]
+        context["all_included_files"] = [
+            (WorkQueue.absolute(entry[0], args.project_root), *entry[1:]) for entry in context["all_included_files"]
+        ]
+        input_token, output_token, target_reached, generated_tests, accepted_tests = await run_cover_agent(
+            test_file, context, adapter, args, semaphore, unit.task_id, baseline_coverage
+        )
+        total_input_token += input_token
+        total_output_token += output_token
+        result = (unit.test_file, total_input_token, total_output_token, target_reached, generated_tests, accepted_tests, True, None)
+    except Exception as e:
+        logger.error(f"Error running CoverAgent: {e}")
+        result = (unit.test_file, total_input_token, total_output_token, target_reached, generated_tests, accepted_tests, False, f"CoverAgent error: {str(e)}")
+
+    result_content = Path(test_file).read_text() if os.path.isfile(test_file) else None
+    if not queue.complete(unit.id, result, result_content, claim=unit.claim):
+        logger.warning(f"{unit.test_file} was given to another worker while it ran here, dropping the result")
+    return result
+
+
+async def run_worker(args: argparse.Namespace):
+    """
+    Processes units of the work queue in this checkout of the project, until the coordinator closed the queue
+    and every unit is done.
+    """
+    settings = get_settings().get("distributed", {})
+    max_in_flight = settings.get("worker_max_in_flight", 4)
+    poll_interval_sec = settings.get("poll_interval_sec", 2)
+    logger = CustomLogger.get_logger(__name__, generate_log_files=not args.suppress_log_files)
+    queue = WorkQueue(args.queue_path)
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+
+    adapter = get_built_tool_adapter(args.test_command, args.project_root, args.project_language)
+    concurrency = AdaptiveConcurrencyController.from_settings(
+        get_settings().get("concurrency", {}),
+        max_limit=None if adapter else 1,
+        logger=logger,
+        isolated_builds=_isolated_builds(),
+    )
+    in_flight = set()
+    processed = 0
+    # A third of the lease leaves room for two heartbeats delayed by a busy database
+    heartbeats = asyncio.create_task(queue.send_heartbeats(worker, settings.get("lease_sec", 300) / 3, logger))
+    try:
+        if adapter:
+            adapter.prepare_environment()
+        baseline_coverage = await run_shared_baseline(args, adapter, concurrency)
+        logger.info(f"Worker {worker} taking test files from {queue.path}")
+        while True:
+            while len(in_flight) < max_in_flight:
+                unit = queue.claim(worker)
+                if unit is None:
+                    break
+                in_flight.add(asyncio.create_task(
+                    process_work_unit(unit, queue, adapter, args, concurrency, baseline_coverage)
+                ))
+            if not in_flight:
+                if queue.drained():
+                    break
+                await asyncio.sleep(poll_interval_sec)
+                continue
+            done, in_flight = await asyncio.wait(in_flight, timeout=poll_interval_sec, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+                processed += 1
+    finally:
+        heartbeats.cancel()
+        for task in in_flight:
+            task.cancel()
+        if adapter:
+            adapter.cleanup_environment()
+        CoverageProcessor.shutdown_parse_executor()
+        await WarmPytestWorker.stop_all()
+    logger.info(f"Worker {worker} processed {processed} test files")
+
+
 async def run():
     # Setup logger
     # logger = logging.getLogger(__name__)
@@ -140,8 +492,10 @@ async def run():
     settings = get_settings().get("default")
     args: argparse.Namespace = parse_args_full_repo(settings)
     args.project_root = str(Path(args.project_root).resolve())
-
-    semaphore = asyncio.Semaphore(1)
+    if args.role == "worker":
+        # Test files and their context come from the coordinator's work queue
+        await run_worker(args)
+        return
 
     if args.project_language == "python" or args.project_language == "java":
         context_helper = ContextHelper(args)
@@ -160,10 +514,14 @@ async def run():
     # Generate test files for all testable files (exclude files that already have existed test files)
     test_generator = TestFileGenerator(args.project_root, args.project_language)
     files_needing_tests = []
+    # The source file of each test file, where the file names tell, for scheduling by uncovered lines
+    source_files_by_test = {}
     
     for source_file in all_testable_files:
         existing_test = test_generator.find_existing_test_file(source_file, test_files)
-        if not existing_test:
+        if existing_test:
+            source_files_by_test.setdefault(str(existing_test), source_file)
+        else:
             test_file_path, test_content = test_generator.generate_test_file(source_file)
             if test_file_path is None:
                 continue
@@ -195,6 +553,7 @@ async def run():
             for source_file, test_file_path, success, error in generation_results:
                 if success and test_file_path not in test_files:
                     test_files.append(test_file_path)
+                    source_files_by_test[str(test_file_path)] = source_file
             
             # Print generation summary
             successful_generations = [r for r in generation_results if r[2]]
@@ -205,24 +564,70 @@ async def run():
             print(f"❌ Failed: {len(failed_generations)} test files")
 
         adapter = get_built_tool_adapter(args.test_command, args.project_root, args.project_language)
+        # Without a build tool adapter all test files write the same coverage report, so their runs cannot overlap
+        concurrency = AdaptiveConcurrencyController.from_settings(
+            get_settings().get("concurrency", {}),
+            max_limit=None if adapter else 1,
+            logger=CustomLogger.get_logger(__name__, generate_log_files=not args.suppress_log_files),
+            isolated_builds=_isolated_builds(),
+        )
 
         try:
             if adapter: 
                 adapter.prepare_environment()
-            # Process all test files concurrently
-            tasks = [process_test_file(test_file=test_file, adapter=adapter, context_helper=context_helper, args=args, task_id=task_id, semaphore=semaphore) 
-                     for task_id, test_file in enumerate(test_files, 1)]
-            results = await asyncio.gather(*tasks)
+            baseline_coverage = await run_shared_baseline(args, adapter, concurrency)
+            journal_settings = get_settings().get("journal", {})
+            run_journal = None
+            # The work queue keeps the progress of a distributed run
+            if args.role != "coordinator" and (journal_settings.get("enabled", False) or args.resume):
+                run_journal = RunJournal(
+                    os.path.join(args.project_root, journal_settings.get("path", ".cover-agent-journal.jsonl")),
+                    resume=args.resume,
+                    logger=CustomLogger.get_logger(__name__, generate_log_files=not args.suppress_log_files),
+                )
+                run_journal.record_run(
+                    test_command=args.test_command,
+                    model=args.model,
+                    desired_coverage=args.desired_coverage,
+                    max_iterations=args.max_iterations,
+                )
+            scheduler_settings = get_settings().get("scheduler", {})
+            if args.role == "coordinator":
+                # Workers process the test files, this process finds their context and collects the results
+                results = await run_coordinator(args, test_files, source_files_by_test, context_helper, baseline_coverage)
+            elif scheduler_settings.get("enabled", False):
+                # Process the test files with the most uncovered lines first
+                scheduler = TestFileScheduler(
+                    [
+                        TestFileScheduler.estimate(task_id, test_file, source_files_by_test.get(str(test_file)), baseline_coverage)
+                        for task_id, test_file in enumerate(test_files, 1)
+                    ],
+                    max_in_flight=scheduler_settings.get("max_in_flight", 8),
+                    token_budget=scheduler_settings.get("token_budget", 0),
+                    prior_acceptance_rate=scheduler_settings.get("prior_acceptance_rate", 0.5),
+                    prior_weight=scheduler_settings.get("prior_weight", 4),
+                    logger=CustomLogger.get_logger(__name__, generate_log_files=not args.suppress_log_files),
+                )
+                results = await scheduler.run(
+                    lambda item: process_test_file(test_file=item.test_file, adapter=adapter, context_helper=context_helper, args=args, task_id=item.task_id, semaphore=concurrency, baseline_coverage=baseline_coverage, run_journal=run_journal)
+                )
+            else:
+                # Process all test files concurrently
+                tasks = [process_test_file(test_file=test_file, adapter=adapter, context_helper=context_helper, args=args, task_id=task_id, semaphore=concurrency, baseline_coverage=baseline_coverage, run_journal=run_journal) 
+                         for task_id, test_file in enumerate(test_files, 1)]
+                results = await asyncio.gather(*tasks)
             total_input_token = sum([input for f, input, output, _, _, _, r, e in results])
             total_output_token = sum([output for f, input, output, _, _, _, r, e in results])
         finally:
             if adapter:
                 adapter.cleanup_environment()
+            CoverageProcessor.shutdown_parse_executor()
+            await WarmPytestWorker.stop_all()
         
-        process_and_display_metrics(results)
+        process_and_display_metrics(results, concurrency.metrics())
 
 
-def process_and_display_metrics(results):
+def process_and_display_metrics(results, concurrency_metrics=None):
     """
         Aggregates results from multiple CoverAgent runs and displays a
         detailed metrics summary.
@@ -233,6 +638,8 @@ def process_and_display_metrics(results):
                     (test_file, total_input_token, total_output_token,
                     target_reached, generated_tests, accepted_tests,
                     success, error)
+            concurrency_metrics (dict, optional): The final state of each pool of the test execution
+            concurrency controller, by pool name.
     """
     # --- Initialize overall counters ---
     grand_total_generated = 0
@@ -325,9 +732,20 @@ def process_and_display_metrics(results):
         for file_summary in files_that_failed:
             print(file_summary)
 
+    if concurrency_metrics:
+        print("\n--- Test Execution Concurrency ---")
+        for pool_name, pool_metrics in concurrency_metrics.items():
+            print(
+                f"  - {pool_name}: limit {pool_metrics['limit']} (max {pool_metrics['max_limit']}), "
+                f"peak {pool_metrics['peak_in_flight']} concurrent, {pool_metrics['completed']} runs, "
+                f"{pool_metrics['increases']} increases, {pool_metrics['decreases']} decreases"
+            )
+
     print("\n" + "="*80)
 
 def main():
+    # The coverage parse pool spawns its workers, which re-run this entry point in a frozen executable
+    multiprocessing.freeze_support()
     asyncio.run(run())
 
 
@@ -0,0 +1,159 @@
+import datetime
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from cover_agent.custom_logger import CustomLogger
+
+
+@dataclass
+class TestFileProgress:
+    """What the journal holds on one test file: its context, the finished iterations and the final result."""
+
+    __test__ = False  # Not a pytest test class
+
+    context: Optional[dict] = None
+    iterations: List[dict] = field(default_factory=list)
+    result: Optional[tuple] = None
+
+    @property
+    def completed(self) -> bool:
+        """Whether the test file was processed successfully, so a resumed run can skip it."""
+        return self.result is not None and self.result[6]
+
+    @property
+    def input_tokens(self) -> int:
+        context_tokens = self.context["input_tokens"] if self.context else 0
+        return context_tokens + sum(iteration["input_tokens"] for iteration in self.iterations)
+
+    @property
+    def output_tokens(self) -> int:
+        context_tokens = self.context["output_tokens"] if self.context else 0
+        return context_tokens + sum(iteration["output_tokens"] for iteration in self.iterations)
+
+    @property
+    def target_reached(self) -> bool:
+        return bool(self.iterations) and self.iterations[-1]["target_reached"]
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal of a full-repo run, so an interrupted run can be resumed.
+
+    Every record is one line written as soon as the step it describes is done: the context and source file
+    found for a test file, each finished iteration of its CoverAgent with the tests generated and accepted,
+    tokens used and coverage reached, and its final result. Accepted tests are already in the test files, so
+    a resumed run skips completed test files, reuses the context of the others and continues them for the
+    iterations they have left. A line cut short by the interruption is ignored.
+    """
+
+    def __init__(self, path: str, resume: bool = False, logger: Optional[CustomLogger] = None):
+        """
+        Args:
+            path (str): The journal file.
+            resume (bool): Load the journal of an earlier run and append to it. Otherwise the journal is started
+                over.
+            logger (CustomLogger, optional): The logger object for logging messages.
+        """
+        self.path = path
+        self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=False)
+        self.run_info = {}
+        self.files: Dict[str, TestFileProgress] = {}
+        if resume and os.path.isfile(path):
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            open(path, "w").close()
+
+    @staticmethod
+    def key(test_file: Union[str, Path]) -> str:
+        return os.path.normpath(os.path.abspath(test_file))
+
+    def _load(self):
+        with open(self.path, "r") as journal:
+            lines = journal.readlines()
+        for number, line in enumerate(lines, 1):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                self.logger.warning(f"Ignoring unreadable line {number} of the run journal {self.path}")
+                continue
+            event = record.pop("event", None)
+            if event == "run":
+                self.run_info = record
+                continue
+            progress = self.files.setdefault(record.pop("test_file", ""), TestFileProgress())
+            if event == "context":
+                progress.context = record
+            elif event == "iteration":
+                progress.iterations.append(record)
+            elif event == "result":
+                progress.result = tuple(record["result"])
+        completed = sum(1 for progress in self.files.values() if progress.completed)
+        self.logger.info(f"Resuming from {self.path}: {completed} test files completed, {len(self.files) - completed} started")
+
+    def _append(self, event: str, **record):
+        record = {"event": event, "time": datetime.datetime.now().isoformat(), **record}
+        line = json.dumps(record, default=str)
+        with open(self.path, "a") as journal:
+            journal.write(line + "\n")
+
+    def record_run(self, **run_info):
+        """Records the settings of a run, and warns when they differ from the run being resumed."""
+        changed = [name for name, value in run_info.items() if name in self.run_info and self.run_info[name] != value]
+        if changed:
+            self.logger.warning(f"Resuming with different {', '.join(changed)} than the interrupted run")
+        self.run_info = run_info
+        self._append("run", **run_info)
+
+    def progress(self, test_file: Union[str, Path]) -> TestFileProgress:
+        return self.files.setdefault(self.key(test_file), TestFileProgress())
+
+    def record_context(
+        self,
+        test_file: Union[str, Path],
+        source_file: Optional[str],
+        included_files: list,
+        all_included_files: list,
+        input_tokens: int,
+        output_tokens: int,
+    ):
+        """Records the source file and context files found for a test file, and the tokens spent finding them."""
+        context = {
+            "source_file": str(source_file) if source_file else None,
+            "included_files": [str(path) for path in included_files or []],
+            "all_included_files": [list(entry) for entry in all_included_files or []],
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        }
+        self.progress(test_file).context = json.loads(json.dumps(context, default=str))
+        self._append("context", test_file=self.key(test_file), **context)
+
+    def record_iteration(
+        self,
+        test_file: Union[str, Path],
+        generated: int,
+        accepted: int,
+        coverage: float,
+        target_reached: bool,
+        input_tokens: int,
+        output_tokens: int,
+    ):
+        """Records a finished iteration of a test file's CoverAgent, with the tokens it used."""
+        iteration = {
+            "generated": generated,
+            "accepted": accepted,
+            "coverage": coverage,
+            "target_reached": target_reached,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        }
+        self.progress(test_file).iterations.append(iteration)
+        self._append("iteration", test_file=self.key(test_file), **iteration)
+
+    def record_result(self, result: tuple):
+        """Records the result tuple of process_test_file."""
+        self.progress(result[0]).result = tuple(result)
+        self._append("result", test_file=self.key(result[0]), result=list(result))
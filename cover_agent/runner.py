@@ -1,65 +1,393 @@
 import subprocess
 import time
 import asyncio
+import gzip
 import os
+import signal
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional
 
 from cover_agent.custom_logger import CustomLogger
 
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+TIMEOUT_EXIT_CODE = -1
+TIMEOUT_MESSAGE = "Command timed out"
+# How long the output of a command that exited is read for, in case a process it left behind holds its pipes
+DRAIN_TIMEOUT_SEC = 5
+
+# Signals that mean the process crashed or hit a resource limit rather than failed a test
+CRASH_SIGNALS = {
+    getattr(signal, name)
+    for name in ("SIGSEGV", "SIGBUS", "SIGABRT", "SIGILL", "SIGFPE", "SIGKILL", "SIGXCPU")
+    if hasattr(signal, name)
+}
+
+
+class OutputCapture:
+    """
+    Collects the output of a stream incrementally, keeping at most max_bytes of it in memory.
+
+    When the output grows past max_bytes only its first and last max_bytes / 2 bytes are kept, which hold the
+    command line and set-up errors, and the failure summary most test runners print last. The full output can
+    also be written, gzip-compressed, to a spill file, which is only kept when part of the output was dropped.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, spill_path: Optional[str] = None):
+        """
+        Args:
+            max_bytes (int, optional): The number of bytes kept in memory. None keeps everything.
+            spill_path (str, optional): A file the full output is written to, gzip-compressed.
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.spill_path = spill_path
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._spill = gzip.open(spill_path, "wb") if spill_path else None
+
+    @property
+    def truncated(self) -> bool:
+        """Whether part of the output was dropped from memory."""
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+    def write(self, chunk: bytes):
+        self.total_bytes += len(chunk)
+        if self._spill is not None:
+            self._spill.write(chunk)
+        if self.max_bytes is None:
+            self._head += chunk
+            return
+
+        head_room = (self.max_bytes + 1) // 2 - len(self._head)
+        if head_room > 0:
+            self._head += chunk[:head_room]
+            chunk = chunk[head_room:]
+        tail_bytes = self.max_bytes // 2
+        if not tail_bytes or not chunk:
+            return
+        self._tail += chunk[-tail_bytes:]
+        if len(self._tail) > tail_bytes:
+            del self._tail[: len(self._tail) - tail_bytes]
+
+    def close(self):
+        """Closes the spill file, and removes it when it holds nothing that was not kept in memory."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        if not self.truncated:
+            self.discard()
+
+    def discard(self):
+        """Removes the spill file."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        if self.spill_path:
+            try:
+                os.remove(self.spill_path)
+            except FileNotFoundError:
+                pass
+            self.spill_path = None
+
+    def getvalue(self) -> str:
+        """The kept output, with a marker where bytes were dropped."""
+        if not self.truncated:
+            return (bytes(self._head) + bytes(self._tail)).decode(errors="ignore")
+        omitted = self.total_bytes - len(self._head) - len(self._tail)
+        marker = f"\n... [{omitted} bytes omitted"
+        marker += f", full output in {self.spill_path}" if self.spill_path else ""
+        return self._head.decode(errors="ignore") + marker + "] ...\n" + self._tail.decode(errors="ignore")
+
+
+@dataclass
+class CommandResult:
+    """
+    The outcome of a command run by Runner.
+
+    Unpacks like the (stdout, stderr, exit_code, command_start_time) tuple Runner used to return.
+
+    Attributes:
+        stdout (str): The standard output of the command.
+        stderr (str): The standard error of the command. Ends with "Command timed out" when the command timed out.
+        exit_code (int): The exit code, -1 when the command timed out.
+        command_start_time (int): The time the command was started, in milliseconds.
+        timed_out (bool): Whether the command was killed for exceeding its time limit.
+        signal (int): The signal that killed the command or, for a shell command, its child, if any.
+        duration_sec (float): The wall time of the command in seconds.
+        output_truncated (bool): Whether stdout or stderr were cut down to the output byte cap.
+        stdout_spill_path (str): The gzip file holding the full stdout, when spilling was requested and a command
+            that did not pass had its stdout truncated.
+        stderr_spill_path (str): The gzip file holding the full stderr, likewise.
+    """
+
+    stdout: str
+    stderr: str
+    exit_code: int
+    command_start_time: int
+    timed_out: bool = False
+    signal: Optional[int] = None
+    duration_sec: float = 0.0
+    output_truncated: bool = False
+    stdout_spill_path: Optional[str] = None
+    stderr_spill_path: Optional[str] = None
+
+    def __iter__(self):
+        return iter((self.stdout, self.stderr, self.exit_code, self.command_start_time))
+
+    @property
+    def crashed(self) -> bool:
+        """True when the command was killed by a crash signal or a resource limit, not by the timeout."""
+        return not self.timed_out and self.signal in CRASH_SIGNALS
+
+    @property
+    def status(self) -> str:
+        """One of "passed", "failed", "timed_out" or "crashed"."""
+        if self.timed_out:
+            return "timed_out"
+        if self.crashed:
+            return "crashed"
+        return "passed" if self.exit_code == 0 else "failed"
+
+
+def _termination_signal(exit_code: Optional[int]) -> Optional[int]:
+    """
+    The signal that ended a process: negative exit codes for the process itself, 128 + N when a shell reports
+    its child was killed by a crash signal.
+    """
+    if exit_code is None:
+        return None
+    if exit_code < 0:
+        return -exit_code
+    if exit_code > 128 and exit_code - 128 in CRASH_SIGNALS:
+        return exit_code - 128
+    return None
+
+
+def _resource_limiter(memory_limit_mb: Optional[int], cpu_limit_sec: Optional[int]) -> Optional[Callable[[], None]]:
+    """
+    Builds a preexec_fn applying RLIMIT_AS and RLIMIT_CPU to the command, or None when no limit is set or the
+    platform has no resource module. The limits are inherited by every process the command starts.
+    """
+    if resource is None or not (memory_limit_mb or cpu_limit_sec):
+        return None
+
+    def apply_limits():
+        if memory_limit_mb:
+            limit = int(memory_limit_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if cpu_limit_sec:
+            # The soft limit sends SIGXCPU, the hard limit one second later SIGKILL
+            resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_limit_sec), int(cpu_limit_sec) + 1))
+
+    return apply_limits
+
+
+def _kill_process_group(proc):
+    """
+    Kills a command started in its own session together with every process it spawned. Without process groups
+    (Windows) only the command itself is killed.
+    """
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
 class Runner:
     @staticmethod
-    async def async_run_command(command: str, max_run_time_sec: int = None, semaphore: asyncio.Semaphore = None, cwd: str = None, logger: CustomLogger = None):
+    async def async_run_command(
+        command: str,
+        max_run_time_sec: int = None,
+        semaphore: asyncio.Semaphore = None,
+        cwd: str = None,
+        logger: CustomLogger = None,
+        memory_limit_mb: int = None,
+        cpu_limit_sec: int = None,
+        max_output_bytes: int = None,
+        spill_dir: str = None,
+        warm_worker=None,
+    ) -> CommandResult:
         """
         Executes a shell command in a specified working directory and returns its output, error, and exit code.
 
+        The command runs in its own process group. When it exceeds max_run_time_sec the whole group is killed,
+        so a hung test cannot keep the test runner, the build tool or their children alive.
+
         Parameters:
             command (str): The shell command to execute.
-            max_run_time_sec (int): Maximum allowed runtime in seconds before timeout.
+            max_run_time_sec (int): Maximum allowed runtime in seconds before timeout. None waits indefinitely.
+            semaphore (asyncio.Semaphore, optional): Held while the command runs.
             cwd (str, optional): The working directory in which to execute the command. Defaults to None.
+            logger (CustomLogger, optional): The logger object for logging messages.
+            memory_limit_mb (int, optional): Address space limit (RLIMIT_AS) for the command, in megabytes.
+            cpu_limit_sec (int, optional): CPU time limit (RLIMIT_CPU) for the command, in seconds.
+            max_output_bytes (int, optional): Keep at most this many bytes of stdout and of stderr in memory, from
+                the start and the end of the output. None keeps the whole output.
+            spill_dir (str, optional): Directory to write the full stdout and stderr to, gzip-compressed. The files
+                are only kept for commands that did not pass and whose output was truncated.
+            warm_worker (WarmPytestPool, optional): Runs pytest commands in pre-started pytest processes. Other
+                commands, and pytest commands the worker cannot take, run as usual.
 
         Returns:
-            tuple: A tuple containing the standard output ('stdout'), standard error ('stderr'), exit code ('exit_code'),
-                   and the time of the executed command ('command_start_time').
+            CommandResult: The output, exit code and start time of the command, and whether it timed out or
+            crashed. Unpacks as (stdout, stderr, exit_code, command_start_time).
         """
-        command_start_time = int(time.time() * 1000)  # Get the current time in milliseconds
+        limits = (memory_limit_mb, cpu_limit_sec, max_output_bytes, spill_dir)
+        if not semaphore:
+            return await Runner._async_run(command, max_run_time_sec, cwd, logger, warm_worker, *limits)
 
+        if logger:
+            logger.info(f"[Semaphore] Task for command starting with '{command}' is WAITING.")
+        async with semaphore:
+            if logger:
+                logger.info(f"[Semaphore] Task for command starting with '{command}' has ACQUIRED permit.")
+            result = await Runner._async_run(command, max_run_time_sec, cwd, logger, warm_worker, *limits)
+            if logger:
+                logger.info(f"[Semaphore] Task for command starting with '{command}' has FINISHED. Releasing permit.")
+        return result
 
-        if not semaphore:
-            proc = await asyncio.create_subprocess_shell(
+    @staticmethod
+    async def _async_run(
+        command: str,
+        max_run_time_sec: Optional[int],
+        cwd: Optional[str],
+        logger: Optional[CustomLogger],
+        warm_worker,
+        memory_limit_mb: Optional[int],
+        cpu_limit_sec: Optional[int],
+        max_output_bytes: Optional[int],
+        spill_dir: Optional[str],
+    ) -> CommandResult:
+        # The warm worker keeps no spill files, commands that ask for them run cold
+        if warm_worker is not None and not spill_dir:
+            result = await warm_worker.run(
                 command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                shell=True,
-                cwd=cwd,
+                cwd,
+                max_run_time_sec=max_run_time_sec,
+                max_output_bytes=max_output_bytes,
+                memory_limit_mb=memory_limit_mb,
+                cpu_limit_sec=cpu_limit_sec,
             )
-            stdout, stderr = await proc.communicate()
-        else:
+            if result is not None:
+                return result
+        return await Runner._async_run_in_process_group(
+            command, max_run_time_sec, cwd, logger, memory_limit_mb, cpu_limit_sec, max_output_bytes, spill_dir
+        )
+
+    @staticmethod
+    async def _async_run_in_process_group(
+        command: str,
+        max_run_time_sec: Optional[int],
+        cwd: Optional[str],
+        logger: Optional[CustomLogger],
+        memory_limit_mb: Optional[int],
+        cpu_limit_sec: Optional[int],
+        max_output_bytes: Optional[int],
+        spill_dir: Optional[str],
+    ) -> CommandResult:
+        command_start_time = int(time.time() * 1000)  # Get the current time in milliseconds
+        started = time.monotonic()
+        spill_prefix = None
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            spill_prefix = os.path.join(spill_dir, f"{command_start_time}-{uuid.uuid4().hex[:8]}")
+        proc = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            start_new_session=True,
+            preexec_fn=_resource_limiter(memory_limit_mb, cpu_limit_sec),
+        )
+        # Read the pipes as the command writes them, so the output up to a timeout is kept
+        stdout_capture = OutputCapture(max_output_bytes, f"{spill_prefix}.stdout.gz" if spill_prefix else None)
+        stderr_capture = OutputCapture(max_output_bytes, f"{spill_prefix}.stderr.gz" if spill_prefix else None)
+        readers = [
+            asyncio.create_task(Runner._read_stream(proc.stdout, stdout_capture)),
+            asyncio.create_task(Runner._read_stream(proc.stderr, stderr_capture)),
+        ]
+        timed_out = False
+        try:
+            await asyncio.wait_for(Runner._wait_for_exit(proc), timeout=max_run_time_sec)
+        except asyncio.TimeoutError:
+            timed_out = True
             if logger:
-                logger.info(f"[Semaphore] Task for command starting with '{command}' is WAITING.")
-            async with semaphore:
-                # max_run_time_sec = max_run_time_sec * 10
-                if logger:
-                    logger.info(f"[Semaphore] Task for command starting with '{command}' has ACQUIRED permit.")
-                proc = await asyncio.create_subprocess_shell(
-                    command,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    shell=True,
-                    cwd=cwd,
-                )
-                # try:
-                #     stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=max_run_time_sec)
-                # except asyncio.TimeoutError:
-                #     proc.kill()
-                #     await proc.wait()  # Ensure process is fully terminated
-                #     return b"", b"Command timed out", -1, command_start_time
-                stdout, stderr = await proc.communicate()
-                if logger:
-                    logger.info(f"[Semaphore] Task for command starting with '{command}' has FINISHED. Releasing permit.")
-
-        return stdout.decode(errors='ignore'), stderr.decode(errors='ignore'), proc.returncode, command_start_time
+                logger.warning(f"Command '{command}' exceeded {max_run_time_sec} seconds, killing its process group.")
+            _kill_process_group(proc)
+            await Runner._wait_for_exit(proc)
+        except asyncio.CancelledError:
+            _kill_process_group(proc)
+            raise
+        finally:
+            # Killing the group closes the pipes of every process that could still be writing to them
+            if timed_out:
+                await asyncio.wait(readers, timeout=1)
+            else:
+                _, pending = await asyncio.wait(readers, timeout=DRAIN_TIMEOUT_SEC)
+                if pending:
+                    # A process the command left behind, such as a build daemon, still holds the pipes
+                    if logger:
+                        logger.warning(f"Command '{command}' exited but its pipes stayed open, killing its process group.")
+                    _kill_process_group(proc)
+                    await asyncio.wait(pending, timeout=1)
+            for reader in readers:
+                reader.cancel()
+            stdout_capture.close()
+            stderr_capture.close()
+
+        exit_code = proc.returncode
+        if timed_out:
+            exit_code = TIMEOUT_EXIT_CODE
+        elif exit_code == 0:
+            # The full output of a passing run is not looked at again
+            stdout_capture.discard()
+            stderr_capture.discard()
+        stdout = stdout_capture.getvalue()
+        stderr = stderr_capture.getvalue()
+        if timed_out:
+            stderr = f"{stderr}\n{TIMEOUT_MESSAGE}" if stderr else TIMEOUT_MESSAGE
+        return CommandResult(
+            stdout=stdout,
+            stderr=stderr,
+            exit_code=exit_code,
+            command_start_time=command_start_time,
+            timed_out=timed_out,
+            signal=None if timed_out else _termination_signal(proc.returncode),
+            duration_sec=time.monotonic() - started,
+            output_truncated=stdout_capture.truncated or stderr_capture.truncated,
+            stdout_spill_path=stdout_capture.spill_path,
+            stderr_spill_path=stderr_capture.spill_path,
+        )
 
     @staticmethod
-    def run_command(command: str, max_run_time_sec: int, cwd: str = None):
+    async def _wait_for_exit(proc):
+        """
+        Waits for the command itself to exit. proc.wait() also waits for its pipes to be closed, which a process
+        the command left behind can keep open.
+        """
+        while proc.returncode is None:
+            await asyncio.sleep(0.02)
+
+    @staticmethod
+    async def _read_stream(stream: asyncio.StreamReader, capture: OutputCapture):
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                return
+            capture.write(chunk)
+
+    @staticmethod
+    def run_command(
+        command: str, max_run_time_sec: int, cwd: str = None, memory_limit_mb: int = None, cpu_limit_sec: int = None
+    ) -> CommandResult:
         """
         Executes a shell command in a specified working directory and returns its output, error, and exit code.
 
@@ -67,22 +395,44 @@ class Runner:
             command (str): The shell command to execute.
             max_run_time_sec (int): Maximum allowed runtime in seconds before timeout.
             cwd (str, optional): The working directory in which to execute the command. Defaults to None.
+            memory_limit_mb (int, optional): Address space limit (RLIMIT_AS) for the command, in megabytes.
+            cpu_limit_sec (int, optional): CPU time limit (RLIMIT_CPU) for the command, in seconds.
 
         Returns:
-            tuple: A tuple containing the standard output ('stdout'), standard error ('stderr'), exit code ('exit_code'),
-                   and the time of the executed command ('command_start_time').
+            CommandResult: The output, exit code and start time of the command, and whether it timed out or
+            crashed. Unpacks as (stdout, stderr, exit_code, command_start_time).
         """
         command_start_time = int(time.time() * 1000)  # Get the current time in milliseconds
+        started = time.monotonic()
 
+        proc = subprocess.Popen(
+            command,
+            shell=True,
+            cwd=cwd,
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+            preexec_fn=_resource_limiter(memory_limit_mb, cpu_limit_sec),
+        )
         try:
-           result = subprocess.run(
-                command,
-                shell=True,
-                cwd=cwd,
-                text=True,
-                capture_output=True,
-                timeout=max_run_time_sec,
-           )
-           return result.stdout, result.stderr, result.returncode, command_start_time
+            stdout, stderr = proc.communicate(timeout=max_run_time_sec)
         except subprocess.TimeoutExpired:
-            return "", "Command timed out", -1, command_start_time
+            _kill_process_group(proc)
+            proc.communicate()
+            return CommandResult(
+                stdout="",
+                stderr=TIMEOUT_MESSAGE,
+                exit_code=TIMEOUT_EXIT_CODE,
+                command_start_time=command_start_time,
+                timed_out=True,
+                duration_sec=time.monotonic() - started,
+            )
+        return CommandResult(
+            stdout=stdout,
+            stderr=stderr,
+            exit_code=proc.returncode,
+            command_start_time=command_start_time,
+            signal=_termination_signal(proc.returncode),
+            duration_sec=time.monotonic() - started,
+        )
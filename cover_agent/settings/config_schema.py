@@ -15,12 +15,18 @@ class CoverageType(Enum):
     Attributes:
         LCOV: Represents the LCOV coverage report format.
         COBERTURA: Represents the Cobertura coverage report format.
-        JACOCO: Represents the JaCoCo coverage report format.
+        JACOCO: Represents the JaCoCo coverage report format (XML or CSV, chosen by file extension).
+        GO: Represents the Go coverage profile format (go test -coverprofile).
+        COVERAGE_PY_JSON: Represents the coverage.py JSON report format.
+        AUTO: Detect the format from the contents of the report.
     """
 
     LCOV = "lcov"
     COBERTURA = "cobertura"
     JACOCO = "jacoco"
+    GO = "go"
+    COVERAGE_PY_JSON = "coverage_py_json"
+    AUTO = "auto"
 
 
 @dataclass
@@ -0,0 +1,164 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from cover_agent.baseline_coverage import BaselineCoverage
+from cover_agent.custom_logger import CustomLogger
+
+
+@dataclass
+class ScheduledTestFile:
+    """A test file of a full-repo run with the estimate its priority is computed from."""
+
+    task_id: int
+    test_file: Union[str, Path]
+    source_file: Optional[str] = None
+    source_lines: int = 0
+    uncovered_lines: Optional[int] = None
+
+    @property
+    def group(self) -> str:
+        """The directory whose past acceptance rate stands in for this file's: its package, in most projects."""
+        return os.path.dirname(os.path.abspath(self.source_file or self.test_file))
+
+
+class TestFileScheduler:
+    """
+    Runs the test files of a full-repo run highest expected yield first, with a bounded number in flight.
+
+    The expected yield of a test file is the number of lines of its source file left uncovered by the shared
+    baseline run, times the acceptance rate of generated tests in its package. Files missing from the
+    baseline count all their lines as uncovered, and files whose source file is not known up front count the
+    average of the others. Acceptance rates start from a prior and follow the results of finished files, so
+    packages where generated tests keep failing fall behind as the run goes on. With a token budget, no new
+    file is started once the finished files used it up.
+    """
+
+    __test__ = False  # Not a pytest test class
+
+    def __init__(
+        self,
+        items: List[ScheduledTestFile],
+        max_in_flight: int = 8,
+        token_budget: int = 0,
+        prior_acceptance_rate: float = 0.5,
+        prior_weight: float = 4.0,
+        logger: Optional[CustomLogger] = None,
+    ):
+        """
+        Args:
+            items (List[ScheduledTestFile]): The test files to run.
+            max_in_flight (int): Test files processed at once; 0 for no limit.
+            token_budget (int): Input and output tokens after which no further test file is started; 0 for no
+                budget.
+            prior_acceptance_rate (float): Acceptance rate assumed for a package without finished files.
+            prior_weight (float): Number of generated tests the prior counts as, against the observed ones.
+            logger (CustomLogger, optional): Logs every dispatch with its score.
+        """
+        self.items = items
+        self.max_in_flight = max_in_flight or len(items) or 1
+        self.token_budget = token_budget
+        self.prior_acceptance_rate = prior_acceptance_rate
+        self.prior_weight = prior_weight
+        self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=False)
+        self.tokens_used = 0
+        # Package -> [accepted tests, generated tests] of finished files
+        self._acceptance: Dict[str, List[int]] = {}
+        known = [item.uncovered_lines for item in items if item.uncovered_lines is not None]
+        self._default_uncovered = sum(known) / len(known) if known else 1.0
+
+    @classmethod
+    def estimate(
+        cls,
+        task_id: int,
+        test_file: Union[str, Path],
+        source_file: Optional[str] = None,
+        baseline_coverage: Optional[BaselineCoverage] = None,
+    ) -> ScheduledTestFile:
+        """
+        Builds a test file's estimate from its source file and the shared baseline run.
+
+        Args:
+            task_id (int): The id the test file is processed under.
+            test_file (Union[str, Path]): The test file.
+            source_file (str, optional): The source file it tests, when known from the file names.
+            baseline_coverage (BaselineCoverage, optional): The shared baseline run.
+        """
+        item = ScheduledTestFile(task_id=task_id, test_file=test_file)
+        if not source_file:
+            return item
+        item.source_file = str(source_file)
+        try:
+            with open(source_file, "r", errors="replace") as f:
+                item.source_lines = sum(1 for _ in f)
+        except OSError:
+            return item
+        coverage = baseline_coverage.slice_for(item.source_file) if baseline_coverage else None
+        item.uncovered_lines = len(coverage[1]) if coverage is not None else item.source_lines
+        return item
+
+    def acceptance_rate(self, group: str) -> float:
+        accepted, generated = self._acceptance.get(group, (0, 0))
+        return (accepted + self.prior_acceptance_rate * self.prior_weight) / (generated + self.prior_weight)
+
+    def score(self, item: ScheduledTestFile) -> float:
+        """The expected number of lines generated tests will cover for this test file."""
+        uncovered = item.uncovered_lines if item.uncovered_lines is not None else self._default_uncovered
+        return uncovered * self.acceptance_rate(item.group)
+
+    def record(self, item: ScheduledTestFile, result: tuple):
+        """Updates the token count and the acceptance rate of the item's package with a finished file."""
+        _, input_tokens, output_tokens, _, generated_tests, accepted_tests, _, _ = result
+        self.tokens_used += input_tokens + output_tokens
+        counts = self._acceptance.setdefault(item.group, [0, 0])
+        counts[0] += sum(accepted_tests)
+        counts[1] += sum(generated_tests)
+
+    def budget_exhausted(self) -> bool:
+        return bool(self.token_budget) and self.tokens_used >= self.token_budget
+
+    async def run(self, process: Callable[[ScheduledTestFile], Awaitable[tuple]]) -> list:
+        """
+        Processes every test file, re-scoring the waiting ones each time a slot frees up.
+
+        Args:
+            process (Callable): Processes one test file, returning the result tuple of process_test_file.
+
+        Returns:
+            list: The results in the order of the items. Files not started because of the token budget get a
+            failed result.
+        """
+        results = [None] * len(self.items)
+        waiting = list(range(len(self.items)))
+        in_flight = {}
+        try:
+            while waiting or in_flight:
+                while waiting and len(in_flight) < self.max_in_flight and not self.budget_exhausted():
+                    index = max(waiting, key=lambda i: (self.score(self.items[i]), -self.items[i].task_id))
+                    waiting.remove(index)
+                    item = self.items[index]
+                    self.logger.info(
+                        f"Starting {item.test_file} (expected yield {self.score(item):.1f} lines, "
+                        f"{len(waiting)} waiting)"
+                    )
+                    in_flight[asyncio.create_task(process(item))] = index
+                if not in_flight:
+                    break
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = in_flight.pop(task)
+                    results[index] = task.result()
+                    self.record(self.items[index], results[index])
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            raise
+
+        for index in waiting:
+            self.logger.info(f"Token budget of {self.token_budget} used up, not starting {self.items[index].test_file}")
+            results[index] = (
+                self.items[index].test_file, 0, 0, False, [], [], False, "Not started: token budget used up"
+            )
+        return results
@@ -0,0 +1,146 @@
+import os
+import tempfile
+from typing import Optional, Tuple
+
+
+class TestFileTransaction:
+    """
+    The content of a test file while generated tests are tried in it.
+
+    The committed content is read from disk once and then kept in memory, so trying a candidate does not read
+    the file again. write() replaces the file through a temporary file in the same directory and os.replace,
+    so the test file always holds either the old or the new content in full, even if the process dies midway.
+    The file a candidate replaces stays reachable through a hard link, so rollback() is a rename of that link
+    rather than another write. commit() makes the candidate the new committed content.
+    """
+
+    __test__ = False  # Not a pytest test class
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The test file.
+        """
+        self.path = path
+        self.writes = 0
+        self._content = None
+        self._signature = None
+        self._pending = None
+        self._snapshot_path = None
+
+    @staticmethod
+    def snapshot_path(path: str) -> str:
+        """The hidden hard link the committed file is kept under while a candidate replaces it."""
+        directory, name = os.path.split(os.path.abspath(path))
+        return os.path.join(directory, f".{name}.committed")
+
+    @classmethod
+    def recover(cls, path: str) -> bool:
+        """
+        Puts back the committed file of a transaction that was interrupted with a candidate in place.
+
+        Returns:
+            bool: Whether a candidate was found and rolled back.
+        """
+        snapshot_path = cls.snapshot_path(path)
+        if not os.path.lexists(snapshot_path):
+            return False
+        os.replace(snapshot_path, path)
+        os.utime(path)
+        return True
+
+    @property
+    def pending(self) -> bool:
+        """Whether the file holds a candidate that was neither committed nor rolled back."""
+        return self._pending is not None
+
+    @property
+    def content(self) -> str:
+        """
+        The committed content. Read again only when the file was changed by someone else since it was last
+        read or written here.
+        """
+        if self._content is None or (not self.pending and self._stat() != self._signature):
+            with open(self.path, "r") as test_file:
+                self._content = test_file.read()
+            self._signature = self._stat()
+        return self._content
+
+    def write(self, content: str):
+        """
+        Puts a candidate into the test file, with at most one atomic write.
+
+        Args:
+            content (str): The full content of the test file with the candidate.
+        """
+        committed = self.content
+        if content == (self._pending if self.pending else committed):
+            return
+        if not self.pending:
+            self._snapshot_path = self._link_snapshot()
+        self._replace(content)
+        self._pending = content
+
+    def commit(self):
+        """Keeps the candidate in the test file as the new committed content."""
+        if not self.pending:
+            return
+        self._content = self._pending
+        self._pending = None
+        self._drop_snapshot()
+        self._signature = self._stat()
+
+    def rollback(self):
+        """Restores the committed content, by renaming the snapshot of the replaced file back into place."""
+        if not self.pending:
+            return
+        if self._snapshot_path:
+            os.replace(self._snapshot_path, self.path)
+            self._snapshot_path = None
+            # The restored file keeps its old mtime, which build tools would take as older than their output
+            os.utime(self.path)
+        else:
+            self._replace(self._content)
+        self._pending = None
+        self._signature = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _replace(self, content: str):
+        directory, name = os.path.split(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as temp_file:
+                temp_file.write(content)
+            if os.path.exists(self.path):
+                os.chmod(temp_path, os.stat(self.path).st_mode & 0o7777)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.writes += 1
+
+    def _link_snapshot(self) -> Optional[str]:
+        """Hard-links the committed file under a hidden name. None where hard links are not supported."""
+        snapshot_path = self.snapshot_path(self.path)
+        try:
+            if os.path.lexists(snapshot_path):
+                os.remove(snapshot_path)
+            os.link(self.path, snapshot_path)
+        except OSError:
+            return None
+        return snapshot_path
+
+    def _drop_snapshot(self):
+        if self._snapshot_path:
+            try:
+                os.remove(self._snapshot_path)
+            except OSError:
+                pass
+            self._snapshot_path = None
@@ -159,7 +159,28 @@ class UnitTestGenerator:
 
         return failed_test_runs_value
 
-    async def generate_tests(self, failed_test_runs, language, testing_framework, code_coverage_report):
+    @staticmethod
+    def in_flight_tests_instructions(in_flight_tests: list) -> str:
+        """
+        Lists tests that are still being validated, so a generation started meanwhile does not repeat them.
+
+        Args:
+            in_flight_tests (list): The generated tests, as returned in "new_tests".
+
+        Returns:
+            str: Instructions to append to the additional instructions of the prompt.
+        """
+        tests = "".join(f"```\n{test.get('test_code', '')}\n```\n" for test in in_flight_tests if isinstance(test, dict))
+        if not tests:
+            return ""
+        return (
+            "\nThe following tests were already generated and are being run, and the coverage report above does "
+            "not include them yet. Do not repeat them, generate tests for other lines and behaviors:\n" + tests
+        )
+
+    async def generate_tests(
+        self, failed_test_runs, language, testing_framework, code_coverage_report, in_flight_tests: list = None
+    ):
         """
         Generate tests using the AI model based on the constructed prompt.
 
@@ -170,6 +191,8 @@ class UnitTestGenerator:
 
         Parameters:
             max_tokens (int, optional): The maximum number of tokens to use for generating tests. Defaults to 4096.
+            in_flight_tests (list, optional): Tests generated earlier that are still being validated. The prompt
+                asks for different tests, since the coverage report does not reflect them yet.
 
         Returns:
             dict: A dictionary containing the generated tests with test tags, test code, test name, and test behavior. If an error occurs during test generation, an empty dictionary is returned.
@@ -178,6 +201,9 @@ class UnitTestGenerator:
             Exception: If there is an error during test generation, such as a parsing error while processing the AI model response.
         """
         failed_test_runs_value = self.check_for_failed_test_runs(failed_test_runs)
+        additional_instructions = self.additional_instructions
+        if in_flight_tests:
+            additional_instructions += self.in_flight_tests_instructions(in_flight_tests)
 
         max_tests_per_run = get_settings().get("default").get("max_tests_per_run", 4)
         response, prompt_token_count, response_token_count, self.prompt = await self.agent_completion.generate_tests(
@@ -185,7 +211,7 @@ class UnitTestGenerator:
             max_tests=max_tests_per_run,
             source_file_numbered="\n".join(f"{i + 1} {line}" for i, line in enumerate(self.source_code.split("\n"))),
             code_coverage_report=code_coverage_report,
-            additional_instructions_text=self.additional_instructions,
+            additional_instructions_text=additional_instructions,
             additional_includes_section=self.included_files,
             language=language,
             test_file=self.test_code,
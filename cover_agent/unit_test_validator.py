@@ -9,17 +9,30 @@ from typing import Optional
 from diff_cover.diff_cover_tool import main as diff_cover_main
 from wandb.sdk.data_types.trace_tree import Trace
 
+from cover_agent.adaptive_concurrency import AdaptiveConcurrencyController
 from cover_agent.agent_completion_abc import AgentCompletionABC
+from cover_agent.coverage_aggregate import CoverageAggregate
 from cover_agent.coverage_processor import CoverageProcessor
 from cover_agent.custom_logger import CustomLogger
+from cover_agent.diff_coverage import DiffCoverageEngine
 from cover_agent.file_preprocessor import FilePreprocessor
+from cover_agent.junit_report import parse_junit_report
+from cover_agent.line_coverage import CoverageDelta, LineCoverage
 from cover_agent.runner import Runner
 from cover_agent.settings.config_loader import get_settings
 from cover_agent.settings.config_schema import CoverageType
+from cover_agent.test_file_transaction import TestFileTransaction
 from cover_agent.utils import load_yaml
+from cover_agent.validation_workspace import ValidationWorkspace
+from cover_agent.warm_pytest import WarmPytestPool, WarmPytestWorker
 from cover_agent.lsp_logic.utils.utils_indent import find_indentation_amount, find_framework
 from cover_agent.lsp_logic.utils.utils_insert_line import find_import_insert_line, find_unit_test_insert_line
 
+BATCH_JUNIT_REPORT_NAME = "cover-agent-junit.xml"
+COVERAGE_NOT_INCREASED_REASON = (
+    "Coverage did not increase. Maybe the test did run but did not increase coverage, or maybe the test execution was skipped due to some problem"
+)
+
 
 class UnitTestValidator:
     def __init__(
@@ -47,6 +60,7 @@ class UnitTestValidator:
         generate_log_files: bool = True,
         task_id: int = None,
         semaphore: asyncio.Semaphore = None,
+        execution_data_path: str = None,
     ):
         """
         Initialize the UnitTestValidator class with the provided parameters.
@@ -71,6 +85,7 @@ class UnitTestValidator:
             logger (CustomLogger, optional): The logger object for logging messages.
             generate_log_files (bool): Whether or not to generate logs.
             task_id (int): The id of the current task when using full repo mode, use for debugging. Defaults to 0.
+            execution_data_path (str, optional): The JaCoCo .exec file written alongside a JaCoCo XML report, if any.
 
         Returns:
             None
@@ -82,6 +97,7 @@ class UnitTestValidator:
         self.project_root = project_root
         self.source_file_path = source_file_path
         self.test_file_path = test_file_path
+        self.test_file = TestFileTransaction(test_file_path)
         self.code_coverage_report_path = code_coverage_report_path
         self.test_command = test_command
         self.test_command_dir = test_command_dir
@@ -120,34 +136,100 @@ class UnitTestValidator:
         self.total_output_token_count = 0
         self.testing_framework = "Unknown"
         self.code_coverage_report = ""
+        self.last_lines_covered = LineCoverage()
+        self.last_lines_missed = LineCoverage()
+        self.verified_lines_covered = LineCoverage()
+        self.session_new_lines_covered = LineCoverage()
+        self.test_coverage_deltas = []
         self.task_id = task_id
         self.semaphore = semaphore
         self.run_command_async = run_command_async 
+        self.execution_data_path = execution_data_path
+        self.source_coverage_type = coverage_type
+        self.workspaces = []
+        # Baseline coverage handed over from a shared run of the whole suite, consumed by the next run_coverage
+        self.seeded_baseline = None
+        # (test file content, source file signature, lines covered, lines missed) of the last verified run
+        self.verified_coverage_state = None
 
         # Read self.source_file_path into a string
         with open(self.source_file_path, "r") as f:
             self.source_code = f.read()
 
         # initialize the coverage processor
-        self.coverage_processor = CoverageProcessor(
-            file_path=self.code_coverage_report_path,
-            test_command_dir=self.test_command_dir,
-            src_file_path=self.source_file_path,
-            coverage_type=self.coverage_type,
+        coverage_settings = get_settings().get("coverage", {})
+        self.reuse_verified_coverage = coverage_settings.get("reuse_verified_coverage", False)
+        self.coverage_processor = self._create_coverage_processor(
+            self.coverage_type, coverage_settings, execution_data_path
+        )
+
+        # With in-process diff coverage the raw report is parsed with its own type and intersected with the
+        # changed lines, instead of running diff-cover and reading its JSON report after every test run
+        self.diff_coverage_engine = None
+        self.diff_source_processor = None
+        if self.diff_coverage and coverage_settings.get("in_process_diff", False):
+            self.diff_coverage_engine = DiffCoverageEngine(
+                comparison_branch=self.comparison_branch,
+                logger=self.logger,
+                generate_log_files=self.generate_log_files,
+            )
+            self.diff_source_processor = self._create_coverage_processor(
+                coverage_type, coverage_settings, execution_data_path
+            )
+
+    def _create_coverage_processor(
+        self, coverage_type, coverage_settings, execution_data_path, workspace: Optional[ValidationWorkspace] = None
+    ) -> CoverageProcessor:
+        """
+        Creates a CoverageProcessor for the coverage report using the [coverage] settings, reading the report
+        from the given validation workspace instead of the project when one is passed.
+        """
+        map_path = workspace.path if workspace is not None else (lambda path: path)
+        return CoverageProcessor(
+            file_path=map_path(self.code_coverage_report_path),
+            test_command_dir=map_path(self.test_command_dir),
+            src_file_path=map_path(self.source_file_path),
+            coverage_type=coverage_type,
             use_report_coverage_feature_flag=self.use_report_coverage_feature_flag,
             diff_coverage_report_path=self.diff_cover_report_path,
             generate_log_files=self.generate_log_files,
+            streaming=coverage_settings.get("streaming_parser", False),
+            build_index=coverage_settings.get("build_index", False),
+            cache_results=coverage_settings.get("cache_results", False),
+            hash_reports=coverage_settings.get("hash_reports", False),
+            execution_data_path=map_path(execution_data_path) if execution_data_path else execution_data_path,
+            incremental_aggregate=coverage_settings.get("incremental_aggregate", False),
+            parse_workers=coverage_settings.get("parse_workers", 0),
+            contexts_path=(
+                map_path(os.path.join(self.test_command_dir, coverage_settings["contexts_data_file"]))
+                if coverage_settings.get("contexts_data_file")
+                else None
+            ),
         )
 
     async def get_coverage(self):
         """
         Run code coverage and build the prompt to be used for generating tests.
 
+        The test command is not run again while the committed test file and the source file are the ones the
+        last verified run measured: rejected tests are rolled back to that content, so its coverage still holds.
+
         Returns:
             None
         """
-        # Run coverage and build the prompt
-        await self.run_coverage()
+        if self._verified_coverage_is_current():
+            _, _, lines_covered, lines_missed = self.verified_coverage_state
+            if not self.use_report_coverage_feature_flag:
+                self.code_coverage_report = self._format_coverage_report(
+                    lines_covered, lines_missed, self.current_coverage
+                )
+            self.logger.info(
+                f"Test file unchanged since the last verified coverage run, reusing its coverage: "
+                f"{round(self.current_coverage * 100, 2)}%"
+            )
+        else:
+            # Run coverage and build the prompt
+            await self.run_coverage()
         return (
             self.failed_test_runs,
             self.language,
@@ -290,6 +372,25 @@ class UnitTestValidator:
             self.logger.error(f"Error during initial test suite analysis: {e}")
             raise Exception("Error during initial test suite analysis")
 
+    def seed_baseline_coverage(self, baseline) -> bool:
+        """
+        Hands over this source file's slice of a shared baseline run, so the next run_coverage uses it instead of
+        running the test command.
+
+        Only the plain per-file mode is seeded: with the report coverage feature flag or diff coverage the
+        validator needs its own report.
+
+        Args:
+            baseline (tuple): (lines_covered, lines_missed, percentage_covered) of the source file.
+
+        Returns:
+            bool: Whether the baseline was accepted.
+        """
+        if baseline is None or self.use_report_coverage_feature_flag or self.diff_coverage:
+            return False
+        self.seeded_baseline = baseline
+        return True
+
     async def run_coverage(self):
         """
         Perform an initial build/test command to generate coverage report and get a baseline.
@@ -300,17 +401,24 @@ class UnitTestValidator:
         Returns:
         - None
         """
+        if self.seeded_baseline is not None:
+            lines_covered, lines_missed, percentage_covered = self.seeded_baseline
+            self.seeded_baseline = None
+            self.code_coverage_report = self._format_coverage_report(lines_covered, lines_missed, percentage_covered)
+            self.current_coverage = percentage_covered
+            self.last_coverage_percentages = {}
+            self.verified_lines_covered = self.last_lines_covered
+            self._record_verified_coverage()
+            self.logger.info(f"Initial coverage from the shared baseline run: {round(self.current_coverage * 100, 2)}%")
+            return
+
         # Perform an initial build/test command to generate coverage report and get a baseline
         self.logger.info(f'😡😡😡😡😡😡😡😡😡😡😡😡😡😡Running build/test command to generate coverage report: "{self.test_command}"')
         # self.logger.info(f'On the file whose content is: {self._read_file(self.test_file_path)}')
         # don't work for built tool like maven cause it's too rigid
         # if self.run_command_async == True:
-        stdout, stderr, exit_code, time_of_test_command = await Runner.async_run_command(
-            command=self.test_command,
-            max_run_time_sec=self.max_run_time_sec,
-            cwd=self.test_command_dir,
-            semaphore=self.semaphore,
-            logger=self.logger
+        stdout, stderr, exit_code, time_of_test_command = await self.run_test_command(
+            self.test_command, self.test_command_dir, semaphore=self._execution_slot()
         )
         # else:
         # stdout, stderr, exit_code, time_of_test_command = Runner.run_command(
@@ -324,9 +432,11 @@ class UnitTestValidator:
 
         try:
             # Process the extracted coverage metrics
-            coverage, coverage_percentages = self.post_process_coverage_report(time_of_test_command)
+            coverage, coverage_percentages = await self.apost_process_coverage_report(time_of_test_command)
             self.current_coverage = coverage
-            self.last_coverage_percentages = coverage_percentages.copy()
+            self._keep_coverage_percentages(coverage_percentages)
+            self.verified_lines_covered = self.last_lines_covered
+            self._record_verified_coverage()
             self.logger.info(f"Initial coverage: {round(self.current_coverage * 100, 2)}%")
 
         except AssertionError as error:
@@ -382,6 +492,137 @@ class UnitTestValidator:
 
         return "\n".join(out_str_parts)
 
+    def build_test_candidate(
+        self, generated_test: dict, original_content: str, insert_tests_after: Optional[int] = None
+    ) -> Optional[tuple]:
+        """
+        Builds the content of the test file with a generated test and its new imports inserted.
+
+        Parameters:
+            generated_test (dict): The generated test, containing test code and additional imports.
+            original_content (str): The current content of the test file.
+            insert_tests_after (int, optional): The line to insert the test after. Defaults to
+                relevant_line_number_to_insert_tests_after.
+
+        Returns:
+            tuple: (processed_test, additional_imports_lines), or None if there is nothing to insert or no
+            insertion point is known.
+        """
+        # Step 0: no pre-process.
+        # We asked the model that each generated test should be a self-contained independent test
+        test_code = generated_test.get("test_code", "").rstrip()
+        additional_imports = generated_test.get("new_imports_code", "").strip()
+        if additional_imports and additional_imports[0] == '"' and additional_imports[-1] == '"':
+            additional_imports = additional_imports.strip('"')
+
+        # check if additional_imports only contains '"':
+        if additional_imports and additional_imports == '""':
+            additional_imports = ""
+        relevant_line_number_to_insert_tests_after = (
+            self.relevant_line_number_to_insert_tests_after if insert_tests_after is None else insert_tests_after
+        )
+        relevant_line_number_to_insert_imports_after = self.relevant_line_number_to_insert_imports_after
+
+        needed_indent = self.test_headers_indentation
+        # remove initial indent of the test code, and insert the needed indent
+        test_code_indented = test_code
+        if needed_indent:
+            initial_indent = len(test_code) - len(test_code.lstrip())
+            delta_indent = int(needed_indent) - initial_indent
+            if delta_indent > 0:
+                test_code_indented = "\n".join([delta_indent * " " + line for line in test_code.split("\n")])
+        test_code_indented = "\n" + test_code_indented.strip("\n") + "\n"
+        if not (test_code_indented and relevant_line_number_to_insert_tests_after):
+            return None
+
+        # Step 1: Insert imports first, then insert the generated test code
+        additional_imports_lines = []
+        original_content_lines = original_content.split("\n")
+
+        # Build a deduplicated list of import lines
+        if additional_imports:
+            raw_import_lines = additional_imports.split("\n")
+            for line in raw_import_lines:
+                # Only add if it's not already present (stripped match) in the file
+                if line.strip() and all(line.strip() != existing.strip() for existing in original_content_lines):
+                    additional_imports_lines.append(line)
+
+        inserted_lines_count = 0
+        if relevant_line_number_to_insert_imports_after and additional_imports_lines:
+            inserted_lines_count = len(additional_imports_lines)
+            original_content_lines = (
+                original_content_lines[:relevant_line_number_to_insert_imports_after]
+                + additional_imports_lines
+                + original_content_lines[relevant_line_number_to_insert_imports_after:]
+            )
+
+        # Offset the test insertion point by however many lines we just inserted
+        updated_test_insertion_point = relevant_line_number_to_insert_tests_after
+        if inserted_lines_count > 0:
+            updated_test_insertion_point += inserted_lines_count
+
+        # Now insert the test code at 'updated_test_insertion_point'
+        test_code_lines = test_code_indented.split("\n")
+        processed_test_lines = (
+            original_content_lines[:updated_test_insertion_point]
+            + test_code_lines
+            + original_content_lines[updated_test_insertion_point:]
+        )
+        return "\n".join(processed_test_lines), additional_imports_lines
+
+    def _execution_slot(self, command: str = None, isolated: bool = False):
+        """
+        The semaphore to hold while running a test command: the pool of the adaptive concurrency controller for
+        the kind of command, or the plain semaphore this validator was given. isolated tells a run in a
+        validation workspace from one in the project checkout.
+        """
+        if isinstance(self.semaphore, AdaptiveConcurrencyController):
+            return self.semaphore.pool_for(command or self.test_command, isolated=isolated)
+        return self.semaphore
+
+    async def run_test_command(self, command: str, cwd: str, semaphore: asyncio.Semaphore = None):
+        """
+        Runs a test command with the time limit of this validator, and the resource limits and output capture
+        of the [tests] settings.
+
+        Returns:
+            CommandResult: The result of the run, unpacking as (stdout, stderr, exit_code, time_of_test_command).
+        """
+        test_settings = get_settings().get("tests", {})
+        return await Runner.async_run_command(
+            command=command,
+            cwd=cwd,
+            max_run_time_sec=self.max_run_time_sec,
+            semaphore=semaphore,
+            logger=self.logger,
+            memory_limit_mb=test_settings.get("memory_limit_mb", 0) or None,
+            cpu_limit_sec=test_settings.get("cpu_limit_sec", 0) or None,
+            max_output_bytes=test_settings.get("max_output_bytes", 0) or None,
+            spill_dir=test_settings.get("output_spill_dir", "") or None,
+            warm_worker=self._warm_worker(test_settings),
+        )
+
+    def _warm_worker(self, test_settings) -> Optional[WarmPytestPool]:
+        """The warm pytest workers of this project when [tests] warm_pytest is enabled and the platform can fork."""
+        if not test_settings.get("warm_pytest", False) or not WarmPytestWorker.supported():
+            return None
+        return WarmPytestWorker.for_project(
+            self.project_root or self.test_command_dir,
+            test_settings.get("warm_pytest_python", "python"),
+            list(test_settings.get("warm_pytest_preload", [])),
+            size=test_settings.get("warm_pytest_workers", 2),
+            logger=self.logger,
+        )
+
+    @staticmethod
+    def _run_failure_reason(run_result) -> str:
+        """The rejection reason of a failed run, telling a timed out or crashed test from a failing one."""
+        if getattr(run_result, "timed_out", False):
+            return "Test timed out"
+        if getattr(run_result, "crashed", False):
+            return "Test crashed"
+        return "Test failed"
+
     async def validate_test(self, generated_test: dict):
         """
         Validate a generated test by inserting it into the test file, running the test, and checking for pass/fail.
@@ -410,87 +651,23 @@ class UnitTestValidator:
             13. Log additional details and error messages for failed tests, and optionally, use the Trace class for detailed logging if 'WANDB_API_KEY' is present in the environment variables.
         """
         # Store original content of the test file
-        with open(self.test_file_path, "r") as test_file:
-            original_content = test_file.read()
+        original_content = self.test_file.content
 
-        async with self.semaphore:
+        async with self._execution_slot():
             try:
-                # Step 0: no pre-process.
-                # We asked the model that each generated test should be a self-contained independent test
-                test_code = generated_test.get("test_code", "").rstrip()
-                additional_imports = generated_test.get("new_imports_code", "").strip()
-                if additional_imports and additional_imports[0] == '"' and additional_imports[-1] == '"':
-                    additional_imports = additional_imports.strip('"')
-
-                # check if additional_imports only contains '"':
-                if additional_imports and additional_imports == '""':
-                    additional_imports = ""
-                relevant_line_number_to_insert_tests_after = self.relevant_line_number_to_insert_tests_after
-                relevant_line_number_to_insert_imports_after = self.relevant_line_number_to_insert_imports_after
-
-                needed_indent = self.test_headers_indentation
-                # remove initial indent of the test code, and insert the needed indent
-                test_code_indented = test_code
-                if needed_indent:
-                    initial_indent = len(test_code) - len(test_code.lstrip())
-                    delta_indent = int(needed_indent) - initial_indent
-                    if delta_indent > 0:
-                        test_code_indented = "\n".join([delta_indent * " " + line for line in test_code.split("\n")])
-                test_code_indented = "\n" + test_code_indented.strip("\n") + "\n"
                 exit_code = 0
-                if test_code_indented and relevant_line_number_to_insert_tests_after:
-                    # Step 1: Insert imports first, then insert the generated test code
-                    additional_imports_lines = []
-                    original_content_lines = original_content.split("\n")
-
-                    # Build a deduplicated list of import lines
-                    if additional_imports:
-                        raw_import_lines = additional_imports.split("\n")
-                        for line in raw_import_lines:
-                            # Only add if it's not already present (stripped match) in the file
-                            if line.strip() and all(
-                                line.strip() != existing.strip() for existing in original_content_lines
-                            ):
-                                additional_imports_lines.append(line)
-
-                    inserted_lines_count = 0
-                    if relevant_line_number_to_insert_imports_after and additional_imports_lines:
-                        inserted_lines_count = len(additional_imports_lines)
-                        original_content_lines = (
-                            original_content_lines[:relevant_line_number_to_insert_imports_after]
-                            + additional_imports_lines
-                            + original_content_lines[relevant_line_number_to_insert_imports_after:]
-                        )
-
-                    # Offset the test insertion point by however many lines we just inserted
-                    updated_test_insertion_point = relevant_line_number_to_insert_tests_after
-                    if inserted_lines_count > 0:
-                        updated_test_insertion_point += inserted_lines_count
-
-                    # Now insert the test code at 'updated_test_insertion_point'
-                    test_code_lines = test_code_indented.split("\n")
-                    processed_test_lines = (
-                        original_content_lines[:updated_test_insertion_point]
-                        + test_code_lines
-                        + original_content_lines[updated_test_insertion_point:]
-                    )
-                    processed_test = "\n".join(processed_test_lines)
+                candidate = self.build_test_candidate(generated_test, original_content)
+                if candidate:
+                    processed_test, additional_imports_lines = candidate
                     self.logger.info(f"Final content to be written to test file:\n{processed_test}")
-                    with open(self.test_file_path, "w") as test_file:
-                        test_file.write(processed_test)
-                        test_file.flush()
+                    self.test_file.write(processed_test)
 
                     # Step 2: Run the test using the Runner class
                     for i in range(self.num_attempts):
                         self.logger.info(f'Running test with the following command: "{self.test_command}"')
                         # if self.run_command_async == True:
-                        stdout, stderr, exit_code, time_of_test_command = await Runner.async_run_command(
-                            command=self.test_command,
-                            cwd=self.test_command_dir,
-                            max_run_time_sec=self.max_run_time_sec,
-                            # semaphore=self.semaphore,
-                            logger=self.logger
-                        )
+                        run_result = await self.run_test_command(self.test_command, self.test_command_dir)
+                        stdout, stderr, exit_code, time_of_test_command = run_result
                         # else:
                         # stdout, stderr, exit_code, time_of_test_command = Runner.run_command(
                         #     command=self.test_command,
@@ -503,105 +680,49 @@ class UnitTestValidator:
                     # Step 3: Check for pass/fail from the Runner object
                     if exit_code != 0:
                         # Test failed, roll back the test file to its original content
-                        with open(self.test_file_path, "w") as test_file:
-                            test_file.write(original_content)
-                            test_file.flush()
+                        self.test_file.rollback()
                         self.logger.info(f"Skipping a generated test that failed")
-                        fail_details = {
-                            "status": "FAIL",
-                            "reason": "Test failed",
-                            "exit_code": exit_code,
-                            "stderr": stderr,
-                            "stdout": stdout,
-                            "test": generated_test,
-                            "language": self.language,
-                            "source_file": self.source_code,
-                            "original_test_file": original_content,
-                            "processed_test_file": processed_test,
-                        }
-
-                        error_message = await self.extract_error_message(fail_details)
-                        # error_message = await self.extract_output_message(fail_details)
-                        if error_message:
-                            logging.error(f"Error message summary:\n{error_message}")
-
-                        self.failed_test_runs.append(
-                            {"code": generated_test, "error_message": error_message}
-                        )  # Append failure details to the list
-
-                        if "WANDB_API_KEY" in os.environ:
-                            fail_details["error_message"] = error_message
-                            root_span = Trace(
-                                name="fail_details_" + datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S"),
-                                kind="llm",  # kind can be "llm", "chain", "agent" or "tool
-                                inputs={"test_code": fail_details["test"]},
-                                outputs=fail_details,
-                            )
-                            root_span.log(name="inference")
-
-                        return fail_details
+                        fail_details = self._fail_details(
+                            self._run_failure_reason(run_result),
+                            exit_code,
+                            stderr,
+                            stdout,
+                            generated_test,
+                            original_content,
+                            processed_test,
+                        )
+                        return await self._reject_failed_test(fail_details)
 
                     # If test passed, check for coverage increase
                     try:
-                        new_percentage_covered, new_coverage_percentages = self.post_process_coverage_report(
+                        new_percentage_covered, new_coverage_percentages = await self.apost_process_coverage_report(
                             time_of_test_command
                         )
+                        coverage_delta = self.compute_coverage_delta()
 
-                        if new_percentage_covered <= self.current_coverage:
+                        if not self.coverage_increased(coverage_delta, new_percentage_covered):
                             # Coverage has not increased, rollback the test by removing it from the test file
-                            with open(self.test_file_path, "w") as test_file:
-                                test_file.write(original_content)
-                                test_file.flush()
+                            self.test_file.rollback()
                             self.logger.info("Test did not increase coverage. Rolling back.")
-                            fail_details = {
-                                "status": "FAIL",
-                                "reason": "Coverage did not increase. Maybe the test did run but did not increase coverage, or maybe the test execution was skipped due to some problem",
-                                "exit_code": exit_code,
-                                "stderr": stderr,
-                                "stdout": stdout,
-                                "test": generated_test,
-                                "language": self.language,
-                                "source_file": self.source_code,
-                                "original_test_file": original_content,
-                                "processed_test_file": processed_test,
-                            }
-                            self.failed_test_runs.append(
-                                {
-                                    "code": fail_details["test"],
-                                    "error_message": "Test did not increase code coverage",
-                                }
-                            )  # Append failure details to the list
-
-                            if "WANDB_API_KEY" in os.environ:
-                                root_span = Trace(
-                                    name="fail_details_" + datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S"),
-                                    kind="llm",  # kind can be "llm", "chain", "agent" or "tool
-                                    inputs={"test_code": fail_details["test"]},
-                                    outputs=fail_details,
-                                )
-                                root_span.log(name="inference")
-
-                            return fail_details
+                            fail_details = self._fail_details(
+                                COVERAGE_NOT_INCREASED_REASON,
+                                exit_code,
+                                stderr,
+                                stdout,
+                                generated_test,
+                                original_content,
+                                processed_test,
+                            )
+                            return self._reject_test_without_coverage_increase(fail_details)
                     except Exception as e:
                         # Handle errors gracefully
                         self.logger.error(f"Error during coverage verification: {e}")
                         # roll back even in case of error
-                        with open(self.test_file_path, "w") as test_file:
-                            test_file.write(original_content)
-                            test_file.flush()
-
-                        fail_details = {
-                            "status": "FAIL",
-                            "reason": "Runtime error",
-                            "exit_code": exit_code,
-                            "stderr": stderr,
-                            "stdout": stdout,
-                            "test": generated_test,
-                            "language": self.language,
-                            "source_file": self.source_code,
-                            "original_test_file": original_content,
-                            "processed_test_file": processed_test,
-                        }
+                        self.test_file.rollback()
+
+                        fail_details = self._fail_details(
+                            "Runtime error", exit_code, stderr, stdout, generated_test, original_content, processed_test
+                        )
                         self.failed_test_runs.append(
                             {
                                 "code": fail_details["test"],
@@ -610,26 +731,17 @@ class UnitTestValidator:
                         )  # Append failure details to the list
                         return fail_details
 
-                    # If we got here, everything passed and coverage increased - update current coverage and log success,
+                    # If we got here, everything passed and coverage increased - keep the test, update current coverage and log success,
+                    self.test_file.commit()
                     # and increase 'relevant_line_number_to_insert_tests_after' by the number of imports lines added
                     self.relevant_line_number_to_insert_tests_after += len(
                         additional_imports_lines
                     )  # this is important, otherwise the next test will be inserted at the wrong line
 
-                    for key in new_coverage_percentages:
-                        if (
-                            new_coverage_percentages[key] > self.last_coverage_percentages[key]
-                            and key == self.source_file_path.split("/")[-1]
-                        ):
-                            self.logger.info(
-                                f"Coverage for provided source file: {key} increased from {round(self.last_coverage_percentages[key] * 100, 2)} to {round(new_coverage_percentages[key] * 100, 2)}"
-                            )
-                        elif new_coverage_percentages[key] > self.last_coverage_percentages[key]:
-                            self.logger.info(
-                                f"Coverage for non-source file: {key} increased from {round(self.last_coverage_percentages[key] * 100, 2)} to {round(new_coverage_percentages[key] * 100, 2)}"
-                            )
+                    self._log_coverage_increase(new_coverage_percentages)
                     self.current_coverage = new_percentage_covered
-                    self.last_coverage_percentages = new_coverage_percentages.copy()
+                    self._keep_coverage_percentages(new_coverage_percentages)
+                    new_lines_covered = self.record_coverage_delta(generated_test, coverage_delta)
 
                     self.logger.info(
                         f"Test passed and coverage increased. Current coverage: {round(new_percentage_covered * 100, 2)}%"
@@ -645,12 +757,11 @@ class UnitTestValidator:
                         "source_file": self.source_code,
                         "original_test_file": original_content,
                         "processed_test_file": processed_test,
+                        "new_lines_covered": new_lines_covered,
                     }
             except Exception as e:
                 self.logger.error(f"Error validating test: {e}")
-                with open(self.test_file_path, "w") as test_file:
-                    test_file.write(original_content)
-                    test_file.flush()
+                self.test_file.rollback()
                 return {
                     "status": "FAIL",
                     "reason": f"Error validating test: {e}",
@@ -665,6 +776,611 @@ class UnitTestValidator:
                 }
 
 
+    async def validate_tests(self, generated_tests: list) -> list:
+        """
+        Validates a batch of generated tests, in parallel validation workspaces when the [validation]
+        settings allow more than one worker, otherwise one after another with validate_test.
+
+        Parameters:
+            generated_tests (list): The generated tests to validate.
+
+        Returns:
+            list: The validation result of each test, in the order of generated_tests.
+        """
+        validation_settings = get_settings().get("validation", {})
+        if validation_settings.get("batch", False) and self._supports_batch_validation(generated_tests):
+            return await self.validate_tests_in_batch(generated_tests)
+        parallel_workers = validation_settings.get("parallel_workers", 1)
+        if parallel_workers > 1 and len(generated_tests) > 1 and self._supports_workspace_validation():
+            return await self.validate_tests_in_workspaces(generated_tests, parallel_workers)
+        return [await self.validate_test(test) for test in generated_tests]
+
+    def _batch_test_command(self) -> Optional[tuple]:
+        """
+        Returns the command that runs the tests with a per-test JUnit XML report, and the report's path.
+
+        A configured [validation] junit_report_path is read as written by the test command itself (e.g.
+        target/surefire-reports). Otherwise pytest commands get a --junitxml option; other commands are not
+        batched.
+        """
+        junit_report_path = get_settings().get("validation", {}).get("junit_report_path", "")
+        if junit_report_path:
+            return self.test_command, os.path.join(self.test_command_dir, junit_report_path)
+        if "pytest" in self.test_command:
+            junit_report_path = os.path.join(self.test_command_dir, BATCH_JUNIT_REPORT_NAME)
+            return f"{self.test_command} --junitxml={junit_report_path}", junit_report_path
+        return None
+
+    @staticmethod
+    def _batch_test_name(generated_test: dict) -> str:
+        """The name a generated test is reported under in a JUnit XML report."""
+        return generated_test.get("test_name", "").strip().split(".")[-1].split("(")[0]
+
+    def attribute_test_coverage(self, test_names: list) -> Optional[list]:
+        """
+        Splits the coverage of the latest run between tests using the per-test coverage it recorded.
+
+        Each test is credited, in order, with the lines it covered that neither the verified state nor an earlier
+        test in test_names covered. With in-process diff coverage only changed lines count.
+
+        Parameters:
+            test_names (list): The names of the tests, in the order they are to be credited.
+
+        Returns:
+            list: A CoverageDelta per test, or None when the run has no per-test coverage for every test or the
+            coverage mode is not line based.
+        """
+        if self.use_report_coverage_feature_flag or (self.diff_coverage and self.diff_coverage_engine is None):
+            return None
+        processor = self.diff_source_processor if self.diff_coverage_engine is not None else self.coverage_processor
+        contexts = processor.parse_test_contexts()
+        if not contexts or not all(name in contexts for name in test_names):
+            return None
+
+        seen_lines_covered = self.verified_lines_covered
+        test_deltas = []
+        for name in test_names:
+            lines_covered = contexts[name]
+            if self.diff_coverage_engine is not None:
+                lines_covered = lines_covered & self.diff_coverage_engine.changed_lines_for(self.source_file_path)
+            test_deltas.append(CoverageDelta.between(seen_lines_covered, seen_lines_covered | lines_covered))
+            seen_lines_covered = seen_lines_covered | lines_covered
+        return test_deltas
+
+    def _supports_batch_validation(self, generated_tests: list) -> bool:
+        """Batching needs a JUnit XML report and a distinct name for every test to attribute outcomes by."""
+        names = [self._batch_test_name(test) for test in generated_tests]
+        return (
+            len(generated_tests) > 1
+            and bool(self.relevant_line_number_to_insert_tests_after)
+            and all(names)
+            and len(set(names)) == len(names)
+            and self._batch_test_command() is not None
+        )
+
+    def _merge_tests(self, generated_tests: list, original_content: str) -> tuple:
+        """
+        Inserts several generated tests into the test file content, in order.
+
+        Returns:
+            tuple: (merged_content, insert_tests_after), where insert_tests_after is the insertion line for the
+            next test once the merged tests are accepted.
+        """
+        merged_content = original_content
+        insert_tests_after = self.relevant_line_number_to_insert_tests_after
+        for generated_test in generated_tests:
+            merged_content, additional_imports_lines = self.build_test_candidate(
+                generated_test, merged_content, insert_tests_after
+            )
+            insert_tests_after += len(additional_imports_lines)
+        return merged_content, insert_tests_after
+
+    async def validate_tests_in_batch(self, generated_tests: list) -> list:
+        """
+        Validates generated tests optimistically with a single run of the test command.
+
+        All tests are inserted into the test file and run together with a JUnit XML report. Tests the report
+        marks as failed are dropped and the survivors are run again, until a run passes. If the passing run
+        recorded per-test coverage, each surviving test is accepted by the lines it adds (see
+        attribute_test_coverage), otherwise the run's coverage decides for the survivors as a group. When a failing run cannot be attributed to
+        any of the tests, e.g. because the test file no longer compiles, the remaining tests are validated one
+        by one with validate_test.
+
+        Parameters:
+            generated_tests (list): The generated tests to validate.
+
+        Returns:
+            list: The validation result of each test, in the order of generated_tests.
+        """
+        original_content = self.test_file.content
+
+        batch_command, junit_report_path = self._batch_test_command()
+        names = [self._batch_test_name(test) for test in generated_tests]
+        results = [None] * len(generated_tests)
+        failed = []
+        survivors = list(range(len(generated_tests)))
+        unattributed = False
+        async with self._execution_slot():
+            while survivors:
+                merged_content, insert_tests_after = self._merge_tests(
+                    [generated_tests[index] for index in survivors], original_content
+                )
+                self.logger.info(f"Final content to be written to test file:\n{merged_content}")
+                self.test_file.write(merged_content)
+
+                for i in range(self.num_attempts):
+                    if os.path.isfile(junit_report_path):
+                        os.remove(junit_report_path)
+                    self.logger.info(
+                        f'Running {len(survivors)} tests with the following command: "{batch_command}"'
+                    )
+                    stdout, stderr, exit_code, time_of_test_command = await self.run_test_command(
+                        batch_command, self.test_command_dir
+                    )
+                    if exit_code != 0:
+                        break
+                if exit_code == 0:
+                    break
+
+                outcomes = parse_junit_report(junit_report_path, modified_since=time_of_test_command / 1000) or {}
+                failing = [index for index in survivors if names[index] in outcomes and not outcomes[names[index]].passed]
+                if not failing:
+                    unattributed = True
+                    break
+                self.logger.info(f"Dropping failed tests from the batch: {', '.join(names[index] for index in failing)}")
+                for index in failing:
+                    failed.append(
+                        (
+                            index,
+                            self._fail_details(
+                                "Test failed",
+                                exit_code,
+                                outcomes[names[index]].message or stderr,
+                                stdout,
+                                generated_tests[index],
+                                original_content,
+                                merged_content,
+                            ),
+                        )
+                    )
+                survivors = [index for index in survivors if index not in failing]
+
+            test_deltas = None
+            if survivors and not unattributed:
+                try:
+                    new_percentage_covered, new_coverage_percentages = await self.apost_process_coverage_report(
+                        time_of_test_command
+                    )
+                    coverage_delta = self.compute_coverage_delta()
+                    increased = self.coverage_increased(coverage_delta, new_percentage_covered)
+                    if increased:
+                        test_deltas = await asyncio.to_thread(
+                            self.attribute_test_coverage, [names[index] for index in survivors]
+                        )
+                    error = None
+                except Exception as e:
+                    self.logger.error(f"Error during coverage verification: {e}")
+                    increased, error = False, e
+
+            if test_deltas is not None:
+                # Per-test coverage of the same run decides for each test by the lines it adds to earlier ones
+                redundant = [index for index, delta in zip(survivors, test_deltas) if not delta.increased]
+                test_deltas = [delta for delta in test_deltas if delta.increased]
+                survivors = [index for index in survivors if index not in redundant]
+                for index in redundant:
+                    self.logger.info(f"Test {names[index]} did not cover new lines. Rolling back.")
+                    fail_details = self._fail_details(
+                        COVERAGE_NOT_INCREASED_REASON,
+                        exit_code,
+                        stderr,
+                        stdout,
+                        generated_tests[index],
+                        original_content,
+                        merged_content,
+                    )
+                    results[index] = self._reject_test_without_coverage_increase(fail_details)
+                if redundant:
+                    merged_content, insert_tests_after = self._merge_tests(
+                        [generated_tests[index] for index in survivors], original_content
+                    )
+                    self.test_file.write(merged_content)
+
+            if not survivors or unattributed or not increased:
+                self.test_file.rollback()
+            else:
+                self.test_file.commit()
+
+        for index, fail_details in failed:
+            results[index] = await self._reject_failed_test(fail_details)
+        if not survivors:
+            return results
+        if unattributed:
+            self.logger.info(
+                f"Could not attribute the failed batch run to a test, validating {len(survivors)} tests one by one"
+            )
+            for index in survivors:
+                results[index] = await self.validate_test(generated_tests[index])
+            return results
+
+        for index in survivors:
+            fail_details = self._fail_details(
+                "", exit_code, stderr, stdout, generated_tests[index], original_content, merged_content
+            )
+            if error is not None:
+                fail_details["reason"] = "Runtime error"
+                self.failed_test_runs.append(
+                    {"code": generated_tests[index], "error_message": "Coverage verification error"}
+                )  # Append failure details to the list
+                results[index] = fail_details
+            elif not increased:
+                self.logger.info("Tests did not increase coverage. Rolling back.")
+                fail_details["reason"] = COVERAGE_NOT_INCREASED_REASON
+                results[index] = self._reject_test_without_coverage_increase(fail_details)
+        if not increased:
+            return results
+
+        self.relevant_line_number_to_insert_tests_after = insert_tests_after
+        self._log_coverage_increase(new_coverage_percentages)
+        self.current_coverage = new_percentage_covered
+        self._keep_coverage_percentages(new_coverage_percentages)
+        if test_deltas is None:
+            # Without per-test coverage the batch run does not tell which of the surviving tests covered which
+            # lines, so the coverage delta is recorded for the group
+            new_lines_covered = self.record_coverage_delta(
+                {"test_name": ", ".join(names[index] for index in survivors)}, coverage_delta
+            )
+        for position, index in enumerate(survivors):
+            if test_deltas is not None:
+                new_lines_covered = self.record_coverage_delta(generated_tests[index], test_deltas[position])
+            results[index] = {
+                "status": "PASS",
+                "reason": "",
+                "exit_code": exit_code,
+                "stderr": stderr,
+                "stdout": stdout,
+                "test": generated_tests[index],
+                "language": self.language,
+                "source_file": self.source_code,
+                "original_test_file": original_content,
+                "processed_test_file": merged_content,
+                "new_lines_covered": new_lines_covered,
+            }
+        self.logger.info(
+            f"{len(survivors)} tests passed and increased coverage. Current coverage: {round(new_percentage_covered * 100, 2)}%"
+        )
+        return results
+
+    def _supports_workspace_validation(self) -> bool:
+        """
+        Workspaces need every path the test run touches to live under the project root, and a coverage mode
+        whose result can be read from the workspace's own report: whole-report mode and diff-cover's JSON
+        report are validated sequentially.
+        """
+        if not self.project_root or not self.relevant_line_number_to_insert_tests_after:
+            return False
+        if self.use_report_coverage_feature_flag or (self.diff_coverage and self.diff_coverage_engine is None):
+            return False
+        project_root = os.path.abspath(self.project_root)
+        paths = [self.test_file_path, self.test_command_dir, self.code_coverage_report_path, self.source_file_path]
+        return all(os.path.commonpath([project_root, os.path.abspath(path)]) == project_root for path in paths)
+
+    def _create_workspaces(self, count: int):
+        """Creates validation workspaces, each with its own coverage processor, until there are count of them."""
+        validation_settings = get_settings().get("validation", {})
+        coverage_settings = get_settings().get("coverage", {})
+        raw_coverage_type = self.source_coverage_type if self.diff_coverage else self.coverage_type
+        while len(self.workspaces) < count:
+            workspace = ValidationWorkspace(
+                self.project_root,
+                ignore_patterns=validation_settings.get("workspace_ignore", []),
+                link_patterns=validation_settings.get("workspace_link", []),
+                logger=self.logger,
+                generate_log_files=self.generate_log_files,
+            )
+            processor = self._create_coverage_processor(
+                raw_coverage_type, coverage_settings, self.execution_data_path, workspace=workspace
+            )
+            self.workspaces.append((workspace, processor))
+
+    def cleanup_workspaces(self):
+        """Removes the validation workspaces created by validate_tests_in_workspaces."""
+        for workspace, _ in self.workspaces:
+            workspace.cleanup()
+        self.workspaces = []
+
+    async def validate_tests_in_workspaces(self, generated_tests: list, parallel_workers: int) -> list:
+        """
+        Validates generated tests concurrently, each in a scratch copy of the project.
+
+        Every candidate is inserted into the current test file and run in a free workspace, without holding the
+        semaphore since the real test file is not touched. The candidates are then merged in order: a passing
+        candidate is accepted if it covers a line not covered by the verified state or by an earlier accepted
+        candidate. The accepted tests are written into the real test file together and verified with a single
+        run. If that run fails or does not increase coverage, the accepted tests are validated one by one.
+
+        Parameters:
+            generated_tests (list): The generated tests to validate.
+            parallel_workers (int): The maximum number of candidates to run at once.
+
+        Returns:
+            list: The validation result of each test, in the order of generated_tests.
+        """
+        original_content = self.test_file.content
+
+        # Bring in what changed in the project since the last batch, e.g. tests accepted by other agents
+        await asyncio.gather(*(asyncio.to_thread(workspace.refresh) for workspace, _ in self.workspaces))
+        self._create_workspaces(min(parallel_workers, len(generated_tests)))
+        free_workspaces = asyncio.Queue()
+        for workspace in self.workspaces:
+            free_workspaces.put_nowait(workspace)
+
+        async def run_in_free_workspace(generated_test):
+            workspace = await free_workspaces.get()
+            try:
+                return await self._run_candidate_in_workspace(generated_test, original_content, *workspace)
+            finally:
+                free_workspaces.put_nowait(workspace)
+
+        outcomes = await asyncio.gather(*(run_in_free_workspace(test) for test in generated_tests))
+
+        # Merge in order, so the outcome matches validating the candidates one after another
+        results = [None] * len(generated_tests)
+        accepted = []
+        seen_lines_covered = self.verified_lines_covered
+        best_percentage_covered = self.current_coverage
+        for index, (generated_test, outcome) in enumerate(zip(generated_tests, outcomes)):
+            fail_details = self._fail_details(
+                "",
+                outcome["exit_code"],
+                outcome["stderr"],
+                outcome["stdout"],
+                generated_test,
+                original_content,
+                outcome["processed_test"],
+            )
+            if outcome["exit_code"] != 0:
+                self.logger.info(f"Skipping a generated test that failed")
+                fail_details["reason"] = outcome["failure_reason"]
+                results[index] = await self._reject_failed_test(fail_details)
+                continue
+            if "error" in outcome:
+                self.logger.error(f"Error during coverage verification: {outcome['error']}")
+                fail_details["reason"] = "Runtime error"
+                self.failed_test_runs.append(
+                    {"code": generated_test, "error_message": "Coverage verification error"}
+                )  # Append failure details to the list
+                results[index] = fail_details
+                continue
+
+            lines_covered, lines_missed, percentage_covered = outcome["coverage"]
+            if lines_covered or lines_missed:
+                coverage_delta = CoverageDelta.between(seen_lines_covered, lines_covered)
+                increased = coverage_delta.increased
+            else:
+                coverage_delta = None
+                increased = percentage_covered > best_percentage_covered
+            if not increased:
+                self.logger.info("Test did not increase coverage. Rolling back.")
+                fail_details["reason"] = COVERAGE_NOT_INCREASED_REASON
+                results[index] = self._reject_test_without_coverage_increase(fail_details)
+                continue
+
+            accepted.append((index, outcome, coverage_delta))
+            seen_lines_covered = seen_lines_covered | lines_covered
+            best_percentage_covered = max(best_percentage_covered, percentage_covered)
+
+        if not accepted:
+            return results
+
+        merged_content, insert_tests_after = self._merge_tests(
+            [generated_tests[index] for index, _, _ in accepted], original_content
+        )
+
+        verified = await self._verify_merged_tests(merged_content, original_content)
+        if verified is None:
+            self.logger.info(
+                f"Merged tests did not verify in the project, validating the {len(accepted)} accepted tests one by one"
+            )
+            for index, _, _ in accepted:
+                results[index] = await self.validate_test(generated_tests[index])
+            return results
+
+        new_percentage_covered, new_coverage_percentages = verified
+        self.relevant_line_number_to_insert_tests_after = insert_tests_after
+        self._log_coverage_increase(new_coverage_percentages)
+        self.current_coverage = new_percentage_covered
+        self._keep_coverage_percentages(new_coverage_percentages)
+        for index, outcome, coverage_delta in accepted:
+            new_lines_covered = self.record_coverage_delta(generated_tests[index], coverage_delta)
+            results[index] = {
+                "status": "PASS",
+                "reason": "",
+                "exit_code": outcome["exit_code"],
+                "stderr": outcome["stderr"],
+                "stdout": outcome["stdout"],
+                "test": generated_tests[index],
+                "language": self.language,
+                "source_file": self.source_code,
+                "original_test_file": original_content,
+                "processed_test_file": outcome["processed_test"],
+                "new_lines_covered": new_lines_covered,
+            }
+        self.logger.info(
+            f"{len(accepted)} tests passed and increased coverage. Current coverage: {round(new_percentage_covered * 100, 2)}%"
+        )
+        return results
+
+    async def _run_candidate_in_workspace(
+        self, generated_test: dict, original_content: str, workspace: ValidationWorkspace, processor: CoverageProcessor
+    ) -> dict:
+        """
+        Runs a single candidate in a workspace.
+
+        Returns:
+            dict: The processed test, exit code, stdout and stderr of the run and, for a passing run, either the
+            (lines_covered, lines_missed, percentage) of the source file under "coverage" or the exception raised
+            while reading it under "error".
+        """
+        # The whole test file is rewritten from the committed content, so a candidate never sees an earlier one
+        processed_test, _ = self.build_test_candidate(generated_test, original_content)
+        with open(workspace.path(self.test_file_path), "w") as test_file:
+            test_file.write(processed_test)
+
+        command = workspace.command(self.test_command)
+        for i in range(self.num_attempts):
+            self.logger.info(f'Running test in {workspace.root} with the following command: "{command}"')
+            # Workspace runs never touch the real test file, only the adaptive controller's load limits apply
+            pool = (
+                self._execution_slot(command, isolated=True)
+                if isinstance(self.semaphore, AdaptiveConcurrencyController)
+                else None
+            )
+            run_result = await self.run_test_command(command, workspace.path(self.test_command_dir), semaphore=pool)
+            stdout, stderr, exit_code, time_of_test_command = run_result
+            if exit_code != 0:
+                break
+
+        outcome = {
+            "processed_test": processed_test,
+            "exit_code": exit_code,
+            "stdout": stdout,
+            "stderr": stderr,
+            "failure_reason": self._run_failure_reason(run_result),
+        }
+        if exit_code != 0:
+            return outcome
+        try:
+            lines_covered, lines_missed, percentage_covered = await processor.aprocess_coverage_report(
+                time_of_test_command=time_of_test_command
+            )
+            if self.diff_coverage_engine is not None:
+                lines_covered, lines_missed, percentage_covered = self.diff_coverage_engine.evaluate(
+                    self.source_file_path, lines_covered, lines_missed
+                )
+            outcome["coverage"] = (
+                LineCoverage.coerce(lines_covered),
+                LineCoverage.coerce(lines_missed),
+                percentage_covered,
+            )
+        except Exception as e:
+            outcome["error"] = e
+        return outcome
+
+    async def _verify_merged_tests(self, merged_content: str, original_content: str):
+        """
+        Writes the merged tests into the real test file and runs them once.
+
+        Returns:
+            tuple: (percentage_covered, coverage_percentages) of the verification run, or None if the run failed
+            or did not increase coverage, in which case the test file is rolled back.
+        """
+        async with self._execution_slot():
+            self.logger.info(f"Final content to be written to test file:\n{merged_content}")
+            self.test_file.write(merged_content)
+            try:
+                _, _, exit_code, time_of_test_command = await self.run_test_command(
+                    self.test_command, self.test_command_dir
+                )
+                if exit_code == 0:
+                    verified = await self.apost_process_coverage_report(time_of_test_command)
+                    if self.coverage_increased(self.compute_coverage_delta(), verified[0]):
+                        self.test_file.commit()
+                        return verified
+            except Exception as e:
+                self.logger.error(f"Error verifying merged tests: {e}")
+
+            self.test_file.rollback()
+            return None
+
+    def _keep_coverage_percentages(self, new_coverage_percentages: dict):
+        """
+        Keeps the per-file percentages of an accepted test as the ones later tests are compared against. With
+        the incremental aggregate only the entries of files changed since the last accepted test are updated.
+        """
+        aggregate = self.coverage_processor.aggregate
+        if aggregate is not None and new_coverage_percentages is aggregate.percentages:
+            aggregate.sync_percentages(self.last_coverage_percentages)
+        else:
+            self.last_coverage_percentages = new_coverage_percentages.copy()
+
+    def _log_coverage_increase(self, new_coverage_percentages: dict):
+        """Logs the files whose coverage increased since the last accepted test."""
+        aggregate = self.coverage_processor.aggregate
+        incremental = aggregate is not None and new_coverage_percentages is aggregate.percentages
+        changed_keys = list(aggregate.unsynced) if incremental else new_coverage_percentages
+        for key in changed_keys:
+            if key not in new_coverage_percentages or key not in self.last_coverage_percentages:
+                continue
+            if (
+                new_coverage_percentages[key] > self.last_coverage_percentages[key]
+                and key == self.source_file_path.split("/")[-1]
+            ):
+                self.logger.info(
+                    f"Coverage for provided source file: {key} increased from {round(self.last_coverage_percentages[key] * 100, 2)} to {round(new_coverage_percentages[key] * 100, 2)}"
+                )
+            elif new_coverage_percentages[key] > self.last_coverage_percentages[key]:
+                self.logger.info(
+                    f"Coverage for non-source file: {key} increased from {round(self.last_coverage_percentages[key] * 100, 2)} to {round(new_coverage_percentages[key] * 100, 2)}"
+                )
+
+    def _fail_details(
+        self, reason, exit_code, stderr, stdout, generated_test, original_content, processed_test
+    ) -> dict:
+        """Builds the result of a rejected test."""
+        return {
+            "status": "FAIL",
+            "reason": reason,
+            "exit_code": exit_code,
+            "stderr": stderr,
+            "stdout": stdout,
+            "test": generated_test,
+            "language": self.language,
+            "source_file": self.source_code,
+            "original_test_file": original_content,
+            "processed_test_file": processed_test,
+        }
+
+    async def _reject_failed_test(self, fail_details: dict) -> dict:
+        """Summarizes the error of a test that failed to run and records it for the next generation prompt."""
+        error_message = await self.extract_error_message(fail_details)
+        # error_message = await self.extract_output_message(fail_details)
+        if error_message:
+            logging.error(f"Error message summary:\n{error_message}")
+
+        self.failed_test_runs.append(
+            {"code": fail_details["test"], "error_message": error_message}
+        )  # Append failure details to the list
+
+        if "WANDB_API_KEY" in os.environ:
+            fail_details["error_message"] = error_message
+            self._trace_failure(fail_details)
+
+        return fail_details
+
+    def _reject_test_without_coverage_increase(self, fail_details: dict) -> dict:
+        """Records a passing test that did not increase coverage for the next generation prompt."""
+        self.failed_test_runs.append(
+            {
+                "code": fail_details["test"],
+                "error_message": "Test did not increase code coverage",
+            }
+        )  # Append failure details to the list
+
+        if "WANDB_API_KEY" in os.environ:
+            self._trace_failure(fail_details)
+
+        return fail_details
+
+    @staticmethod
+    def _trace_failure(fail_details: dict):
+        root_span = Trace(
+            name="fail_details_" + datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S"),
+            kind="llm",  # kind can be "llm", "chain", "agent" or "tool
+            inputs={"test_code": fail_details["test"]},
+            outputs=fail_details,
+        )
+        root_span.log(name="inference")
+
     def to_dict(self):
         return {
             "source_file_path": self.source_file_path,
@@ -740,25 +1456,71 @@ class UnitTestValidator:
             return ""
 
     def post_process_coverage_report(self, time_of_test_command):
-        coverage_percentages = {}
+        return self._summarize_coverage_report(self._load_coverage_report(time_of_test_command))
+
+    async def apost_process_coverage_report(self, time_of_test_command):
+        """
+        Async counterpart of post_process_coverage_report used from the test runs, so that parsing a large
+        report happens in the coverage processor's pool instead of blocking the event loop shared with other agents.
+        """
+        report = await self._aload_coverage_report(time_of_test_command)
+        return self._summarize_coverage_report(report)
+
+    def _load_coverage_report(self, time_of_test_command):
+        """Parses the coverage report for the configured mode (whole report, diff coverage or source file)."""
+        if self.use_report_coverage_feature_flag:
+            self.logger.info("Using the report coverage feature flag to process the coverage report")
+            return self.coverage_processor.process_coverage_report(time_of_test_command=time_of_test_command)
+        if self.diff_coverage and self.diff_coverage_engine is not None:
+            return self.process_diff_coverage(time_of_test_command)
+        if self.diff_coverage:
+            self.generate_diff_coverage_report()
+        return self.coverage_processor.process_coverage_report(time_of_test_command=time_of_test_command)
+
+    async def _aload_coverage_report(self, time_of_test_command):
+        """Async counterpart of _load_coverage_report."""
         if self.use_report_coverage_feature_flag:
             self.logger.info("Using the report coverage feature flag to process the coverage report")
-            file_coverage_dict = self.coverage_processor.process_coverage_report(
+            return await self.coverage_processor.aprocess_coverage_report(time_of_test_command=time_of_test_command)
+        if self.diff_coverage and self.diff_coverage_engine is not None:
+            lines_covered, lines_missed, _ = await self.diff_source_processor.aprocess_coverage_report(
                 time_of_test_command=time_of_test_command
             )
-            total_lines_covered = 0
-            total_lines_missed = 0
-            total_lines = 0
-            for key in file_coverage_dict:
-                lines_covered, lines_missed, percentage_covered = file_coverage_dict[key]
-                total_lines_covered += len(lines_covered)
-                total_lines_missed += len(lines_missed)
-                total_lines += len(lines_covered) + len(lines_missed)
-                if key == self.source_file_path:
-                    self.last_source_file_coverage = percentage_covered
-                if key not in coverage_percentages:
-                    coverage_percentages[key] = 0
-                coverage_percentages[key] = percentage_covered
+            return self.diff_coverage_engine.evaluate(self.source_file_path, lines_covered, lines_missed)
+        if self.diff_coverage:
+            await asyncio.to_thread(self.generate_diff_coverage_report)
+        return await self.coverage_processor.aprocess_coverage_report(time_of_test_command=time_of_test_command)
+
+    def _summarize_coverage_report(self, report):
+        """
+        Turns a parsed coverage report into the overall percentage and, with the report coverage feature flag,
+        the per-file percentages. For a single file the prompt report is refreshed as well.
+        """
+        coverage_percentages = {}
+        if self.use_report_coverage_feature_flag:
+            file_coverage_dict = report
+            if isinstance(file_coverage_dict, CoverageAggregate):
+                # Running totals, only the files that changed since the last report were re-parsed
+                total_lines_covered = file_coverage_dict.total_covered
+                total_lines_missed = file_coverage_dict.total_missed
+                total_lines = file_coverage_dict.total_lines
+                coverage_percentages = file_coverage_dict.percentages
+                if self.source_file_path in coverage_percentages:
+                    self.last_source_file_coverage = coverage_percentages[self.source_file_path]
+            else:
+                total_lines_covered = 0
+                total_lines_missed = 0
+                total_lines = 0
+                for key in file_coverage_dict:
+                    lines_covered, lines_missed, percentage_covered = file_coverage_dict[key]
+                    total_lines_covered += len(lines_covered)
+                    total_lines_missed += len(lines_missed)
+                    total_lines += len(lines_covered) + len(lines_missed)
+                    if key == self.source_file_path:
+                        self.last_source_file_coverage = percentage_covered
+                    if key not in coverage_percentages:
+                        coverage_percentages[key] = 0
+                    coverage_percentages[key] = percentage_covered
             try:
                 percentage_covered = total_lines_covered / total_lines
             except ZeroDivisionError:
@@ -771,19 +1533,127 @@ class UnitTestValidator:
                 f"Total lines covered: {total_lines_covered}, Total lines missed: {total_lines_missed}, Total lines: {total_lines}"
             )
             self.logger.info(f"coverage: Percentage {round(percentage_covered * 100, 2)}%")
-        elif self.diff_coverage:
-            self.generate_diff_coverage_report()
-            lines_covered, lines_missed, percentage_covered = self.coverage_processor.process_coverage_report(
-                time_of_test_command=time_of_test_command
-            )
-            self.code_coverage_report = f"Lines covered: {lines_covered}\nLines missed: {lines_missed}\nPercentage covered: {round(percentage_covered * 100, 2)}%"
         else:
-            lines_covered, lines_missed, percentage_covered = self.coverage_processor.process_coverage_report(
-                time_of_test_command=time_of_test_command
-            )
-            self.code_coverage_report = f"Lines covered: {lines_covered}\nLines missed: {lines_missed}\nPercentage covered: {round(percentage_covered * 100, 2)}%"
+            lines_covered, lines_missed, percentage_covered = report
+            self.code_coverage_report = self._format_coverage_report(lines_covered, lines_missed, percentage_covered)
         return percentage_covered, coverage_percentages
 
+    def _format_coverage_report(self, lines_covered, lines_missed, percentage_covered) -> str:
+        """
+        Stores the latest covered/missed bitmaps and renders them for the test generation prompt as line ranges,
+        e.g. "12-40,55", instead of one number per line.
+
+        Once tests have been accepted in this session, only the lines they newly covered are listed next to the
+        missed lines, rather than re-sending the full covered list on every iteration.
+        """
+        self.last_lines_covered = LineCoverage.coerce(lines_covered)
+        self.last_lines_missed = LineCoverage.coerce(lines_missed)
+        if self.session_new_lines_covered:
+            covered_section = f"Lines newly covered by accepted tests: {self.session_new_lines_covered.to_ranges()}\n"
+        else:
+            covered_section = f"Lines covered: {self.last_lines_covered.to_ranges()}\n"
+        return (
+            covered_section
+            + f"Lines missed: {self.last_lines_missed.to_ranges()}\n"
+            + f"Percentage covered: {round(percentage_covered * 100, 2)}%"
+        )
+
+    def _record_verified_coverage(self):
+        """Remembers the latest run as the coverage of the committed test file, for get_coverage to reuse."""
+        try:
+            test_file_content = self.test_file.content
+        except OSError:
+            self.verified_coverage_state = None
+            return
+        self.verified_coverage_state = (
+            test_file_content,
+            self._file_signature(self.source_file_path),
+            self.last_lines_covered,
+            self.last_lines_missed,
+        )
+
+    def _verified_coverage_is_current(self) -> bool:
+        """
+        Whether the last verified run still describes the project: the test file holds the committed content it
+        measured, e.g. no rollback was left half done, and the source file is unchanged.
+        """
+        if not self.reuse_verified_coverage or self.verified_coverage_state is None or self.test_file.pending:
+            return False
+        test_file_content, source_signature, _, _ = self.verified_coverage_state
+        try:
+            return (
+                self.test_file.content == test_file_content
+                and self._file_signature(self.source_file_path) == source_signature
+            )
+        except OSError:
+            return False
+
+    @staticmethod
+    def _file_signature(path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def compute_coverage_delta(self) -> Optional[CoverageDelta]:
+        """
+        Diffs the lines covered by the latest coverage run against the last verified state.
+
+        Returns:
+            CoverageDelta: The lines gained and lost for the source file, or None when the report has no
+            line-level data for it (e.g. JaCoCo CSV or whole-report mode), in which case callers fall back
+            to comparing percentages.
+        """
+        if self.use_report_coverage_feature_flag or not (self.last_lines_covered or self.last_lines_missed):
+            return None
+        return CoverageDelta.between(self.verified_lines_covered, self.last_lines_covered)
+
+    def coverage_increased(self, coverage_delta: Optional[CoverageDelta], new_percentage_covered: float) -> bool:
+        """
+        Decides whether the latest run improved coverage: by newly covered lines when line data is available,
+        otherwise by the overall percentage.
+        """
+        if coverage_delta is not None:
+            return coverage_delta.increased
+        return new_percentage_covered > self.current_coverage
+
+    def record_coverage_delta(self, generated_test: dict, coverage_delta: Optional[CoverageDelta]) -> str:
+        """
+        Records the lines an accepted test newly covered and promotes the latest run to the verified state.
+
+        Returns:
+            str: The newly covered lines as ranges, or an empty string when no line data is available.
+        """
+        self.verified_lines_covered = self.last_lines_covered
+        self._record_verified_coverage()
+        if coverage_delta is None:
+            return ""
+
+        self.session_new_lines_covered = self.session_new_lines_covered | coverage_delta.newly_covered
+        new_lines_covered = coverage_delta.newly_covered.to_ranges()
+        self.test_coverage_deltas.append(
+            {"test_name": generated_test.get("test_name", ""), "new_lines_covered": new_lines_covered}
+        )
+        self.logger.info(f"Test {generated_test.get('test_name', '')} newly covered lines: {new_lines_covered}")
+        return new_lines_covered
+
+    def process_diff_coverage(self, time_of_test_command: int):
+        """
+        Computes diff coverage in-process by intersecting the freshly parsed coverage report with the lines
+        changed against the comparison branch, which are read from git only once per session.
+
+        Args:
+            time_of_test_command (int): The time the test command was run, in milliseconds.
+
+        Returns:
+            Tuple[LineCoverage, LineCoverage, float]: The covered and missed changed lines, and the diff coverage percentage.
+        """
+        lines_covered, lines_missed, _ = self.diff_source_processor.process_coverage_report(
+            time_of_test_command=time_of_test_command
+        )
+        return self.diff_coverage_engine.evaluate(self.source_file_path, lines_covered, lines_missed)
+
     def generate_diff_coverage_report(self):
         """
         Generates a JSON diff coverage report using the diff-cover tool.
@@ -357,6 +357,28 @@ def parse_args_full_repo(settings: Dynaconf) -> argparse.Namespace:
         default=False,
         help="Suppress all generated log files (HTML, logs, DB files).",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="Resume an interrupted run from its journal, skipping the test files it completed. Default: False.",
+    )
+    parser.add_argument(
+        "--role",
+        choices=["single", "coordinator", "worker"],
+        default="single",
+        help=(
+            "single processes every test file in this process. coordinator finds the context of the test files and "
+            "puts them on a work queue for worker processes, each running in its own checkout of the project. "
+            "Default: %(default)s."
+        ),
+    )
+    parser.add_argument(
+        "--queue-path",
+        default=None,
+        help="The SQLite work queue shared by the coordinator and its workers. Required with --role coordinator "
+        "and --role worker.",
+    )
 
     # Create mutually exclusive group
     group = parser.add_mutually_exclusive_group()
@@ -378,7 +400,10 @@ def parse_args_full_repo(settings: Dynaconf) -> argparse.Namespace:
         ),
     )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.role != "single" and not args.queue_path:
+        parser.error("--queue-path is required with --role coordinator and --role worker")
+    return args
 
 
 def find_test_files(args: argparse.Namespace) -> list[Union[str, Path]]:
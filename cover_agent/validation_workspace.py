@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+from typing import Iterable, List, Optional, Tuple
+
+from cover_agent.custom_logger import CustomLogger
+
+
+class ValidationWorkspace:
+    """
+    A scratch copy of the project that a generated test can be run in without touching the real test file.
+
+    Several workspaces let candidate tests run concurrently: each candidate is written into its own copy of
+    the test file, runs its own test command and produces its own coverage report. The workspace is created
+    once and reused for later candidates; the test file is rewritten before each run, and refresh() brings in
+    the files changed in the project since, such as tests other agents accepted.
+
+    Build outputs and version control directories are not copied. Environments such as virtualenvs and
+    node_modules are linked rather than copied, so test commands that use them work unchanged.
+    """
+
+    def __init__(
+        self,
+        project_root: str,
+        ignore_patterns: Iterable[str] = (),
+        link_patterns: Iterable[str] = (),
+        logger: Optional[CustomLogger] = None,
+        generate_log_files: bool = True,
+    ):
+        """
+        Copies the project into a new temporary directory.
+
+        Args:
+            project_root (str): The directory to copy. Paths under it are mapped into the workspace.
+            ignore_patterns (Iterable[str]): Glob patterns of files and directories not to copy, e.g. ".git".
+            link_patterns (Iterable[str]): Glob patterns of files and directories symlinked into the workspace
+                instead of copied, e.g. ".venv".
+            logger (CustomLogger, optional): The logger object for logging messages.
+            generate_log_files (bool): Whether or not to generate logs.
+        """
+        self.project_root = os.path.abspath(project_root)
+        self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
+        self.root = os.path.join(tempfile.mkdtemp(prefix="cover-agent-workspace-"), os.path.basename(self.project_root))
+        self._ignore_patterns = shutil.ignore_patterns(*ignore_patterns)
+        self._link_patterns = shutil.ignore_patterns(*link_patterns)
+        # Project file -> (mtime_ns, size) when it was last copied into the workspace
+        self._copied = {}
+        links = []
+
+        def ignore(directory: str, names: List[str]) -> set:
+            ignored, linked = self._excluded(directory, names)
+            links.extend(os.path.join(directory, name) for name in linked)
+            return ignored | linked
+
+        shutil.copytree(self.project_root, self.root, symlinks=True, ignore=ignore, copy_function=self._copy)
+        for source in links:
+            os.symlink(source, self.path(source))
+        self.logger.info(f"Created validation workspace {self.root} from {self.project_root}")
+
+    def _excluded(self, directory: str, names: List[str]) -> Tuple[set, set]:
+        """The names in a project directory that are not copied, and those of them that are linked instead."""
+        ignored = set(self._ignore_patterns(directory, names))
+        linked = set(self._link_patterns(directory, names)) - ignored
+        return ignored, linked
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _copy(self, source: str, destination: str):
+        shutil.copy2(source, destination)
+        self._copied[source] = self._signature(source)
+
+    def refresh(self) -> int:
+        """
+        Copies the project files created or changed since they were copied into the workspace, and removes those
+        deleted from the project. Files only written in the workspace, like coverage reports, are left alone.
+
+        Returns:
+            int: The number of files copied or removed.
+        """
+        refreshed = 0
+        seen = set()
+        for directory, dirnames, filenames in os.walk(self.project_root):
+            ignored, linked = self._excluded(directory, dirnames + filenames)
+            dirnames[:] = [name for name in dirnames if name not in ignored and name not in linked]
+            for name in filenames:
+                source = os.path.join(directory, name)
+                if name in ignored or name in linked or os.path.islink(source):
+                    continue
+                seen.add(source)
+                if self._copied.get(source) != self._signature(source):
+                    os.makedirs(os.path.dirname(self.path(source)), exist_ok=True)
+                    self._copy(source, self.path(source))
+                    refreshed += 1
+        for source in [source for source in self._copied if source not in seen]:
+            del self._copied[source]
+            if os.path.lexists(self.path(source)):
+                os.remove(self.path(source))
+            refreshed += 1
+        if refreshed:
+            self.logger.info(f"Refreshed {refreshed} files of validation workspace {self.root}")
+        return refreshed
+
+    def contains(self, path: str) -> bool:
+        """Returns True if path lies inside the project root and can therefore be mapped into the workspace."""
+        return os.path.commonpath([self.project_root, os.path.abspath(path)]) == self.project_root
+
+    def path(self, path: str) -> str:
+        """
+        Maps a path in the project to the same path in the workspace.
+
+        Args:
+            path (str): A path inside the project root.
+
+        Returns:
+            str: The corresponding absolute path inside the workspace.
+
+        Raises:
+            ValueError: If the path is outside the project root.
+        """
+        if not self.contains(path):
+            raise ValueError(f"{path} is outside the project root {self.project_root}")
+        return os.path.join(self.root, os.path.relpath(os.path.abspath(path), self.project_root))
+
+    def command(self, command: str) -> str:
+        """Rewrites absolute paths to the project root in a shell command so they point into the workspace."""
+        return command.replace(self.project_root, self.root)
+
+    def cleanup(self):
+        """Removes the workspace directory."""
+        shutil.rmtree(os.path.dirname(self.root), ignore_errors=True)
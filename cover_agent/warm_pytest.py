@@ -0,0 +1,332 @@
+import asyncio
+import json
+import os
+import shlex
+import signal
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from cover_agent.custom_logger import CustomLogger
+from cover_agent.runner import TIMEOUT_EXIT_CODE, TIMEOUT_MESSAGE, CommandResult, OutputCapture
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warm_pytest_server.py")
+
+# Characters that make a test command more than a plain pytest invocation
+_SHELL_OPERATORS = set("|&;<>()$`")
+
+
+class WarmPytestWorker:
+    """
+    A long-lived pytest process that runs test commands in freshly forked children.
+
+    Interpreter start-up, pytest's plugin imports and the configured heavy imports (e.g. a web framework) are
+    paid once, when the worker starts, instead of on every test run. Only third-party modules may be loaded in
+    the worker: a project module imported before coverage starts would lose the coverage of its module level
+    lines, so a worker that loaded one is not used.
+
+    Whenever a module file loaded by the worker changes on disk, e.g. after a dependency was reinstalled, the
+    worker is stopped, that run goes the cold path and the next run starts a new worker. Commands other than a
+    plain pytest invocation always go the cold path.
+
+    A worker runs one test command at a time; WarmPytestPool spreads concurrent runs over several workers.
+    """
+
+    _shared: Dict[tuple, "WarmPytestPool"] = {}
+
+    def __init__(
+        self,
+        project_root: str,
+        python: str = "python",
+        preload: Tuple[str, ...] = (),
+        logger: Optional[CustomLogger] = None,
+        generate_log_files: bool = True,
+    ):
+        """
+        Args:
+            project_root (str): The project's directory. Module files below it, outside installed packages, may
+                not be loaded by the worker.
+            python (str): The project's Python interpreter.
+            preload (Tuple[str, ...]): Modules to import when the worker starts.
+            logger (CustomLogger, optional): The logger object for logging messages.
+            generate_log_files (bool): Whether or not to generate logs.
+        """
+        self.project_root = os.path.abspath(project_root)
+        self.python = python
+        self.preload = tuple(preload)
+        self.logger = logger or CustomLogger.get_logger(__name__, generate_log_files=generate_log_files)
+        self.process = None
+        self.disabled = False
+        self._module_mtimes = {}
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def for_project(
+        cls, project_root: str, python: str, preload: List[str], size: int = 2, **kwargs
+    ) -> "WarmPytestPool":
+        """
+        Returns the pool of workers shared by every validator of a project with the same interpreter and preloads.
+
+        Args:
+            size (int): The number of workers the pool starts at most, when it is first created.
+        """
+        key = (os.path.abspath(project_root), python, tuple(preload))
+        if key not in cls._shared:
+            cls._shared[key] = WarmPytestPool(project_root, python, tuple(preload), size=size, **kwargs)
+        return cls._shared[key]
+
+    @classmethod
+    async def stop_all(cls):
+        """Stops the workers of every shared pool."""
+        for pool in cls._shared.values():
+            await pool.stop()
+        cls._shared = {}
+
+    @property
+    def busy(self) -> bool:
+        """Whether the worker is starting or running a test command."""
+        return self._lock.locked()
+
+    @staticmethod
+    def supported() -> bool:
+        """Whether the platform can fork, which the worker needs."""
+        return hasattr(os, "fork")
+
+    @staticmethod
+    def pytest_args(command: str) -> Optional[Tuple[List[str], bool]]:
+        """
+        Extracts the pytest arguments of a plain "pytest ..." or "python -m pytest ..." command.
+
+        Returns:
+            tuple: (arguments, prepend_cwd), where prepend_cwd tells whether the command was "python -m pytest",
+            which puts the working directory on sys.path. None for any other command.
+        """
+        if any(character in _SHELL_OPERATORS for character in command):
+            return None
+        try:
+            tokens = shlex.split(command)
+        except ValueError:
+            return None
+        if tokens and os.path.basename(tokens[0]) == "pytest":
+            return tokens[1:], False
+        if len(tokens) >= 3 and os.path.basename(tokens[0]).startswith("python") and tokens[1:3] == ["-m", "pytest"]:
+            return tokens[3:], True
+        return None
+
+    async def start(self) -> bool:
+        """Starts the worker and waits until its imports are loaded. Returns False if it cannot be used."""
+        self.process = await asyncio.create_subprocess_exec(
+            self.python,
+            SERVER_SCRIPT,
+            *self.preload,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=self.project_root,
+        )
+        ready = await self._receive()
+        if not ready or not ready.get("ready"):
+            self.logger.warning(f"Warm pytest worker could not start: {(ready or {}).get('error', 'no response')}")
+            self.disabled = True
+            await self.stop()
+            return False
+        for failure in ready.get("failed", []):
+            self.logger.warning(f"Warm pytest worker could not preload {failure}")
+
+        project_modules = [
+            path
+            for path in ready["modules"]
+            if path.startswith(self.project_root + os.sep) and "site-packages" not in path.split(os.sep)
+        ]
+        if project_modules:
+            self.logger.warning(
+                f"Warm pytest worker loaded project modules, which would miss their import-time coverage; "
+                f"using cold test runs instead: {', '.join(project_modules[:5])}"
+            )
+            self.disabled = True
+            await self.stop()
+            return False
+
+        self._module_mtimes = {path: self._mtime(path) for path in ready["modules"]}
+        self.logger.info(f"Started warm pytest worker with {len(self._module_mtimes)} modules loaded.")
+        return True
+
+    async def stop(self):
+        """Stops the worker; it exits once its stdin is closed."""
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        if process.returncode is None:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def import_graph_changed(self) -> bool:
+        """Whether a module file loaded by the worker was modified, added back or removed since it started."""
+        return any(self._mtime(path) != mtime for path, mtime in self._module_mtimes.items())
+
+    async def _receive(self) -> Optional[dict]:
+        line = await self.process.stdout.readline()
+        return json.loads(line) if line else None
+
+    async def run(
+        self,
+        command: str,
+        cwd: str,
+        max_run_time_sec: Optional[int] = None,
+        max_output_bytes: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        cpu_limit_sec: Optional[int] = None,
+    ) -> Optional[CommandResult]:
+        """
+        Runs a pytest command in a forked child of the worker.
+
+        Args:
+            command (str): The test command.
+            cwd (str): The working directory of the test run.
+            max_run_time_sec (int, optional): Time limit of the run, after which the child's process group is killed.
+            max_output_bytes (int, optional): Keep at most this many bytes of stdout and of stderr.
+            memory_limit_mb (int, optional): Address space limit (RLIMIT_AS) for the child, in megabytes.
+            cpu_limit_sec (int, optional): CPU time limit (RLIMIT_CPU) for the child, in seconds.
+
+        Returns:
+            CommandResult: The result of the run, or None if the command has to take the cold path.
+        """
+        parsed = self.pytest_args(command)
+        if parsed is None or self.disabled:
+            return None
+        args, prepend_cwd = parsed
+
+        async with self._lock:
+            if self.process is not None and self.import_graph_changed():
+                self.logger.info("Modules loaded by the warm pytest worker changed, restarting it.")
+                await self.stop()
+                return None
+            if self.process is None or self.process.returncode is not None:
+                if not await self.start():
+                    return None
+
+            with tempfile.TemporaryDirectory(prefix="cover-agent-warm-") as output_dir:
+                stdout_path = os.path.join(output_dir, "stdout")
+                stderr_path = os.path.join(output_dir, "stderr")
+                request = {
+                    "args": args,
+                    "cwd": os.path.abspath(cwd or self.project_root),
+                    "prepend_cwd": prepend_cwd,
+                    "stdout_path": stdout_path,
+                    "stderr_path": stderr_path,
+                    "memory_limit_mb": memory_limit_mb,
+                    "cpu_limit_sec": cpu_limit_sec,
+                }
+                command_start_time = int(time.time() * 1000)
+                started = time.monotonic()
+                self.process.stdin.write((json.dumps(request) + "\n").encode())
+                await self.process.stdin.drain()
+
+                forked = await self._receive()
+                finished, timed_out = None, False
+                if forked is not None:
+                    try:
+                        finished = await asyncio.wait_for(self._receive(), timeout=max_run_time_sec)
+                    except asyncio.TimeoutError:
+                        timed_out = True
+                        self.logger.warning(f"Command '{command}' exceeded {max_run_time_sec} seconds, killing it.")
+                        try:
+                            os.killpg(forked["pid"], signal.SIGKILL)
+                        except (ProcessLookupError, PermissionError):
+                            pass
+                        finished = await self._receive()
+                if finished is None:
+                    self.logger.warning("Warm pytest worker exited unexpectedly, using a cold test run.")
+                    await self.stop()
+                    return None
+
+                stdout = self._read_output(stdout_path, max_output_bytes)
+                stderr_capture = self._read_output(stderr_path, max_output_bytes)
+
+        exit_code = finished["exit_code"]
+        stderr = stderr_capture.getvalue()
+        if timed_out:
+            stderr = f"{stderr}\n{TIMEOUT_MESSAGE}" if stderr else TIMEOUT_MESSAGE
+        return CommandResult(
+            stdout=stdout.getvalue(),
+            stderr=stderr,
+            exit_code=TIMEOUT_EXIT_CODE if timed_out else exit_code,
+            command_start_time=command_start_time,
+            timed_out=timed_out,
+            signal=-exit_code if exit_code < 0 and not timed_out else None,
+            duration_sec=time.monotonic() - started,
+            output_truncated=stdout.truncated or stderr_capture.truncated,
+        )
+
+    @staticmethod
+    def _read_output(path: str, max_output_bytes: Optional[int]) -> OutputCapture:
+        capture = OutputCapture(max_output_bytes)
+        with open(path, "rb") as output_file:
+            for chunk in iter(lambda: output_file.read(65536), b""):
+                capture.write(chunk)
+        return capture
+
+
+class WarmPytestPool:
+    """
+    Up to size warm pytest workers of a project, so concurrent test runs do not queue behind a single worker.
+
+    A run takes an idle worker, starting a new one while fewer than size were started. When every worker is
+    busy the run goes the cold path instead of waiting for one.
+    """
+
+    def __init__(
+        self, project_root: str, python: str = "python", preload: Tuple[str, ...] = (), size: int = 2, **kwargs
+    ):
+        """
+        Args:
+            project_root (str): The project's directory.
+            python (str): The project's Python interpreter.
+            preload (Tuple[str, ...]): Modules every worker imports when it starts.
+            size (int): The number of workers started at most.
+            **kwargs: Passed on to each WarmPytestWorker.
+        """
+        self.project_root = project_root
+        self.python = python
+        self.preload = tuple(preload)
+        self.size = max(1, size)
+        self.workers: List[WarmPytestWorker] = []
+        self._worker_kwargs = kwargs
+
+    @property
+    def disabled(self) -> bool:
+        """Whether the workers cannot be used, e.g. because the preloads import project modules."""
+        return any(worker.disabled for worker in self.workers)
+
+    async def run(self, command: str, cwd: str, **kwargs) -> Optional[CommandResult]:
+        """
+        Runs a pytest command in an idle worker, see WarmPytestWorker.run.
+
+        Returns:
+            CommandResult: The result of the run, or None if the command has to take the cold path.
+        """
+        if self.disabled:
+            return None
+        worker = next((worker for worker in self.workers if not worker.busy), None)
+        if worker is None:
+            if len(self.workers) >= self.size:
+                return None
+            worker = WarmPytestWorker(self.project_root, self.python, self.preload, **self._worker_kwargs)
+            self.workers.append(worker)
+        return await worker.run(command, cwd, **kwargs)
+
+    async def stop(self):
+        """Stops every worker of the pool."""
+        for worker in self.workers:
+            await worker.stop()
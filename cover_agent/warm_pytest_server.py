@@ -0,0 +1,122 @@
+"""
+Warm pytest worker, started by cover_agent.warm_pytest.WarmPytestWorker with the project's Python interpreter.
+
+The worker imports pytest, its plugins and the requested modules once, then forks a fresh child for every
+test run, so each run starts with those imports already loaded. Coverage is never started in the worker
+itself: the child starts it through pytest-cov as a cold run would.
+
+Requests and responses are JSON objects, one per line, on stdin and on the file descriptor the worker was
+started with as stdout. This script only uses the standard library, as it runs outside cover-agent's
+environment.
+"""
+
+import importlib
+import json
+import os
+import sys
+import traceback
+
+
+def _loaded_module_files() -> list:
+    files = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.exists(path):
+            files.add(os.path.abspath(path))
+    return sorted(files)
+
+
+def _preload_plugins() -> list:
+    """Imports the modules of installed pytest plugins, which pytest would otherwise import on every run."""
+    failed = []
+    try:
+        from importlib.metadata import entry_points
+
+        plugins = entry_points(group="pytest11")
+    except Exception:
+        return failed
+    for plugin in plugins:
+        try:
+            importlib.import_module(plugin.value.split(":")[0])
+        except Exception as e:
+            failed.append(f"{plugin.value}: {e}")
+    return failed
+
+
+def _apply_limits(memory_limit_mb, cpu_limit_sec):
+    """The same resource limits cover_agent.runner applies to a cold test run."""
+    if not memory_limit_mb and not cpu_limit_sec:
+        return
+    import resource
+
+    if memory_limit_mb:
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_limit_sec:
+        resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_limit_sec), int(cpu_limit_sec) + 1))
+
+
+def _run_child(request: dict):
+    code = 3
+    try:
+        os.setsid()
+        os.chdir(request["cwd"])
+        null = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null, 0)
+        for fd, path in ((1, request["stdout_path"]), (2, request["stderr_path"])):
+            out = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            os.dup2(out, fd)
+        _apply_limits(request.get("memory_limit_mb"), request.get("cpu_limit_sec"))
+        if request.get("prepend_cwd"):
+            # Like "python -m pytest", which puts the working directory on sys.path
+            sys.path.insert(0, os.getcwd())
+        import pytest
+
+        sys.argv = ["pytest"] + request["args"]
+        code = int(pytest.main(request["args"]))
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def main():
+    # Keep a private channel for responses, and send anything printed by the worker itself to stderr
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+
+    def send(message: dict):
+        protocol.write(json.dumps(message) + "\n")
+
+    try:
+        import pytest  # noqa: F401
+    except ImportError as e:
+        send({"ready": False, "error": str(e)})
+        return
+
+    failed = _preload_plugins()
+    for name in sys.argv[1:]:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            failed.append(f"{name}: {e}")
+    send({"ready": True, "modules": _loaded_module_files(), "failed": failed})
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        pid = os.fork()
+        if pid == 0:
+            _run_child(request)
+        send({"pid": pid})
+        _, status = os.waitpid(pid, 0)
+        exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        send({"exit_code": exit_code})
+
+
+if __name__ == "__main__":
+    # The directory of this script is not part of the project, keep its modules from shadowing the project's
+    if sys.path and os.path.abspath(sys.path[0] or ".") == os.path.dirname(os.path.abspath(__file__)):
+        sys.path.pop(0)
+    main()
@@ -0,0 +1,310 @@
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Union
+
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String, Text, create_engine, select, update
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+
+from cover_agent.custom_logger import CustomLogger
+
+
+Base = declarative_base()
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+
+
+class WorkUnit(Base):
+    """A test file of a distributed full-repo run, with the context the coordinator found for it."""
+
+    __tablename__ = "work_units"
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer)
+    # Paths inside the project are relative to the project root, so every worker resolves them in its own checkout
+    test_file = Column(Text, unique=True)
+    test_file_content = Column(Text)
+    source_file = Column(Text)
+    included_files = Column(Text)
+    all_included_files = Column(Text)
+    input_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+    priority = Column(Float, default=0.0)
+    status = Column(String, default=PENDING, index=True)
+    attempts = Column(Integer, default=0)
+    worker = Column(String)
+    claim = Column(String, index=True)
+    heartbeat_at = Column(DateTime)
+    result = Column(Text)
+    result_content = Column(Text)
+    reported = Column(Boolean, default=False)
+
+    @property
+    def context(self) -> dict:
+        """The context in the form find_test_file_context returns it, with paths still relative."""
+        return {
+            "source_file": self.source_file,
+            "included_files": json.loads(self.included_files or "[]"),
+            "all_included_files": [tuple(entry) for entry in json.loads(self.all_included_files or "[]")],
+            "input_tokens": self.input_tokens or 0,
+            "output_tokens": self.output_tokens or 0,
+        }
+
+    @property
+    def result_tuple(self) -> Optional[tuple]:
+        return tuple(json.loads(self.result)) if self.result else None
+
+
+class WorkQueueState(Base):
+    __tablename__ = "work_queue_state"
+    id = Column(Integer, primary_key=True)
+    closed = Column(Boolean, default=False)
+
+
+class WorkQueue:
+    """
+    SQLite-backed queue of the test files of a distributed full-repo run.
+
+    The coordinator puts one unit per test file, with its context and a priority, and closes the queue once
+    every test file is in. Workers claim the pending unit with the highest priority with a single UPDATE, so
+    two workers never get the same unit, and complete it with the result tuple of process_test_file and the
+    content the test file ended with. A worker touches the heartbeat of its running units from a task of its
+    own while it processes them; units of a worker that stopped touching them go back to pending, up to
+    max_attempts times.
+    """
+
+    def __init__(self, path: str, reset: bool = False, busy_timeout_sec: float = 30.0):
+        """
+        Args:
+            path (str): The SQLite database file. Must be on a file system every worker can lock, for workers on
+                other hosts.
+            reset (bool): Drop the units of an earlier run.
+            busy_timeout_sec (float): How long a write waits for the lock held by another process.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": busy_timeout_sec})
+        if reset:
+            Base.metadata.drop_all(self.engine)
+        Base.metadata.create_all(self.engine)
+        self.Session = scoped_session(sessionmaker(bind=self.engine, expire_on_commit=False))
+
+    @staticmethod
+    def relative(path: Optional[Union[str, Path]], project_root: str) -> Optional[str]:
+        """The path as stored in the queue: relative to the project root when inside it."""
+        if not path:
+            return None
+        path = os.path.abspath(path)
+        relative = os.path.relpath(path, project_root)
+        return path if relative.startswith(os.pardir) else relative
+
+    @staticmethod
+    def absolute(path: Optional[str], project_root: str) -> Optional[str]:
+        """A path stored in the queue, inside the given checkout of the project."""
+        if not path:
+            return None
+        return os.path.normpath(os.path.join(project_root, path))
+
+    def put(
+        self,
+        task_id: int,
+        test_file: str,
+        context: dict,
+        priority: float = 0.0,
+        test_file_content: Optional[str] = None,
+    ) -> int:
+        """
+        Adds the unit of a test file.
+
+        Args:
+            task_id (int): The id the test file is processed under.
+            test_file (str): The test file, relative to the project root.
+            context (dict): Its context as returned by find_test_file_context, with paths relative to the
+                project root.
+            priority (float): Units with a higher priority are claimed first.
+            test_file_content (str, optional): The content of the test file in the coordinator's checkout, which
+                workers write into theirs before processing it.
+
+        Returns:
+            int: The id of the unit.
+        """
+        with self.Session() as session:
+            unit = WorkUnit(
+                task_id=task_id,
+                test_file=test_file,
+                test_file_content=test_file_content,
+                source_file=context.get("source_file"),
+                included_files=json.dumps(context.get("included_files") or [], default=str),
+                all_included_files=json.dumps([list(entry) for entry in context.get("all_included_files") or []], default=str),
+                input_tokens=context.get("input_tokens", 0),
+                output_tokens=context.get("output_tokens", 0),
+                priority=priority,
+                status=PENDING,
+            )
+            session.add(unit)
+            session.commit()
+            return unit.id
+
+    def test_files(self) -> set:
+        """The test files that have a unit, so a resumed coordinator does not put them again."""
+        with self.Session() as session:
+            return set(session.execute(select(WorkUnit.test_file)).scalars())
+
+    def close(self):
+        """Marks that every unit is in, so workers stop once the queue is drained."""
+        self._set_closed(True)
+
+    def reopen(self):
+        """Lets workers wait for more units again, when a coordinator resumes the run."""
+        self._set_closed(False)
+
+    def _set_closed(self, closed: bool):
+        with self.Session() as session:
+            state = session.get(WorkQueueState, 1)
+            if state is None:
+                state = WorkQueueState(id=1)
+                session.add(state)
+            state.closed = closed
+            session.commit()
+
+    def claim(self, worker: str) -> Optional[WorkUnit]:
+        """Takes the pending unit with the highest priority for a worker. None when no unit is pending."""
+        claim = uuid.uuid4().hex
+        next_unit = (
+            select(WorkUnit.id)
+            .where(WorkUnit.status == PENDING)
+            .order_by(WorkUnit.priority.desc(), WorkUnit.task_id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        with self.Session() as session:
+            session.execute(
+                update(WorkUnit)
+                .where(WorkUnit.id == next_unit)
+                .values(
+                    status=RUNNING,
+                    worker=worker,
+                    claim=claim,
+                    heartbeat_at=datetime.now(),
+                    attempts=WorkUnit.attempts + 1,
+                )
+            )
+            session.commit()
+            return session.execute(select(WorkUnit).where(WorkUnit.claim == claim)).scalar_one_or_none()
+
+    def heartbeat(self, worker: str):
+        """Shows that the worker is still processing the units it claimed."""
+        with self.Session() as session:
+            session.execute(
+                update(WorkUnit)
+                .where(WorkUnit.worker == worker, WorkUnit.status == RUNNING)
+                .values(heartbeat_at=datetime.now())
+            )
+            session.commit()
+
+    async def send_heartbeats(self, worker: str, interval_sec: float, logger: Optional[CustomLogger] = None):
+        """
+        Sends the worker's heartbeat every interval_sec until cancelled, however long its units take, so they are
+        not given to other workers while it processes them.
+        """
+        while True:
+            await asyncio.sleep(interval_sec)
+            try:
+                await asyncio.to_thread(self.heartbeat, worker)
+            except Exception as e:
+                # A database locked for too long only delays this heartbeat, the next one retries
+                if logger:
+                    logger.warning(f"Worker {worker} could not send a heartbeat: {e}")
+
+    def complete(self, unit_id: int, result: tuple, result_content: Optional[str] = None, claim: Optional[str] = None) -> bool:
+        """
+        Stores the result of a unit, and the content its test file ended with in the worker's checkout.
+
+        Args:
+            unit_id (int): The unit.
+            result (tuple): The result tuple of process_test_file.
+            result_content (str, optional): The content of the test file after processing.
+            claim (str, optional): The claim the worker got the unit with. A worker whose unit was put back
+                because it stopped sending heartbeats no longer holds the claim, and its result is dropped.
+
+        Returns:
+            bool: Whether the result was stored.
+        """
+        condition = [WorkUnit.id == unit_id]
+        if claim is not None:
+            condition.append(WorkUnit.claim == claim)
+        with self.Session() as session:
+            stored = session.execute(
+                update(WorkUnit)
+                .where(*condition)
+                .values(
+                    status=DONE,
+                    result=json.dumps(list(result), default=str),
+                    result_content=result_content,
+                    reported=False,
+                )
+            ).rowcount
+            session.commit()
+        return bool(stored)
+
+    def requeue_stale(self, lease_sec: float, max_attempts: int = 2) -> List[WorkUnit]:
+        """
+        Puts the running units whose worker stopped sending heartbeats back to pending, and fails those that were
+        already tried max_attempts times.
+
+        Returns:
+            List[WorkUnit]: The units put back or failed.
+        """
+        expired = datetime.now() - timedelta(seconds=lease_sec)
+        with self.Session() as session:
+            stale = session.execute(
+                select(WorkUnit).where(WorkUnit.status == RUNNING, WorkUnit.heartbeat_at < expired)
+            ).scalars().all()
+            for unit in stale:
+                if unit.attempts >= max_attempts:
+                    unit.status = DONE
+                    unit.reported = False
+                    unit.result = json.dumps(
+                        [unit.test_file, 0, 0, False, [], [], False, f"Worker {unit.worker} stopped responding"]
+                    )
+                else:
+                    unit.status = PENDING
+                unit.worker = None
+                unit.claim = None
+            session.commit()
+            return stale
+
+    def take_unreported(self) -> List[WorkUnit]:
+        """The units finished since the last call, for the coordinator to report as they come in."""
+        with self.Session() as session:
+            units = session.execute(
+                select(WorkUnit).where(WorkUnit.status == DONE, WorkUnit.reported.is_(False)).order_by(WorkUnit.id)
+            ).scalars().all()
+            for unit in units:
+                unit.reported = True
+            session.commit()
+            return units
+
+    def counts(self) -> dict:
+        """The number of units by status."""
+        with self.Session() as session:
+            statuses = session.execute(select(WorkUnit.status)).scalars().all()
+        return {status: statuses.count(status) for status in (PENDING, RUNNING, DONE)}
+
+    def drained(self) -> bool:
+        """Whether the queue is closed and every unit is done, so there is nothing left for a worker to wait for."""
+        with self.Session() as session:
+            state = session.get(WorkQueueState, 1)
+        counts = self.counts()
+        return bool(state and state.closed) and not counts[PENDING] and not counts[RUNNING]
+
+    def results(self) -> List[WorkUnit]:
+        """Every finished unit."""
+        with self.Session() as session:
+            return session.execute(
+                select(WorkUnit).where(WorkUnit.status == DONE).order_by(WorkUnit.task_id)
+            ).scalars().all()
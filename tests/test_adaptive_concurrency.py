@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from cover_agent.adaptive_concurrency import (
+    CHECKOUT_POOL,
+    HEAVY_POOL,
+    LIGHT_POOL,
+    AdaptiveConcurrencyController,
+    AdaptivePool,
+)
+
+
+def _pool(initial_limit=1, max_limit=8, load=None, memory=None, **kwargs):
+    """A pool whose CPU and memory probes report the given values."""
+    return AdaptivePool(
+        "test",
+        initial_limit=initial_limit,
+        max_limit=max_limit,
+        load_probe=lambda: load,
+        memory_probe=lambda: memory,
+        **kwargs,
+    )
+
+
+async def _run(pool, count, duration=0.01):
+    """Runs count tasks at once, each holding the pool for duration seconds."""
+
+    async def task():
+        async with pool:
+            await asyncio.sleep(duration)
+
+    await asyncio.gather(*(task() for _ in range(count)))
+
+
+class TestAdaptivePool:
+    @pytest.mark.asyncio
+    async def test_limit_grows_while_saturated(self):
+        """Test that queued runs raise the limit additively, up to max_limit."""
+        pool = _pool(initial_limit=1, max_limit=3)
+        await _run(pool, 20)
+
+        assert pool.current_limit == 3
+        assert pool.increases > 0
+        assert pool.decreases == 0
+
+    @pytest.mark.asyncio
+    async def test_limit_stays_without_queueing(self):
+        """Test that runs that never wait for a slot do not raise the limit."""
+        pool = _pool(initial_limit=2)
+        for _ in range(5):
+            await _run(pool, 1)
+
+        assert pool.current_limit == 2
+        assert pool.increases == 0
+
+    @pytest.mark.asyncio
+    async def test_enforces_limit(self):
+        """Test that no more runs than the limit hold the pool at once when it does not adapt."""
+        pool = _pool(initial_limit=2, adaptive=False)
+        await _run(pool, 6)
+
+        assert pool.peak_in_flight == 2
+        assert pool.completed == 6
+        assert pool.current_limit == 2
+
+    @pytest.mark.asyncio
+    async def test_high_load_halves_limit_once_per_congestion(self):
+        """
+        Test that CPU load over the watermark halves the limit, and that the runs started before that decrease do
+        not decrease it again.
+        """
+        pool = _pool(initial_limit=8, max_limit=8, load=2.0)
+        await _run(pool, 8)
+
+        assert pool.current_limit == 4
+        assert pool.decreases == 1
+
+        await _run(pool, 1)
+        assert pool.current_limit == 2
+        assert pool.decreases == 2
+
+    @pytest.mark.asyncio
+    async def test_low_memory_decreases_down_to_min_limit(self):
+        """Test that memory pressure decreases the limit, never below min_limit."""
+        pool = _pool(initial_limit=4, memory=0.05)
+        for _ in range(4):
+            await _run(pool, 1)
+
+        assert pool.current_limit == 1
+        assert pool.decreases == 2
+
+    def test_latency_increase_is_congestion(self):
+        """Test that a run time far above the fastest seen counts as congestion."""
+        pool = _pool(initial_limit=4)
+        pool._adapt(1.0, started=0.0, saturated=True)
+        assert pool._congestion() is None
+
+        pool._adapt(20.0, started=0.0, saturated=True)
+        assert "runs take" in pool._congestion()
+        assert pool.current_limit == 2
+
+    @pytest.mark.asyncio
+    async def test_metrics(self):
+        """Test that metrics report the limit and what the pool has run."""
+        pool = _pool(initial_limit=2, adaptive=False)
+        await _run(pool, 3)
+
+        metrics = pool.metrics()
+        assert metrics["limit"] == 2
+        assert metrics["peak_in_flight"] == 2
+        assert metrics["completed"] == 3
+        assert metrics["in_flight"] == 0
+        assert metrics["latency_ewma_sec"] is None
+
+
+class TestAdaptiveConcurrencyController:
+    def test_heavy_and_light_commands(self):
+        """Test that build tool commands are told apart from lightweight ones, anywhere in a shell command."""
+        controller = AdaptiveConcurrencyController.from_settings({})
+
+        assert controller.is_heavy("mvn test -Dtest=CalcTest")
+        assert controller.is_heavy("touch CalcTest.java && ./mvnw test")
+        assert controller.is_heavy("/opt/gradle/bin/gradle test")
+        assert not controller.is_heavy("pytest tests --cov=app")
+        assert not controller.is_heavy("go test ./...")
+        assert controller.pool_for("./gradlew test") is controller.pools[HEAVY_POOL]
+        assert controller.pool_for("pytest") is controller.pools[LIGHT_POOL]
+
+    def test_from_settings(self):
+        """
+        Test that settings and the max_limit cap shape both pools, and that the build tool pool only grows past
+        one run when builds are isolated in workspaces.
+        """
+        controller = AdaptiveConcurrencyController.from_settings(
+            {"heavy_max_limit": 2, "light_initial_limit": 3, "light_max_limit": 6, "heavy_commands": ["bazel"]}
+        )
+        assert controller.pools[LIGHT_POOL].current_limit == 3
+        assert controller.pools[LIGHT_POOL].max_limit == 6
+        assert not controller.is_heavy("mvn test")
+
+        assert controller.pools[HEAVY_POOL].max_limit == 1
+        isolated = AdaptiveConcurrencyController.from_settings({"heavy_max_limit": 2}, isolated_builds=True)
+        assert isolated.pools[HEAVY_POOL].max_limit == 2
+
+        capped = AdaptiveConcurrencyController.from_settings({"light_initial_limit": 3}, max_limit=1)
+        assert capped.pools[LIGHT_POOL].current_limit == 1
+        assert capped.pools[HEAVY_POOL].max_limit == 1
+        assert set(capped.metrics()) == {HEAVY_POOL, LIGHT_POOL}
+
+    def test_checkout_runs_stay_serial_with_isolated_builds(self):
+        """Test that build tool runs in the checkout get a pool of one while workspace runs share the grown pool."""
+        controller = AdaptiveConcurrencyController.from_settings({"heavy_max_limit": 3}, isolated_builds=True)
+
+        checkout = controller.pool_for("./mvnw test")
+        assert checkout is controller.pools[CHECKOUT_POOL]
+        assert checkout.max_limit == 1
+        assert controller.pool_for("./mvnw test", isolated=True) is controller.pools[HEAVY_POOL]
+        assert controller.pool_for("pytest", isolated=True) is controller.pools[LIGHT_POOL]
+        assert CHECKOUT_POOL not in AdaptiveConcurrencyController.from_settings({}).pools
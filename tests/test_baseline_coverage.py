@@ -0,0 +1,124 @@
+import pytest
+
+from cover_agent.baseline_coverage import BaselineCoverage
+from cover_agent.line_coverage import LineCoverage
+from cover_agent.runner import CommandResult
+
+COBERTURA_REPORT = """<?xml version="1.0" ?>
+<coverage line-rate="0.5">
+    <packages>
+        <package name="app">
+            <classes>
+                <class name="calc.py" filename="app/calc.py">
+                    <lines>
+                        <line number="1" hits="1"/>
+                        <line number="2" hits="1"/>
+                        <line number="3" hits="0"/>
+                        <line number="4" hits="0"/>
+                    </lines>
+                </class>
+                <class name="util.py" filename="app/util.py">
+                    <lines>
+                        <line number="1" hits="1"/>
+                    </lines>
+                </class>
+            </classes>
+        </package>
+    </packages>
+</coverage>
+"""
+
+LCOV_REPORT = """TN:tests/test_calc.py::test_add
+SF:app/calc.py
+DA:1,1
+DA:2,1
+DA:3,0
+DA:4,0
+end_of_record
+TN:tests/test_other.py::test_sub
+SF:app/calc.py
+DA:1,1
+DA:2,0
+DA:3,1
+DA:4,0
+end_of_record
+"""
+
+
+def _fake_run(report_path, content):
+    """A test command that writes the given report once it has started."""
+
+    async def fake_run(command, **kwargs):
+        report_path.write_text(content)
+        return CommandResult("", "", 0, 0)
+
+    return fake_run
+
+
+class TestBaselineCoverage:
+    @pytest.mark.asyncio
+    async def test_whole_suite_slices_from_one_parse(self, tmp_path, mocker):
+        """
+        Test that the suite runs once, and that every source file's slice comes from a single parse of the
+        report.
+        """
+        report = tmp_path / "coverage.xml"
+        run = mocker.patch(
+            "cover_agent.baseline_coverage.Runner.async_run_command", side_effect=_fake_run(report, COBERTURA_REPORT)
+        )
+        baseline = BaselineCoverage("pytest --cov", str(tmp_path), "coverage.xml", "cobertura", generate_log_files=False)
+        assert await baseline.run()
+
+        parse = mocker.spy(baseline, "_processor")
+        covered, missed, percentage = baseline.slice_for(str(tmp_path / "app" / "calc.py"))
+        assert covered == LineCoverage([1, 2])
+        assert missed == LineCoverage([3, 4])
+        assert percentage == 0.5
+        assert baseline.slice_for(str(tmp_path / "app" / "util.py"))[2] == 1.0
+        assert baseline.slice_for(str(tmp_path / "app" / "missing.py")) is None
+
+        run.assert_called_once()
+        assert parse.call_count == 2  # Sniffing the format and parsing the whole report
+
+    @pytest.mark.asyncio
+    async def test_narrowed_slice_counts_only_the_test_files_tests(self, tmp_path, mocker):
+        """Test that a narrowed agent gets the lines covered by its own test file's tests, from LCOV TN: records."""
+        report = tmp_path / "lcov.info"
+        mocker.patch("cover_agent.baseline_coverage.Runner.async_run_command", side_effect=_fake_run(report, LCOV_REPORT))
+        baseline = BaselineCoverage("pytest --cov", str(tmp_path), "lcov.info", "lcov", generate_log_files=False)
+        assert await baseline.run()
+
+        source = str(tmp_path / "app" / "calc.py")
+        assert baseline.slice_for(source)[0] == LineCoverage([1, 2, 3])
+        covered, missed, percentage = baseline.slice_for(source, str(tmp_path / "tests" / "test_calc.py"))
+        assert covered == LineCoverage([1, 2])
+        assert missed == LineCoverage([3, 4])
+        assert percentage == 0.5
+
+        covered, _, percentage = baseline.slice_for(source, str(tmp_path / "tests" / "test_new.py"))
+        assert not covered
+        assert percentage == 0
+
+    @pytest.mark.asyncio
+    async def test_narrowed_slice_needs_per_test_data(self, tmp_path, mocker):
+        """Test that a narrowed agent runs its own baseline when the shared run has no per-test data."""
+        report = tmp_path / "coverage.xml"
+        mocker.patch(
+            "cover_agent.baseline_coverage.Runner.async_run_command", side_effect=_fake_run(report, COBERTURA_REPORT)
+        )
+        baseline = BaselineCoverage("pytest --cov", str(tmp_path), "coverage.xml", "cobertura", generate_log_files=False)
+        assert await baseline.run()
+
+        assert baseline.slice_for(str(tmp_path / "app" / "calc.py"), str(tmp_path / "tests" / "test_calc.py")) is None
+
+    @pytest.mark.asyncio
+    async def test_failed_run_is_not_shared(self, tmp_path, mocker):
+        """Test that a failing suite leaves every agent to run its own baseline."""
+        mocker.patch(
+            "cover_agent.baseline_coverage.Runner.async_run_command",
+            return_value=CommandResult("", "boom", 1, 0),
+        )
+        baseline = BaselineCoverage("pytest --cov", str(tmp_path), "coverage.xml", "cobertura", generate_log_files=False)
+
+        assert not await baseline.run()
+        assert baseline.slice_for(str(tmp_path / "app" / "calc.py")) is None
@@ -1,3 +1,5 @@
+import shlex
+
 from cover_agent.lsp_logic.utils.utils_adapt_command import adapt_test_command
 from cover_agent.build_tool_adapter import *
 import pytest
@@ -159,3 +161,102 @@ class TestBuiltToolAdaptTestCommandForSingleFile:
     #     )
     #     assert result == "python -m pytest -v tests/test_module.py"
 
+
+
+class TestMavenAdapterPaths:
+    """Test suite for the report paths exposed by MavenAdapter."""
+
+    def test_execution_data_path_matches_dest_file(self):
+        """The execution data path is the -Djacoco.destFile the adapted command writes to."""
+        adapter = MavenAdapter("mvn verify", ".")
+        test_file = "src/test/java/com/example/CalculatorTest.java"
+        exec_path = adapter.get_execution_data_path(test_file)
+
+        assert exec_path == Path("target") / "vCover" / "jacoco-CalculatorTest.exec"
+        assert f"-Djacoco.destFile={exec_path}" in adapter.adapt_test_command(test_file)
+
+
+class TestMavenAdapterDaemon:
+    """Test suite for running MavenAdapter commands through mvnd."""
+
+    def test_daemon_replaces_mvn_and_compiles_stale_sources_only(self, mocker):
+        """Once mvnd has started, test commands run through it and only recompile the touched test class."""
+        mocker.patch("cover_agent.build_tool_adapter.shutil.which", return_value="/opt/mvnd/bin/mvnd")
+        run_command = mocker.patch(
+            "cover_agent.build_tool_adapter.Runner.run_command", return_value=("", "", 0, 0)
+        )
+        adapter = MavenAdapter("./mvnw verify", ".", use_daemon=True)
+        adapter._start_daemon()
+
+        command = adapter.adapt_test_command("src/test/java/com/example/CalculatorTest.java")
+        assert " && /opt/mvnd/bin/mvnd verify " in command
+        assert "-Dmaven.compiler.useIncrementalCompilation=false" in command
+        assert run_command.call_args[0][0] == "/opt/mvnd/bin/mvnd -q validate"
+
+    def test_missing_mvnd_keeps_mvn(self, mocker):
+        """Without mvnd on the PATH the adapter keeps running mvn."""
+        mocker.patch("cover_agent.build_tool_adapter.shutil.which", return_value=None)
+        adapter = MavenAdapter("mvn verify", ".", use_daemon=True)
+        adapter._start_daemon()
+
+        assert adapter.daemon_executable is None
+        assert " && mvn verify " in adapter.adapt_test_command("src/test/java/com/example/CalculatorTest.java")
+
+
+class TestGradleAdapter:
+    """Test suite for GradleAdapter."""
+
+    def test_adapt_test_command(self):
+        """The command runs the single test class, writes its report to its own directory and drops old filters."""
+        adapter = GradleAdapter("./gradlew test --tests OtherTest --info", "/repo")
+        result = adapter.adapt_test_command("src/test/java/com/example/CalculatorTest.java")
+
+        assert result == (
+            "./gradlew test --info jacocoTestReport --tests CalculatorTest "
+            f"--init-script {Path('/repo/cover-agent.init.gradle').resolve()} "
+            f"-PcoverAgentOutput={Path('build') / 'vCover' / 'CalculatorTest'}"
+        )
+
+    def test_adapt_test_command_quotes_paths(self):
+        """A project path and a test class name with shell metacharacters reach Gradle as single arguments."""
+        adapter = GradleAdapter("gradle test", "/my repo")
+        result = adapter.adapt_test_command("src/test/java/com/example/Calc$Test.java")
+
+        tokens = shlex.split(result)
+        assert tokens[tokens.index("--tests") + 1] == "Calc$Test"
+        assert tokens[tokens.index("--init-script") + 1] == str(Path("/my repo/cover-agent.init.gradle").resolve())
+        assert tokens[-1] == f"-PcoverAgentOutput={Path('build') / 'vCover' / 'Calc$Test'}"
+
+    def test_adapt_test_command_with_daemon(self):
+        """With the daemon enabled the command reuses the daemon and the configuration cache, offline."""
+        adapter = GradleAdapter("gradle test --no-daemon jacocoTestReport", "/repo", use_daemon=True)
+        result = adapter.adapt_test_command("src/test/java/com/example/CalculatorTest.java")
+
+        assert "--no-daemon" not in result
+        assert result.count("jacocoTestReport") == 1
+        assert result.endswith("--daemon --configuration-cache --offline")
+
+    def test_report_paths(self):
+        """The coverage and execution data paths match the directory passed to the init script."""
+        adapter = GradleAdapter("gradle test", "/repo")
+        test_file = "src/test/java/com/example/CalculatorTest.java"
+
+        assert adapter.get_coverage_path(test_file) == Path("build") / "vCover" / "CalculatorTest" / "jacoco.xml"
+        assert adapter.get_execution_data_path(test_file) == Path("build") / "vCover" / "CalculatorTest" / "jacoco.exec"
+
+    def test_daemon_lifecycle(self, tmp_path, mocker):
+        """prepare_environment writes the init script and starts the daemon, cleanup_environment undoes both."""
+        run_command = mocker.patch(
+            "cover_agent.build_tool_adapter.Runner.run_command", return_value=("", "", 0, 0)
+        )
+        adapter = GradleAdapter("./gradlew test", str(tmp_path), use_daemon=True)
+
+        adapter.prepare_environment()
+        assert "coverAgentOutput" in (tmp_path / "cover-agent.init.gradle").read_text()
+        assert run_command.call_args[0][0] == "./gradlew help --daemon -q --offline"
+        assert adapter.daemon_started
+
+        adapter.cleanup_environment()
+        assert not (tmp_path / "cover-agent.init.gradle").exists()
+        assert run_command.call_args[0][0] == "./gradlew --stop"
+        assert not adapter.daemon_started
@@ -1,14 +1,17 @@
 import argparse
+import asyncio
 import os
 import tempfile
 
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import AsyncMock, MagicMock, mock_open, patch
 
 import pytest
 
 from cover_agent.cover_agent_ import CoverAgent
+from cover_agent.line_coverage import LineCoverage
 from cover_agent.main import parse_args
 from cover_agent.settings.config_schema import CoverAgentConfig
+from cover_agent.test_file_transaction import TestFileTransaction
 
 
 class TestCoverAgent:
@@ -509,3 +512,128 @@ class TestCoverAgent:
             os.remove(temp_source_file.name)
             os.remove(temp_test_file.name)
             os.remove(temp_output_file.name)
+
+
+class TestGenerationPrefetch:
+    """
+    Test suite for generating the next batch of tests while the current one is validated.
+    """
+
+    @staticmethod
+    def make_agent(tmp_path, max_iterations=2, covered_after=(1,)):
+        """A CoverAgent with mocked generator and validator, whose validation takes a moment."""
+        test_file = tmp_path / "test_calc.py"
+        test_file.write_text("def test_existing():\n    pass\n")
+        agent = CoverAgent.__new__(CoverAgent)
+        agent.config = argparse.Namespace(max_iterations=max_iterations, diff_coverage=False)
+        agent.logger = MagicMock()
+        agent.prefetch_generation = True
+        agent.stale_coverage_fraction = 0.5
+        agent.generated_tests_per_iteration = []
+        agent.accepted_tests_per_iteration = []
+        agent.test_db = None
+        agent.run_journal = None
+
+        agent.test_validator = MagicMock()
+        agent.test_validator.test_file = TestFileTransaction(str(test_file))
+        agent.test_validator.last_lines_missed = LineCoverage([1, 2, 3, 4])
+        agent.test_validator.verified_lines_covered = LineCoverage()
+        agent.test_validator.current_coverage = 0.2
+        agent.test_validator.desired_coverage = 90
+        events = []
+
+        async def validate_tests(tests):
+            events.append(("validate", [test["test_name"] for test in tests]))
+            await asyncio.sleep(0.05)
+            events.append(("validated", len(tests)))
+            agent.test_validator.verified_lines_covered = LineCoverage(covered_after)
+            return [{"status": "PASS"} for _ in tests]
+
+        agent.test_validator.validate_tests = AsyncMock(side_effect=validate_tests)
+        agent.test_validator.get_coverage = AsyncMock(return_value=([], "python", "pytest", "report"))
+
+        batches = [
+            {"new_tests": [{"test_name": "test_a", "test_code": "def test_a(): pass"}]},
+            {
+                "new_tests": [
+                    {"test_name": "test_a", "test_code": "def test_a():   pass"},
+                    {"test_name": "test_existing", "test_code": "def test_existing(): assert True"},
+                    {"test_name": "test_b", "test_code": "def test_b(): pass"},
+                ]
+            },
+            {"new_tests": [{"test_name": "test_c", "test_code": "def test_c(): pass"}]},
+        ]
+
+        async def generate_tests(*args, in_flight_tests=None):
+            events.append(("generate", [test["test_name"] for test in in_flight_tests or []]))
+            agent.test_gen.prompt = {"user": f"prompt {len(events)}"}
+            return batches.pop(0)
+
+        agent.test_gen = MagicMock()
+        agent.test_gen.generate_tests = AsyncMock(side_effect=generate_tests)
+        agent.init = AsyncMock(return_value=([], "python", "pytest", "report"))
+        agent.finalize_test_generation = MagicMock(return_value=(0, 0))
+        return agent, events
+
+    @pytest.mark.asyncio
+    async def test_next_batch_is_generated_during_validation(self, tmp_path):
+        """
+        Test that the next batch is requested before the current one is validated, told about the tests in
+        flight, and that its tests repeating the current batch or the test file are dropped.
+        """
+        agent, events = self.make_agent(tmp_path)
+
+        await agent.run()
+
+        assert events == [
+            ("generate", []),
+            ("validate", ["test_a"]),
+            ("generate", ["test_a"]),
+            ("validated", 1),
+            ("validate", ["test_b"]),
+            ("validated", 1),
+        ]
+        assert agent.generated_tests_per_iteration == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_prefetch_is_discarded_when_its_lines_got_covered(self, tmp_path):
+        """Test that a prefetched batch is regenerated once the current batch covered most of its target lines."""
+        agent, events = self.make_agent(tmp_path, covered_after=(1, 2, 3))
+
+        await agent.run()
+
+        assert events == [
+            ("generate", []),
+            ("validate", ["test_a"]),
+            ("generate", ["test_a"]),
+            ("validated", 1),
+            ("generate", []),
+            ("validate", ["test_c"]),
+            ("validated", 1),
+        ]
+
+
+class TestJournalIteration:
+    def test_records_tokens_used_since_last_iteration(self):
+        """Test that each journaled iteration carries its own counts and only the tokens used since the last one."""
+        agent = CoverAgent.__new__(CoverAgent)
+        agent.config = argparse.Namespace(test_file_path="test_app.py")
+        agent.run_journal = MagicMock()
+        agent._journaled_tokens = (0, 0)
+        agent.total_input_token_count = agent.total_output_token_count = 0
+        agent.test_gen = MagicMock(total_input_token_count=100, total_output_token_count=40)
+        agent.test_validator = MagicMock(total_input_token_count=0, total_output_token_count=0, current_coverage=0.4)
+        agent.generated_tests_per_iteration = [3]
+        agent.accepted_tests_per_iteration = [2]
+
+        agent.journal_iteration(target_reached=False)
+        agent.test_gen.total_input_token_count = 150
+        agent.test_gen.total_output_token_count = 60
+        # Validation of the second batch failed before counting accepted tests
+        agent.generated_tests_per_iteration.append(4)
+        agent.journal_iteration(target_reached=False)
+
+        first, second = [call.kwargs for call in agent.run_journal.record_iteration.call_args_list]
+        assert (first["generated"], first["accepted"], first["input_tokens"], first["output_tokens"]) == (3, 2, 100, 40)
+        assert (second["generated"], second["accepted"], second["input_tokens"], second["output_tokens"]) == (4, 0, 50, 20)
+        assert second["coverage"] == 0.4
@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock
+
+from cover_agent.coverage_aggregate import CoverageAggregate
+from cover_agent.line_coverage import LineCoverage
+
+
+class TestCoverageAggregate:
+    """
+    Test suite for the CoverageAggregate class.
+    """
+
+    def test_update_parses_only_changed_files(self):
+        """
+        Tests that only files with a new digest are parsed and that totals track added, changed and removed files.
+        """
+        aggregate = CoverageAggregate()
+        parse_files = MagicMock(
+            return_value={
+                "a.py": (LineCoverage([1, 2]), LineCoverage([3]), 2 / 3),
+                "b.py": (LineCoverage([1]), LineCoverage([2]), 0.5),
+            }
+        )
+        aggregate.update({"a.py": b"1", "b.py": b"1"}, parse_files)
+        assert (aggregate.total_covered, aggregate.total_missed) == (3, 2)
+        assert aggregate.percentage == 3 / 5
+
+        parse_files = MagicMock(return_value={"b.py": (LineCoverage([1, 2]), LineCoverage(), 1.0)})
+        changed = aggregate.update({"a.py": b"1", "b.py": b"2"}, parse_files)
+        parse_files.assert_called_once_with(["b.py"])
+        assert changed == ["b.py"]
+        assert (aggregate.total_covered, aggregate.total_missed) == (4, 1)
+        assert aggregate.percentages == {"a.py": 2 / 3, "b.py": 1.0}
+
+        parse_files = MagicMock()
+        assert aggregate.update({"b.py": b"2"}, parse_files) == ["a.py"]
+        parse_files.assert_not_called()
+        assert dict(aggregate) == {"b.py": ([1, 2], [], 1.0)}
+        assert (aggregate.total_covered, aggregate.total_missed) == (2, 0)
+
+    def test_empty_aggregate(self):
+        """
+        Tests that an empty aggregate reports 0% instead of dividing by zero.
+        """
+        aggregate = CoverageAggregate()
+        assert aggregate.percentage == 0
+        assert len(aggregate) == 0
+
+    def test_sync_percentages_updates_only_files_changed_since_last_sync(self):
+        """
+        Tests that a kept copy of the percentages is brought up to date with the files changed by every update
+        since the last sync, including files removed from the report.
+        """
+        aggregate = CoverageAggregate()
+        aggregate.update(
+            {"a.py": b"1", "b.py": b"1"},
+            lambda files: {"a.py": (LineCoverage([1]), LineCoverage([2]), 0.5), "b.py": (LineCoverage(), LineCoverage([1]), 0)},
+        )
+        kept = aggregate.sync_percentages({})
+        assert kept == {"a.py": 0.5, "b.py": 0}
+        assert kept is not aggregate.percentages
+
+        # Two updates before the next sync, e.g. a rejected candidate followed by an accepted one
+        aggregate.update({"a.py": b"2", "b.py": b"1"}, lambda files: {"a.py": (LineCoverage([1, 2]), LineCoverage(), 1.0)})
+        aggregate.update({"a.py": b"2"}, MagicMock())
+        assert aggregate.unsynced == {"a.py", "b.py"}
+
+        aggregate.sync_percentages(kept)
+        assert kept == {"a.py": 1.0}
+        assert aggregate.unsynced == set()
@@ -0,0 +1,120 @@
+import sqlite3
+
+import pytest
+
+from cover_agent.coverage_contexts import (
+    context_test_name,
+    is_coverage_py_data_file,
+    numbits_to_lines,
+    read_coverage_py_contexts,
+    read_lcov_test_names,
+)
+
+
+def _numbits(lines) -> bytes:
+    data = bytearray(max(lines) // 8 + 1)
+    for line in lines:
+        data[line // 8] |= 1 << (line % 8)
+    return bytes(data)
+
+
+def write_coverage_data(path, line_bits=(), arcs=()):
+    """Writes the tables of a coverage.py data file that per-test contexts are read from."""
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "create table file (id integer primary key, path text);"
+        "create table context (id integer primary key, context text);"
+        "create table line_bits (file_id integer, context_id integer, numbits blob);"
+        "create table arc (file_id integer, context_id integer, fromno integer, tono integer);"
+    )
+    files, contexts = {}, {}
+    for file_path, context, *_ in list(line_bits) + list(arcs):
+        files.setdefault(file_path, len(files) + 1)
+        contexts.setdefault(context, len(contexts) + 1)
+    connection.executemany("insert into file values (?, ?)", [(id_, path) for path, id_ in files.items()])
+    connection.executemany("insert into context values (?, ?)", [(id_, ctx) for ctx, id_ in contexts.items()])
+    connection.executemany(
+        "insert into line_bits values (?, ?, ?)",
+        [(files[file_path], contexts[context], _numbits(lines)) for file_path, context, lines in line_bits],
+    )
+    connection.executemany(
+        "insert into arc values (?, ?, ?, ?)",
+        [(files[file_path], contexts[context], start, end) for file_path, context, start, end in arcs],
+    )
+    connection.commit()
+    connection.close()
+
+
+class TestCoverageContexts:
+    """Test suite for the per-test coverage readers."""
+
+    @pytest.mark.parametrize(
+        "context, expected",
+        [
+            ("tests/test_calc.py::TestCalc::test_add[1-2]|run", "test_add"),
+            ("tests/test_calc.py::test_sub|setup", "test_sub"),
+            ("tests.test_calc.TestCalc.test_mul", "test_mul"),
+            ("CalcTest.testDiv()", "testDiv"),
+            ("", ""),
+        ],
+    )
+    def test_context_test_name(self, context, expected):
+        """
+        Tests that pytest-cov, coverage.py and JUnit style contexts are reduced to the bare test name.
+        """
+        assert context_test_name(context) == expected
+
+    def test_numbits_to_lines(self):
+        """
+        Tests that coverage.py numbits decode to the lines they encode.
+        """
+        assert numbits_to_lines(_numbits([1, 8, 17])) == [1, 8, 17]
+
+    def test_reads_line_bits_per_test(self, tmp_path):
+        """
+        Tests that the phases of a test are combined, other files and the empty context are ignored, and the
+        data file is recognized as SQLite.
+        """
+        data_file = str(tmp_path / ".coverage")
+        write_coverage_data(
+            data_file,
+            line_bits=[
+                ("/repo/src/calc.py", "", [1, 2]),
+                ("/repo/src/calc.py", "tests/test_calc.py::test_add|setup", [3]),
+                ("/repo/src/calc.py", "tests/test_calc.py::test_add|run", [4, 5]),
+                ("/repo/src/calc.py", "tests/test_calc.py::test_sub|run", [6]),
+                ("/repo/src/other.py", "tests/test_calc.py::test_sub|run", [9]),
+            ],
+        )
+
+        contexts = read_coverage_py_contexts(data_file, "/work/repo/src/calc.py")
+
+        assert contexts == {"test_add": [3, 4, 5], "test_sub": [6]}
+        assert is_coverage_py_data_file(data_file)
+        assert not is_coverage_py_data_file(str(tmp_path / "missing"))
+
+    def test_reads_arcs_per_test(self, tmp_path):
+        """
+        Tests that with branch coverage the lines are taken from both ends of the arcs, skipping entry and exit
+        markers.
+        """
+        data_file = str(tmp_path / ".coverage")
+        write_coverage_data(
+            data_file,
+            arcs=[("/repo/src/calc.py", "test_add", -1, 3), ("/repo/src/calc.py", "test_add", 3, 4), ("/repo/src/calc.py", "test_add", 4, -3)],
+        )
+
+        assert read_coverage_py_contexts(data_file, "/repo/src/calc.py") == {"test_add": [3, 4]}
+
+    def test_reads_lcov_test_names(self, tmp_path):
+        """
+        Tests that LCOV records are grouped by their TN: test name and that records without a name are ignored.
+        """
+        report = tmp_path / "lcov.info"
+        report.write_text(
+            "SF:/repo/src/calc.py\nDA:1,1\nend_of_record\n"
+            "TN:test_add\nSF:/repo/src/calc.py\nDA:2,1\nDA:3,0\nend_of_record\n"
+            "TN:test_sub\nSF:/repo/src/calc.py\nDA:3,1\nend_of_record\n"
+        )
+
+        assert read_lcov_test_names(str(report), "/repo/src/calc.py") == {"test_add": [2], "test_sub": [3]}
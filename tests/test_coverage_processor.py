@@ -1,8 +1,22 @@
+import json
+import os
+import struct
 import xml.etree.ElementTree as ET
 
 import pytest
 
-from cover_agent.coverage_processor import CoverageProcessor
+import cover_agent.coverage_processor as coverage_processor_module
+from cover_agent.coverage_processor import (
+    COVERAGE_REPORT_FORMATS,
+    CoverageProcessor,
+    CoverageReportFormat,
+    LcovIndex,
+    register_coverage_format,
+    _parse_coverage_report_in_worker,
+    _unpack_coverage_result,
+    sniff_coverage_format,
+)
+from cover_agent.line_coverage import LineCoverage
 
 
 @pytest.fixture
@@ -324,18 +338,19 @@ class TestCoverageProcessor:
         with pytest.raises(KeyError):
             processor.parse_missed_covered_lines_jacoco_csv("com.example", "MyClass")
 
-    def test_parse_coverage_report_lcov_no_coverage_data(self, mocker):
+    def test_parse_coverage_report_lcov_no_coverage_data(self, tmp_path):
         """
         Tests that parse_coverage_report_lcov returns empty lists and 0 coverage when the lcov report contains no relevant data.
         """
-        mocker.patch("builtins.open", mocker.mock_open(read_data=""))
-        processor = CoverageProcessor("empty_report.lcov", "app.py", "lcov")
+        report_path = tmp_path / "empty_report.lcov"
+        report_path.write_text("")
+        processor = CoverageProcessor(str(report_path), "app.py", "lcov")
         covered_lines, missed_lines, coverage_pct = processor.parse_coverage_report_lcov()
         assert covered_lines == [], "Expected no covered lines"
         assert missed_lines == [], "Expected no missed lines"
         assert coverage_pct == 0, "Expected 0% coverage"
 
-    def test_parse_coverage_report_lcov_with_coverage_data(self, mocker):
+    def test_parse_coverage_report_lcov_with_coverage_data(self, tmp_path):
         """
         Tests that parse_coverage_report_lcov correctly parses coverage data from an lcov report.
         """
@@ -346,14 +361,15 @@ class TestCoverageProcessor:
         DA:3,1
         end_of_record
         """
-        mocker.patch("builtins.open", mocker.mock_open(read_data=lcov_data))
-        processor = CoverageProcessor("report.lcov", "app.py", "lcov")
+        report_path = tmp_path / "report.lcov"
+        report_path.write_text(lcov_data)
+        processor = CoverageProcessor(str(report_path), "app.py", "lcov")
         covered_lines, missed_lines, coverage_pct = processor.parse_coverage_report_lcov()
         assert covered_lines == [1, 3], "Expected lines 1 and 3 to be covered"
         assert missed_lines == [2], "Expected line 2 to be missed"
         assert coverage_pct == 2 / 3, "Expected 66.67% coverage"
 
-    def test_parse_coverage_report_lcov_with_multiple_files(self, mocker):
+    def test_parse_coverage_report_lcov_with_multiple_files(self, tmp_path):
         """
         Tests that parse_coverage_report_lcov correctly parses coverage data for the target file among multiple files in the lcov report.
         """
@@ -371,8 +387,9 @@ class TestCoverageProcessor:
         DA:1,1
         end_of_record
         """
-        mocker.patch("builtins.open", mocker.mock_open(read_data=lcov_data))
-        processor = CoverageProcessor("report.lcov", "app.py", "lcov")
+        report_path = tmp_path / "report.lcov"
+        report_path.write_text(lcov_data)
+        processor = CoverageProcessor(str(report_path), "app.py", "lcov")
         covered_lines, missed_lines, coverage_pct = processor.parse_coverage_report_lcov()
         assert covered_lines == [
             1,
@@ -736,3 +753,484 @@ class TestCoverageProcessor:
         assert covered_lines == []
         assert missed_lines == []
         assert coverage_pct == 0.0
+
+    @pytest.fixture
+    def cobertura_report(self, tmp_path):
+        """
+        Writes a multi-package Cobertura report to disk for the streaming parser tests.
+        """
+        xml_str = """<coverage>
+                        <packages>
+                            <package name="pkg">
+                                <classes>
+                                    <class filename="pkg/app.py">
+                                        <methods/>
+                                        <lines>
+                                            <line number="1" hits="1"/>
+                                            <line number="2" hits="0"/>
+                                        </lines>
+                                    </class>
+                                    <class filename="pkg/app.py">
+                                        <lines>
+                                            <line number="3" hits="1"/>
+                                            <line number="4" hits="0"/>
+                                            <line number="2" hits="3"/>
+                                        </lines>
+                                    </class>
+                                </classes>
+                            </package>
+                            <package name="other">
+                                <classes>
+                                    <class filename="other/util.py">
+                                        <lines>
+                                            <line number="7" hits="0"/>
+                                        </lines>
+                                    </class>
+                                </classes>
+                            </package>
+                        </packages>
+                     </coverage>"""
+        report_path = tmp_path / "coverage.xml"
+        report_path.write_text(xml_str)
+        return str(report_path)
+
+    def test_parse_coverage_report_cobertura_streaming(self, cobertura_report):
+        """
+        Tests that the streaming Cobertura parser returns the same data as the tree-based parser.
+        """
+        streaming = CoverageProcessor(cobertura_report, "pkg/app.py", "cobertura", streaming=True)
+        classic = CoverageProcessor(cobertura_report, "pkg/app.py", "cobertura")
+
+        covered_lines, missed_lines, coverage_pct = streaming.parse_coverage_report()
+        assert (covered_lines, missed_lines, coverage_pct) == ([1, 2, 3], [4], 0.75)
+        assert sorted(classic.parse_coverage_report()[0]) == covered_lines
+
+        all_files = streaming.parse_coverage_report_cobertura()
+        assert all_files == {
+            "pkg/app.py": ([1, 2, 3], [4], 0.75),
+            "other/util.py": ([], [7], 0.0),
+        }
+
+    def test_parse_coverage_report_cobertura_streaming_same_name_in_two_packages(self, tmp_path):
+        """
+        Tests that the streaming parser merges every class whose filename ends with the target across packages,
+        like the tree-based parser does, instead of stopping after the first matching package.
+        """
+        xml_str = """<coverage>
+                        <packages>
+                            <package name="a">
+                                <classes>
+                                    <class filename="a/utils.py">
+                                        <lines>
+                                            <line number="1" hits="1"/>
+                                            <line number="2" hits="0"/>
+                                        </lines>
+                                    </class>
+                                </classes>
+                            </package>
+                            <package name="b">
+                                <classes>
+                                    <class filename="b/utils.py">
+                                        <lines>
+                                            <line number="3" hits="1"/>
+                                            <line number="4" hits="0"/>
+                                        </lines>
+                                    </class>
+                                </classes>
+                            </package>
+                        </packages>
+                     </coverage>"""
+        report_path = tmp_path / "coverage.xml"
+        report_path.write_text(xml_str)
+
+        streaming = CoverageProcessor(str(report_path), "utils.py", "cobertura", streaming=True)
+        classic = CoverageProcessor(str(report_path), "utils.py", "cobertura")
+
+        assert list(streaming._iterparse_cobertura(filename="utils.py")) == ["a/utils.py", "b/utils.py"]
+        assert streaming.parse_coverage_report_cobertura("utils.py") == ([1, 3], [2, 4], 0.5)
+        covered, missed, coverage_pct = classic.parse_coverage_report_cobertura("utils.py")
+        assert (sorted(covered), sorted(missed), coverage_pct) == ([1, 3], [2, 4], 0.5)
+
+    def test_parse_coverage_report_cobertura_streaming_index(self, cobertura_report, mocker):
+        """
+        Tests that the filename index is built once and reused until the report changes on disk.
+        """
+        processor = CoverageProcessor(cobertura_report, "pkg/app.py", "cobertura", streaming=True, build_index=True)
+        iterparse_spy = mocker.spy(processor, "_iterparse_cobertura")
+
+        assert processor.parse_coverage_report_cobertura("app.py") == ([1, 2, 3], [4], 0.75)
+        assert processor.parse_coverage_report_cobertura("util.py") == ([], [7], 0.0)
+        assert iterparse_spy.call_count == 1
+        assert processor.cobertura_index["pkg/app.py"] == ([1, 2, 3], [4])
+
+        os.utime(cobertura_report, ns=(0, 0))
+        processor.parse_coverage_report_cobertura("app.py")
+        assert iterparse_spy.call_count == 2
+
+    def test_parse_coverage_report_cache_hit_and_miss(self, cobertura_report, mocker):
+        """
+        Tests that an unchanged report is served from the result cache and a rewritten one is parsed again.
+        """
+        processor = CoverageProcessor(cobertura_report, "pkg/app.py", "cobertura", streaming=True, cache_results=True)
+        parse_spy = mocker.spy(processor, "_parse_coverage_report_uncached")
+
+        first = processor.parse_coverage_report()
+        second = processor.parse_coverage_report()
+        assert first == second == ([1, 2, 3], [4], 0.75)
+        assert parse_spy.call_count == 1
+        assert (processor.cache_hits, processor.cache_misses) == (1, 1)
+
+        with open(cobertura_report, "a") as report_file:
+            report_file.write("\n")
+        processor.parse_coverage_report()
+        assert parse_spy.call_count == 2
+        assert (processor.cache_hits, processor.cache_misses) == (1, 2)
+
+    def test_parse_coverage_report_cache_with_content_hash(self, cobertura_report):
+        """
+        Tests that the content hash is part of the cache key when hash_reports is enabled.
+        """
+        processor = CoverageProcessor(cobertura_report, "pkg/app.py", "cobertura", cache_results=True, hash_reports=True)
+        signature = processor._report_signature(cobertura_report, with_hash=True)
+        assert len(signature) == 4
+
+        stat = os.stat(cobertura_report)
+        with open(cobertura_report, "r+") as report_file:
+            content = report_file.read()
+            report_file.seek(0)
+            report_file.write(content.replace('hits="0"', 'hits="9"', 1))
+        os.utime(cobertura_report, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert processor._report_signature(cobertura_report, with_hash=True) != signature
+        assert processor._report_signature(cobertura_report)[:3] == signature[:3]
+
+    def test_parse_coverage_report_cache_skipped_for_missing_report(self, mock_xml_tree):
+        """
+        Tests that the cache is bypassed when the report cannot be stat'ed.
+        """
+        processor = CoverageProcessor("fake_path", "app.py", "cobertura", cache_results=True)
+        assert processor.parse_coverage_report()[2] == 0.5
+        assert (processor.cache_hits, processor.cache_misses) == (0, 0)
+
+    @pytest.fixture
+    def lcov_report(self, tmp_path):
+        """
+        Writes a multi-record LCOV report to disk.
+        """
+        lcov_data = (
+            "TN:\n"
+            "SF:/repo/src/app.py\n"
+            "FN:1,main\n"
+            "DA:1,4\n"
+            "DA:2,0\n"
+            "end_of_record\n"
+            "SF:/repo/src/util.py\n"
+            "DA:5,1\n"
+            "DA:6,0\n"
+            "DA:7,0\n"
+            "end_of_record\n"
+            "SF:/repo/src/app.py\n"
+            "DA:2,1\n"
+            "DA:3,0\n"
+            "end_of_record\n"
+        )
+        report_path = tmp_path / "lcov.info"
+        report_path.write_text(lcov_data)
+        return str(report_path)
+
+    def test_parse_coverage_report_lcov_merges_records_for_same_source(self, lcov_report):
+        """
+        Tests that records for the same source are merged and a line hit in any record counts as covered.
+        """
+        processor = CoverageProcessor(lcov_report, "src/app.py", "lcov")
+        assert processor.parse_coverage_report() == ([1, 2], [3], 2 / 3)
+
+    def test_parse_coverage_report_lcov_whole_report_mode(self, lcov_report):
+        """
+        Tests that the report coverage feature flag returns coverage for every source in the LCOV report.
+        """
+        processor = CoverageProcessor(lcov_report, "src/app.py", "lcov", use_report_coverage_feature_flag=True)
+        assert processor.parse_coverage_report() == {
+            "/repo/src/app.py": ([1, 2], [3], 2 / 3),
+            "/repo/src/util.py": ([5], [6, 7], 1 / 3),
+        }
+
+    def test_parse_coverage_report_lcov_files(self, lcov_report):
+        """
+        Tests that several files can be extracted from the LCOV report in one call.
+        """
+        processor = CoverageProcessor(lcov_report, "src/app.py", "lcov")
+        result = processor.parse_coverage_report_lcov_files(["util.py", "missing.py"])
+        assert result == {"util.py": ([5], [6, 7], 1 / 3), "missing.py": ([], [], 0)}
+
+    def test_lcov_index_is_shared_until_report_changes(self, lcov_report):
+        """
+        Tests that the LCOV index is built once per report version and shared between processors.
+        """
+        first = LcovIndex.for_report(lcov_report)
+        assert LcovIndex.for_report(lcov_report) is first
+        assert [len(ranges) for ranges in first.records.values()] == [2, 1]
+
+        with open(lcov_report, "a") as report_file:
+            report_file.write("SF:/repo/src/new.py\nDA:1,1\nend_of_record\n")
+        rebuilt = LcovIndex.for_report(lcov_report)
+        assert rebuilt is not first
+        assert rebuilt.sources()[-1] == "/repo/src/new.py"
+
+    def test_jacoco_xml_lines_reused_for_identical_probes(self, tmp_path, mocker):
+        """
+        Tests that the JaCoCo XML report is only parsed once while the class's probes in the .exec file are unchanged,
+        and parsed again once the probes change.
+        """
+        source = tmp_path / "Calc.java"
+        source.write_text("package com.example;\npublic class Calc {\n}\n")
+        exec_file = tmp_path / "jacoco.exec"
+
+        def write_exec(probe_byte):
+            header = b"\x01" + struct.pack(">HH", 0xC0C0, 0x1007)
+            name = b"com/example/Calc"
+            block = b"\x11" + struct.pack(">qH", 99, len(name)) + name + b"\x03" + bytes([probe_byte])
+            exec_file.write_bytes(header + block)
+
+        parse_xml = mocker.patch.object(CoverageProcessor, "parse_missed_covered_lines_jacoco_xml", return_value=([3], [1, 2]))
+        processor = CoverageProcessor(
+            "report/jacoco.xml", str(source), "jacoco", execution_data_path=str(exec_file)
+        )
+
+        write_exec(0b011)
+        assert processor.parse_coverage_report_jacoco() == ([1, 2], [3], 2 / 3)
+        assert processor.parse_coverage_report_jacoco() == ([1, 2], [3], 2 / 3)
+        assert parse_xml.call_count == 1
+
+        write_exec(0b111)
+        processor.parse_coverage_report_jacoco()
+        assert parse_xml.call_count == 2
+
+    def test_parse_test_contexts_from_lcov_test_names(self, tmp_path):
+        """
+        Tests that the TN: records of an LCOV report give the covered lines of each test for the source file.
+        """
+        report = tmp_path / "lcov.info"
+        report.write_text(
+            "TN:test_add\nSF:/repo/src/app.py\nDA:1,1\nDA:2,0\nend_of_record\n"
+            "TN:test_sub\nSF:/repo/src/app.py\nDA:1,1\nDA:2,3\nend_of_record\n"
+            "SF:/repo/src/util.py\nDA:9,1\nend_of_record\n"
+        )
+        processor = CoverageProcessor(str(report), "/repo/src/app.py", "lcov")
+
+        assert processor.parse_test_contexts() == {"test_add": [1], "test_sub": [1, 2]}
+
+    def test_parse_test_contexts_from_jacoco_sessions(self, tmp_path, mocker):
+        """
+        Tests that JaCoCo sessions dumped per test are resolved to lines through probe vectors already parsed
+        from the XML report, and that sessions with unseen probes are left out.
+        """
+        source = tmp_path / "Calc.java"
+        source.write_text("package com.example;\npublic class Calc {\n}\n")
+        exec_file = tmp_path / "jacoco.exec"
+        name = b"com/example/Calc"
+
+        def session(session_id, probe_byte):
+            return (
+                b"\x10" + struct.pack(">H", len(session_id)) + session_id + struct.pack(">qq", 1, 2)
+                + b"\x11" + struct.pack(">qH", 99, len(name)) + name + b"\x03" + bytes([probe_byte])
+            )
+
+        header = b"\x01" + struct.pack(">HH", 0xC0C0, 0x1007)
+        mocker.patch.object(CoverageProcessor, "parse_missed_covered_lines_jacoco_xml", return_value=([3], [1, 2]))
+        processor = CoverageProcessor("report/jacoco.xml", str(source), "jacoco", execution_data_path=str(exec_file))
+        exec_file.write_bytes(header + session(b"CalcTest.testAdd()", 0b011))
+        processor.parse_coverage_report_jacoco()
+
+        exec_file.write_bytes(header + session(b"CalcTest.testAdd()", 0b011) + session(b"CalcTest.testSub()", 0b100))
+        assert processor.parse_test_contexts() == {"testAdd": [1, 2]}
+
+    def test_parse_test_contexts_without_per_test_data(self, tmp_path):
+        """
+        Tests that a report without per-test data and no contexts file gives no per-test coverage.
+        """
+        report = tmp_path / "coverage.xml"
+        report.write_text("<coverage/>")
+        processor = CoverageProcessor(str(report), "src/app.py", "cobertura", contexts_path=str(tmp_path / ".coverage"))
+
+        assert processor.parse_test_contexts() == {}
+
+    def test_incremental_aggregate_reparses_changed_classes_only(self, tmp_path, mocker):
+        """
+        Tests that with the incremental aggregate only the files whose <class> blocks changed are parsed again,
+        and that the totals match a full parse.
+        """
+        report = tmp_path / "coverage.xml"
+
+        def write_report(b_hits):
+            report.write_text(
+                "<coverage><packages><package><classes>"
+                '<class name="a" filename="src/a.py"><lines><line number="1" hits="1"/><line number="2" hits="0"/></lines></class>'
+                f'<class name="b" filename="src/b.py"><lines><line number="1" hits="{b_hits}"/></lines></class>'
+                '<class name="a2" filename="src/a.py"><lines><line number="5" hits="1"/></lines></class>'
+                "</classes></package></packages></coverage>"
+            )
+
+        processor = CoverageProcessor(
+            str(report), "src/a.py", "cobertura", use_report_coverage_feature_flag=True, incremental_aggregate=True
+        )
+        write_report(0)
+        aggregate = processor.parse_coverage_report()
+        assert dict(aggregate) == processor.parse_coverage_report_cobertura()
+        assert (aggregate.total_covered, aggregate.total_missed) == (2, 2)
+
+        parse_class = mocker.spy(processor, "parse_coverage_data_for_class")
+        write_report(3)
+        aggregate = processor.parse_coverage_report()
+        assert parse_class.call_count == 1
+        assert aggregate.changed == ["src/b.py"]
+        assert aggregate["src/b.py"] == ([1], [], 1.0)
+        assert (aggregate.total_covered, aggregate.total_missed) == (3, 1)
+
+    @pytest.mark.asyncio
+    async def test_aprocess_coverage_report_parses_in_process_pool(self, cobertura_report):
+        """
+        Tests that the async API parses the report in the shared process pool, returns LineCoverage results
+        and serves an unchanged report from the cache without going back to the pool.
+        """
+        processor = CoverageProcessor(cobertura_report, "app.py", "cobertura", cache_results=True, parse_workers=1)
+        try:
+            result = await processor.aprocess_coverage_report(0)
+            assert result == processor._parse_coverage_report_uncached()
+            assert isinstance(result[0], LineCoverage)
+
+            executor = CoverageProcessor._parse_executor
+            assert executor is not None
+            CoverageProcessor._parse_executor = None
+            assert await processor.aprocess_coverage_report(0) == result
+            assert processor.cache_hits == 1
+            assert CoverageProcessor._parse_executor is None
+            CoverageProcessor._parse_executor = executor
+        finally:
+            CoverageProcessor.shutdown_parse_executor()
+
+    def test_pool_worker_keeps_index_between_parses(self, cobertura_report, mocker):
+        """
+        Tests that a pool worker is handed the index and cache flags and keeps one processor per report, so the
+        filename index is built once for all source files looked up in the same report.
+        """
+        processor = CoverageProcessor(
+            cobertura_report, "util.py", "cobertura", streaming=True, build_index=True, cache_results=True
+        )
+        arguments = processor._worker_arguments()
+        assert (arguments["build_index"], arguments["cache_results"], arguments["hash_reports"]) == (True, True, False)
+
+        iterparse_spy = mocker.spy(CoverageProcessor, "_iterparse_cobertura")
+        mocker.patch.dict(coverage_processor_module._worker_processors, clear=True)
+        first = _parse_coverage_report_in_worker(arguments)
+        second = _parse_coverage_report_in_worker(dict(arguments, src_file_path="app.py"))
+        assert _parse_coverage_report_in_worker(arguments) == first
+        assert iterparse_spy.call_count == 1
+        assert _unpack_coverage_result(first) == ([], [7], 0.0)
+        assert _unpack_coverage_result(second) == ([1, 2, 3], [4], 0.75)
+
+    @pytest.mark.asyncio
+    async def test_aprocess_coverage_report_inline_without_workers(self, cobertura_report, mocker):
+        """
+        Tests that with parse_workers = 0 the report is parsed inline through parse_coverage_report.
+        """
+        processor = CoverageProcessor(cobertura_report, "app.py", "cobertura")
+        parse = mocker.patch.object(processor, "parse_coverage_report", return_value=([1], [], 1.0))
+        assert await processor.aprocess_coverage_report(0) == ([1], [], 1.0)
+        parse.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "content, expected",
+        [
+            ('<?xml version="1.0" ?>\n<coverage version="7.4" line-rate="0.5"><packages/></coverage>', "cobertura"),
+            (
+                '<?xml version="1.0"?><!DOCTYPE report PUBLIC "-//JACOCO//DTD Report 1.1//EN" "report.dtd">'
+                '<report name="demo"><sessioninfo id="a" start="1" dump="2"/></report>',
+                "jacoco_xml",
+            ),
+            ("GROUP,PACKAGE,CLASS,INSTRUCTION_MISSED,LINE_MISSED,LINE_COVERED\n", "jacoco_csv"),
+            ("TN:\nSF:/repo/app.py\nDA:1,1\nend_of_record\n", "lcov"),
+            ("mode: count\nexample.com/demo/calc.go:3.20,5.2 1 4\n", "go"),
+            ('{"report_name": "XML", "diff_name": "main...HEAD", "src_stats": {}}', "diff_cover_json"),
+            ('{"meta": {"format": 2, "version": "7.4.0", "show_contexts": false}, "files": {}}', "coverage_py_json"),
+            ("just some text", None),
+        ],
+    )
+    def test_sniff_coverage_format(self, tmp_path, content, expected):
+        """
+        Tests that each built-in format is recognized from the head of the report.
+        """
+        report = tmp_path / "report"
+        report.write_text(content)
+        assert sniff_coverage_format(str(report)) == expected
+
+    def test_auto_coverage_type_dispatches_to_detected_parser(self, lcov_report, mocker):
+        """
+        Tests that coverage_type "auto" sniffs the report and dispatches to the registered parser.
+        """
+        processor = CoverageProcessor(lcov_report, "src/app.py", "auto")
+        assert processor.parse_coverage_report() == ([1, 2], [3], 2 / 3)
+        assert processor.detected_coverage_type == "lcov"
+
+    def test_auto_coverage_type_unknown_report(self, tmp_path):
+        """
+        Tests that an unrecognized report raises a ValueError before any parser runs.
+        """
+        report = tmp_path / "report.txt"
+        report.write_text("not a coverage report")
+        processor = CoverageProcessor(str(report), "app.py", "auto")
+        with pytest.raises(ValueError, match="Could not detect the format"):
+            processor.parse_coverage_report()
+
+    def test_parse_coverage_report_go(self, tmp_path):
+        """
+        Tests that a Go coverprofile is parsed per file, with block lines covered when the count is positive.
+        """
+        report = tmp_path / "cover.out"
+        report.write_text(
+            "mode: set\n"
+            "example.com/demo/calc/calc.go:3.20,5.2 1 1\n"
+            "example.com/demo/calc/calc.go:7.10,9.2 2 0\n"
+            "example.com/demo/util/util.go:1.1,2.2 1 0\n"
+        )
+        source = tmp_path / "calc" / "calc.go"
+        processor = CoverageProcessor(str(report), str(source), "go")
+        assert processor.parse_coverage_report() == ([3, 4, 5], [7, 8, 9], 0.5)
+
+        processor = CoverageProcessor(str(report), str(source), "go", use_report_coverage_feature_flag=True)
+        assert processor.parse_coverage_report()["example.com/demo/util/util.go"] == ([], [1, 2], 0)
+
+    def test_parse_coverage_report_coverage_py_json(self, tmp_path):
+        """
+        Tests that a coverage.py JSON report is parsed from executed_lines and missing_lines,
+        preferring the path that matches most of the source path.
+        """
+        report = tmp_path / "coverage.json"
+        report.write_text(
+            json.dumps(
+                {
+                    "meta": {"format": 2},
+                    "files": {
+                        "pkg/app.py": {"executed_lines": [1, 2, 3], "missing_lines": [4]},
+                        "other/app.py": {"executed_lines": [], "missing_lines": [1]},
+                    },
+                }
+            )
+        )
+        processor = CoverageProcessor(str(report), str(tmp_path / "pkg" / "app.py"), "coverage_py_json")
+        assert processor.parse_coverage_report() == ([1, 2, 3], [4], 0.75)
+
+    def test_register_coverage_format(self, tmp_path, mocker):
+        """
+        Tests that a registered plugin format is sniffed and used for dispatch.
+        """
+        parse = mocker.Mock(return_value=([1], [], 1.0))
+        mocker.patch.dict(COVERAGE_REPORT_FORMATS)
+        register_coverage_format(
+            CoverageReportFormat(name="custom", sniff=lambda head: bytes(head).startswith(b"CUSTOM"), parse_file=parse)
+        )
+        report = tmp_path / "report.custom"
+        report.write_text("CUSTOM v1\n")
+        processor = CoverageProcessor(str(report), "app.py", "auto")
+        assert processor.parse_coverage_report() == ([1], [], 1.0)
+        parse.assert_called_once_with(processor)
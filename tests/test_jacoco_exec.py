@@ -0,0 +1,115 @@
+import struct
+
+import pytest
+
+from cover_agent.jacoco_exec import read_execution_data
+
+
+def _utf(value: str) -> bytes:
+    encoded = value.encode("utf-8")
+    return struct.pack(">H", len(encoded)) + encoded
+
+
+def _var_int(value: int) -> bytes:
+    out = b""
+    while value > 0x7F:
+        out += bytes([(value & 0x7F) | 0x80])
+        value >>= 7
+    return out + bytes([value])
+
+
+def _probes(values) -> bytes:
+    packed = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value:
+            packed[index // 8] |= 1 << (index % 8)
+    return _var_int(len(values)) + bytes(packed)
+
+
+def build_exec(classes, session_id="host-1234") -> bytes:
+    """Builds execution data the way JaCoCo's ExecutionDataWriter does: header, session info, class blocks."""
+    data = b"\x01" + struct.pack(">HH", 0xC0C0, 0x1007)
+    data += b"\x10" + _utf(session_id) + struct.pack(">qq", 1000, 2000)
+    for class_id, name, probes in classes:
+        data += b"\x11" + struct.pack(">q", class_id) + _utf(name) + _probes(probes)
+    return data
+
+
+class TestReadExecutionData:
+    """
+    Test suite for the JaCoCo execution data reader.
+    """
+
+    def test_reads_sessions_and_probes(self, tmp_path):
+        """
+        Tests that session info and per-class probe arrays are decoded, including arrays longer than one byte.
+        """
+        probes = [True, False, True] + [False] * 7 + [True]
+        exec_file = tmp_path / "jacoco.exec"
+        exec_file.write_bytes(build_exec([(42, "com/example/Calculator", probes)]))
+
+        data = read_execution_data(str(exec_file))
+
+        assert [(s.id, s.start, s.dump) for s in data.sessions] == [("host-1234", 1000, 2000)]
+        calculator = data.classes["com/example/Calculator"]
+        assert calculator.id == 42
+        assert calculator.probes.tolist() == probes
+
+    def test_merges_appended_runs(self, tmp_path):
+        """
+        Tests that a file appended to by two runs merges the probes of the same class.
+        """
+        exec_file = tmp_path / "jacoco.exec"
+        exec_file.write_bytes(
+            build_exec([(7, "A", [True, False, False])]) + build_exec([(7, "A", [False, False, True])], "host-2")
+        )
+
+        data = read_execution_data(str(exec_file))
+
+        assert len(data.sessions) == 2
+        assert data.classes["A"].probes.tolist() == [True, False, True]
+
+    def test_classes_for_source_includes_nested_classes(self, tmp_path):
+        """
+        Tests that nested and anonymous classes are returned with the top level class, but similarly named classes are not.
+        """
+        exec_file = tmp_path / "jacoco.exec"
+        exec_file.write_bytes(
+            build_exec(
+                [
+                    (1, "com/example/Calc", [True]),
+                    (2, "com/example/Calc$1", [False]),
+                    (3, "com/example/CalcTest", [True]),
+                ]
+            )
+        )
+
+        data = read_execution_data(str(exec_file))
+
+        assert [c.name for c in data.classes_for_source("com.example", "Calc")] == ["com/example/Calc", "com/example/Calc$1"]
+
+    def test_keeps_execution_data_per_session(self, tmp_path):
+        """
+        Tests that the classes dumped by each session are kept apart, for agents dumped once per test.
+        """
+        exec_file = tmp_path / "jacoco.exec"
+        exec_file.write_bytes(
+            build_exec([(7, "A", [True, False])], "testAdd") + build_exec([(7, "A", [False, True])], "testSub")
+        )
+
+        data = read_execution_data(str(exec_file))
+
+        assert [c.probes.tolist() for c in data.classes_for_source("", "A", "testAdd")] == [[True, False]]
+        assert [c.probes.tolist() for c in data.classes_for_source("", "A", "testSub")] == [[False, True]]
+        assert data.classes_for_source("", "A", "missing") == []
+        assert data.classes["A"].probes.tolist() == [True, True]
+
+    def test_rejects_other_files(self, tmp_path):
+        """
+        Tests that a file without the JaCoCo header raises a ValueError.
+        """
+        exec_file = tmp_path / "jacoco.exec"
+        exec_file.write_bytes(b"\x01\x00\x00\x10\x07")
+
+        with pytest.raises(ValueError):
+            read_execution_data(str(exec_file))
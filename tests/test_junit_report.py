@@ -0,0 +1,47 @@
+import os
+import time
+
+from cover_agent.junit_report import parse_junit_report
+
+
+class TestParseJunitReport:
+    """Test suite for parse_junit_report."""
+
+    def test_reads_outcomes_by_test_name(self, tmp_path):
+        """
+        Test that passing, failing and erroring test cases are read by name, with parametrization and
+        parentheses stripped and a failure of any parametrized run failing the test.
+        """
+        report = tmp_path / "junit.xml"
+        report.write_text(
+            """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest">
+  <testcase classname="tests.test_calc" name="test_add[1-2]"/>
+  <testcase classname="tests.test_calc" name="test_add[3-4]"><failure message="assert 7 == 8">details</failure></testcase>
+  <testcase classname="tests.test_calc" name="test_sub"/>
+  <testcase classname="CalcTest" name="testDiv()"><error message="ArithmeticException"/></testcase>
+</testsuite></testsuites>"""
+        )
+
+        outcomes = parse_junit_report(str(report))
+
+        assert outcomes["test_add"].passed is False
+        assert outcomes["test_add"].message == "assert 7 == 8\ndetails"
+        assert outcomes["test_sub"].passed is True
+        assert outcomes["testDiv"].passed is False
+        assert outcomes["testDiv"].message == "ArithmeticException"
+
+    def test_reads_report_directory_and_skips_stale_files(self, tmp_path):
+        """
+        Test that every XML file of a report directory is read, except files older than modified_since,
+        and that None is returned when no report was written.
+        """
+        (tmp_path / "TEST-A.xml").write_text('<testsuite><testcase name="testA"/></testsuite>')
+        stale = tmp_path / "TEST-B.xml"
+        stale.write_text('<testsuite><testcase name="testB"/></testsuite>')
+        os.utime(stale, (time.time() - 60, time.time() - 60))
+
+        outcomes = parse_junit_report(str(tmp_path), modified_since=time.time() - 30)
+
+        assert list(outcomes) == ["testA"]
+        assert parse_junit_report(str(tmp_path / "missing.xml")) is None
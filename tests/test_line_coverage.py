@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from cover_agent.line_coverage import CoverageDelta, LineCoverage
+
+
+class TestLineCoverage:
+    """
+    Test suite for the LineCoverage class.
+    """
+
+    def test_deduplicates_and_sorts_lines(self):
+        """
+        Tests that duplicate line numbers collapse and iteration is in ascending order.
+        """
+        coverage = LineCoverage([5, 1, 3, 5])
+        assert coverage.tolist() == [1, 3, 5]
+        assert list(coverage) == [1, 3, 5]
+        assert len(coverage) == 3
+        assert 3 in coverage and 4 not in coverage and 100 not in coverage
+
+    def test_set_operations_on_different_sizes(self):
+        """
+        Tests union, intersection and difference between bitmaps of different lengths.
+        """
+        left = LineCoverage([1, 2, 3])
+        right = LineCoverage([3, 10])
+        assert (left | right).tolist() == [1, 2, 3, 10]
+        assert (left & right).tolist() == [3]
+        assert (left - right).tolist() == [1, 2]
+        assert (right - left).tolist() == [10]
+
+    def test_to_ranges_and_back(self):
+        """
+        Tests the compact range serialization round trip.
+        """
+        coverage = LineCoverage(list(range(12, 41)) + [55])
+        assert coverage.to_ranges() == "12-40,55"
+        assert str(coverage) == "12-40,55"
+        assert LineCoverage.from_ranges("12-40,55") == coverage
+        assert LineCoverage().to_ranges() == ""
+        assert LineCoverage.from_ranges("") == []
+
+    def test_equality_with_lists(self):
+        """
+        Tests that a LineCoverage compares equal to a list with the same lines regardless of order.
+        """
+        assert LineCoverage([1, 3]) == [3, 1]
+        assert LineCoverage([1, 3]) != [1, 2]
+        assert LineCoverage([]) == []
+        assert not LineCoverage()
+
+    def test_coerce_and_from_bits(self):
+        """
+        Tests that coerce passes LineCoverage through and that from_bits wraps an existing bitmap.
+        """
+        coverage = LineCoverage([2])
+        assert LineCoverage.coerce(coverage) is coverage
+        assert LineCoverage.coerce(None) == []
+        assert LineCoverage.from_bits(np.array([False, True, True])).tolist() == [1, 2]
+
+    def test_negative_lines_rejected(self):
+        """
+        Tests that negative line numbers raise a ValueError.
+        """
+        with pytest.raises(ValueError):
+            LineCoverage([-1])
+
+    def test_packed_round_trip(self):
+        """
+        Tests that to_packed() stores eight lines per byte and from_packed() restores the same set.
+        """
+        coverage = LineCoverage([1, 9, 20])
+        packed, size = coverage.to_packed()
+        assert len(packed) == 3 and size == 21
+        assert LineCoverage.from_packed(packed, size) == coverage
+        assert LineCoverage.from_packed(*LineCoverage().to_packed()) == []
+
+
+class TestCoverageDelta:
+    """
+    Test suite for the CoverageDelta class.
+    """
+
+    def test_between_reports_gained_and_lost_lines(self):
+        """
+        Tests that between() splits the change into newly covered and no longer covered lines.
+        """
+        delta = CoverageDelta.between(LineCoverage([1, 2, 3]), [2, 3, 4, 5])
+        assert delta.newly_covered == [4, 5]
+        assert delta.no_longer_covered == [1]
+        assert delta.increased
+
+    def test_no_increase_for_subset(self):
+        """
+        Tests that covering a subset of the previous lines is not an increase.
+        """
+        delta = CoverageDelta.between([1, 2, 3], [1, 2])
+        assert not delta.increased
+        assert delta.newly_covered.to_ranges() == ""
@@ -237,6 +237,32 @@ test_name:"""
         assert args.test_file_output_path == ""
         assert args.desired_coverage == 100
 
+    def test_parse_args_full_repo_requires_queue_path_for_worker(self, monkeypatch):
+        """
+        Tests that the coordinator and worker roles require --queue-path, so the work queue is never created in
+        the project root by default.
+        """
+        settings = get_settings().get("default")
+        base_args = [
+            "program_name",
+            "--project-language",
+            "python",
+            "--project-root",
+            "/path/to/project",
+            "--code-coverage-report-path",
+            "/path/to/report",
+            "--test-command",
+            "pytest",
+            "--role",
+            "worker",
+        ]
+        monkeypatch.setattr(sys, "argv", base_args)
+        with pytest.raises(SystemExit):
+            parse_args_full_repo(settings)
+
+        monkeypatch.setattr(sys, "argv", base_args + ["--queue-path", "/shared/queue.db"])
+        assert parse_args_full_repo(settings).queue_path == "/shared/queue.db"
+
     def test_find_test_files(self, mocker):
         """
         Tests that find_test_files correctly identifies test files in the project directory.
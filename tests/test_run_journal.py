@@ -0,0 +1,77 @@
+import os
+
+from cover_agent.run_journal import RunJournal
+from cover_agent.test_file_transaction import TestFileTransaction
+
+
+def _result(test_file, success=True):
+    return (str(test_file), 30, 12, False, [3], [1], success, None if success else "CoverAgent error: boom")
+
+
+class TestRunJournal:
+    def test_resume_loads_recorded_progress(self, tmp_path):
+        """Test that a resumed journal holds the context, iterations and results of the interrupted run."""
+        path = tmp_path / "journal.jsonl"
+        test_file = tmp_path / "test_app.py"
+        journal = RunJournal(str(path))
+        journal.record_run(model="gpt-4o", max_iterations=3)
+        journal.record_context(test_file, tmp_path / "app.py", [tmp_path / "util.py"], [(tmp_path / "util.py", "f", 12, 0, 4)], 10, 2)
+        journal.record_iteration(test_file, generated=3, accepted=1, coverage=0.5, target_reached=False, input_tokens=20, output_tokens=10)
+        journal.record_result(_result(tmp_path / "other_test.py"))
+
+        resumed = RunJournal(str(path), resume=True)
+        progress = resumed.progress(str(test_file))
+        assert resumed.run_info["model"] == "gpt-4o"
+        assert progress.context["source_file"] == str(tmp_path / "app.py")
+        assert progress.context["all_included_files"] == [[str(tmp_path / "util.py"), "f", 12, 0, 4]]
+        assert progress.iterations[0]["accepted"] == 1
+        assert (progress.input_tokens, progress.output_tokens) == (30, 12)
+        assert not progress.completed
+        assert resumed.progress(tmp_path / "other_test.py").completed
+
+    def test_without_resume_starts_over(self, tmp_path):
+        """Test that a journal not resumed truncates the earlier one."""
+        path = tmp_path / "journal.jsonl"
+        RunJournal(str(path)).record_result(_result(tmp_path / "test_app.py"))
+
+        journal = RunJournal(str(path))
+        assert journal.files == {}
+        assert path.read_text() == ""
+
+    def test_cut_short_line_and_failed_result(self, tmp_path):
+        """Test that a line cut short by the interruption is ignored and a failed result is not completed."""
+        path = tmp_path / "journal.jsonl"
+        journal = RunJournal(str(path))
+        journal.record_result(_result(tmp_path / "test_app.py", success=False))
+        with open(path, "a") as f:
+            f.write('{"event": "result", "test_file": "')
+
+        resumed = RunJournal(str(path), resume=True)
+        assert len(resumed.files) == 1
+        assert not resumed.progress(tmp_path / "test_app.py").completed
+
+    def test_record_run_warns_on_changed_settings(self, tmp_path, mocker):
+        """Test that resuming with other settings than the interrupted run is warned about."""
+        path = tmp_path / "journal.jsonl"
+        RunJournal(str(path)).record_run(model="gpt-4o", max_iterations=3)
+
+        resumed = RunJournal(str(path), resume=True)
+        warning = mocker.patch.object(resumed.logger, "warning")
+        resumed.record_run(model="gpt-4o", max_iterations=5)
+        warning.assert_called_once()
+        assert "max_iterations" in warning.call_args[0][0]
+
+
+class TestRecoverInterruptedCandidate:
+    def test_recover_restores_committed_content(self, tmp_path):
+        """Test that recover() puts back the committed file of a transaction left with a candidate in place."""
+        test_file = tmp_path / "test_app.py"
+        test_file.write_text("committed\n")
+        transaction = TestFileTransaction(str(test_file))
+        transaction.write("candidate\n")
+        # The process dies here, with the candidate in the test file
+
+        assert TestFileTransaction.recover(str(test_file))
+        assert test_file.read_text() == "committed\n"
+        assert not os.path.exists(TestFileTransaction.snapshot_path(str(test_file)))
+        assert not TestFileTransaction.recover(str(test_file))
@@ -1,6 +1,11 @@
+import asyncio
+import gzip
+import os
+import signal
+
 import pytest
 
-from cover_agent.runner import Runner
+from cover_agent.runner import OutputCapture, Runner
 
 
 class TestRunner:
@@ -39,3 +44,142 @@ class TestRunner:
         assert stdout == ""
         assert stderr == "Command timed out"
         assert exit_code == -1
+
+    def test_run_command_returns_unpackable_result(self):
+        """Test that run_command returns a CommandResult that still unpacks as the old tuple."""
+        result = Runner.run_command('echo "Hello"', max_run_time_sec=10)
+        stdout, stderr, exit_code, command_start_time = result
+        assert (stdout.strip(), exit_code) == ("Hello", 0)
+        assert result.status == "passed"
+        assert command_start_time == result.command_start_time
+
+
+class TestAsyncRunner:
+    @pytest.mark.asyncio
+    async def test_async_run_command_success(self):
+        """Test that async_run_command returns the output and exit code of the command."""
+        result = await Runner.async_run_command('echo "Hello"; echo "oops" >&2; exit 3', max_run_time_sec=10)
+        stdout, stderr, exit_code, _ = result
+        assert stdout.strip() == "Hello"
+        assert stderr.strip() == "oops"
+        assert exit_code == 3
+        assert result.status == "failed"
+        assert not result.timed_out
+
+    @pytest.mark.asyncio
+    async def test_async_run_command_timeout_kills_process_group(self, tmp_path):
+        """
+        Test that a command exceeding max_run_time_sec is killed together with the processes it started,
+        keeping the output written before the timeout.
+        """
+        marker = tmp_path / "marker"
+        command = f'echo "started"; (sleep 2; touch {marker}) & sleep 5'
+        result = await Runner.async_run_command(command, max_run_time_sec=0.5)
+
+        assert result.timed_out
+        assert result.status == "timed_out"
+        assert result.exit_code == -1
+        assert result.stdout.strip() == "started"
+        assert result.stderr.endswith("Command timed out")
+        assert result.duration_sec < 2
+        await asyncio.sleep(2.5)
+        assert not marker.exists()
+
+    @pytest.mark.asyncio
+    async def test_async_run_command_reports_crash(self):
+        """Test that a command killed by a crash signal is reported as crashed rather than failed."""
+        result = await Runner.async_run_command("kill -SEGV $$", max_run_time_sec=10)
+
+        assert result.signal == signal.SIGSEGV
+        assert result.crashed
+        assert result.status == "crashed"
+
+    @pytest.mark.skipif(not hasattr(os, "killpg"), reason="Resource limits need a POSIX platform")
+    @pytest.mark.asyncio
+    async def test_async_run_command_applies_cpu_limit(self):
+        """Test that the CPU limit is applied to the command."""
+        result = await Runner.async_run_command("ulimit -t", max_run_time_sec=10, cpu_limit_sec=7)
+
+        assert result.stdout.strip() == "7"
+
+
+class TestOutputCapture:
+    def test_keeps_head_and_tail_within_cap(self):
+        """Test that output past the cap keeps its first and last bytes with an omission marker."""
+        capture = OutputCapture(max_bytes=8)
+        for chunk in [b"abc", b"defghij", b"klmnop"]:
+            capture.write(chunk)
+
+        assert capture.truncated
+        assert capture.total_bytes == 16
+        assert capture.getvalue() == "abcd\n... [8 bytes omitted] ...\nmnop"
+
+    def test_small_output_is_kept_whole(self):
+        """Test that output within the cap is returned unchanged."""
+        capture = OutputCapture(max_bytes=100)
+        capture.write(b"hello ")
+        capture.write(b"world")
+
+        assert not capture.truncated
+        assert capture.getvalue() == "hello world"
+
+    def test_spills_full_output(self, tmp_path):
+        """Test that the full output is written to a gzip spill file named in the omission marker."""
+        spill_path = str(tmp_path / "out.gz")
+        capture = OutputCapture(max_bytes=4, spill_path=spill_path)
+        capture.write(b"0123456789")
+        capture.close()
+
+        with gzip.open(spill_path, "rb") as spill_file:
+            assert spill_file.read() == b"0123456789"
+        assert capture.getvalue() == f"01\n... [6 bytes omitted, full output in {spill_path}] ...\n89"
+
+    def test_spill_without_truncation_is_removed(self, tmp_path):
+        """Test that a spill file holding nothing more than the kept output is removed on close."""
+        spill_path = tmp_path / "out.gz"
+        capture = OutputCapture(max_bytes=100, spill_path=str(spill_path))
+        capture.write(b"short")
+        capture.close()
+
+        assert not spill_path.exists()
+        assert capture.spill_path is None
+        assert capture.getvalue() == "short"
+
+    @pytest.mark.asyncio
+    async def test_async_run_command_bounds_output(self, tmp_path):
+        """Test that async_run_command keeps a bounded amount of a failing command's output and spills the rest."""
+        result = await Runner.async_run_command(
+            "seq 1 100000; exit 1", max_run_time_sec=10, max_output_bytes=1000, spill_dir=str(tmp_path)
+        )
+
+        assert result.output_truncated
+        assert result.stdout.startswith("1\n2\n")
+        assert result.stdout.endswith("99999\n100000\n")
+        assert len(result.stdout) < 1200
+        with gzip.open(result.stdout_spill_path, "rt") as spill_file:
+            assert spill_file.read().splitlines()[-1] == "100000"
+        assert os.listdir(tmp_path) == [os.path.basename(result.stdout_spill_path)]
+
+    @pytest.mark.asyncio
+    async def test_async_run_command_removes_spills_of_passing_command(self, tmp_path):
+        """Test that the spill files of a passing command are removed and not named in its output."""
+        result = await Runner.async_run_command(
+            "seq 1 100000", max_run_time_sec=10, max_output_bytes=1000, spill_dir=str(tmp_path)
+        )
+
+        assert result.output_truncated
+        assert result.stdout_spill_path is None
+        assert "full output in" not in result.stdout
+        assert os.listdir(tmp_path) == []
+
+    @pytest.mark.asyncio
+    async def test_async_run_command_does_not_wait_for_left_behind_process(self, monkeypatch):
+        """Test that a background process holding the pipes of a command that exited does not hang the run."""
+        monkeypatch.setattr("cover_agent.runner.DRAIN_TIMEOUT_SEC", 0.5)
+        result = await asyncio.wait_for(
+            Runner.async_run_command("sleep 30 & echo started", max_run_time_sec=10), timeout=5
+        )
+
+        assert result.exit_code == 0
+        assert not result.timed_out
+        assert result.stdout.strip() == "started"
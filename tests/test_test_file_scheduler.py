@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from cover_agent.line_coverage import LineCoverage
+from cover_agent.test_file_scheduler import ScheduledTestFile, TestFileScheduler
+
+
+def _result(item, generated=0, accepted=0, tokens=0):
+    return (item.test_file, tokens, 0, False, [generated], [accepted], True, None)
+
+
+class TestTestFileScheduler:
+    def test_estimate_from_baseline(self, tmp_path, mocker):
+        """Test that uncovered lines come from the baseline run, and from the file size when it lacks the file."""
+        source = tmp_path / "calc.py"
+        source.write_text("a = 1\nb = 2\nc = 3\n")
+        baseline = mocker.Mock()
+        baseline.slice_for.return_value = (LineCoverage([1]), LineCoverage([2, 3]), 0.33)
+
+        item = TestFileScheduler.estimate(1, "tests/test_calc.py", str(source), baseline)
+        assert item.source_lines == 3
+        assert item.uncovered_lines == 2
+
+        baseline.slice_for.return_value = None
+        assert TestFileScheduler.estimate(1, "tests/test_calc.py", str(source), baseline).uncovered_lines == 3
+        assert TestFileScheduler.estimate(2, "tests/test_other.py").uncovered_lines is None
+
+    @pytest.mark.asyncio
+    async def test_dispatches_by_yield_with_bounded_in_flight(self):
+        """Test that the largest gaps start first and no more than max_in_flight files run at once."""
+        items = [
+            ScheduledTestFile(1, "pkg/test_small.py", "pkg/small.py", 10, 2),
+            ScheduledTestFile(2, "pkg/test_large.py", "pkg/large.py", 3000, 2500),
+            ScheduledTestFile(3, "pkg/test_medium.py", "pkg/medium.py", 400, 300),
+            ScheduledTestFile(4, "pkg/test_unknown.py"),
+        ]
+        scheduler = TestFileScheduler(items, max_in_flight=2)
+        started, running, peak = [], [], []
+
+        async def process(item):
+            started.append(item.task_id)
+            running.append(item)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(item)
+            return _result(item)
+
+        results = await scheduler.run(process)
+
+        assert started == [2, 4, 3, 1]
+        assert max(peak) == 2
+        assert [result[0] for result in results] == [item.test_file for item in items]
+
+    @pytest.mark.asyncio
+    async def test_reprioritizes_by_acceptance_rate(self):
+        """Test that a package whose generated tests are rejected falls behind a package with smaller gaps."""
+        items = [
+            ScheduledTestFile(1, "hard/test_a.py", "hard/a.py", 500, 400),
+            ScheduledTestFile(2, "hard/test_b.py", "hard/b.py", 500, 300),
+            ScheduledTestFile(3, "easy/test_c.py", "easy/c.py", 300, 200),
+        ]
+        scheduler = TestFileScheduler(items, max_in_flight=1)
+        started = []
+
+        async def process(item):
+            started.append(item.task_id)
+            return _result(item, generated=20, accepted=0)
+
+        await scheduler.run(process)
+
+        assert started == [1, 3, 2]
+        assert scheduler.acceptance_rate(items[0].group) < scheduler.prior_acceptance_rate
+
+    @pytest.mark.asyncio
+    async def test_token_budget_stops_new_files(self):
+        """Test that no file starts once the finished ones used up the token budget."""
+        items = [ScheduledTestFile(task_id, f"test_{task_id}.py", None, 0, 10 - task_id) for task_id in range(1, 4)]
+        scheduler = TestFileScheduler(items, max_in_flight=1, token_budget=100)
+
+        async def process(item):
+            return _result(item, tokens=150)
+
+        results = await scheduler.run(process)
+
+        assert [result[6] for result in results] == [True, False, False]
+        assert results[1][7] == "Not started: token budget used up"
@@ -0,0 +1,82 @@
+import os
+
+from cover_agent.test_file_transaction import TestFileTransaction
+
+
+class TestTestFileTransaction:
+    def test_rollback_restores_committed_content_without_writing(self, tmp_path):
+        """Test that a rolled back candidate leaves the original file in place, restored by a rename."""
+        test_file = tmp_path / "test_calc.py"
+        test_file.write_text("original")
+        transaction = TestFileTransaction(str(test_file))
+
+        assert transaction.content == "original"
+        transaction.write("original\ncandidate")
+        assert test_file.read_text() == "original\ncandidate"
+        assert transaction.pending
+
+        transaction.rollback()
+        assert test_file.read_text() == "original"
+        assert not transaction.pending
+        assert transaction.writes == 1
+        assert os.listdir(tmp_path) == ["test_calc.py"]
+
+    def test_commit_keeps_candidate(self, tmp_path):
+        """Test that a committed candidate becomes the content later candidates are rolled back to."""
+        test_file = tmp_path / "test_calc.py"
+        test_file.write_text("original")
+        transaction = TestFileTransaction(str(test_file))
+
+        transaction.write("first")
+        transaction.commit()
+        transaction.write("second")
+        transaction.rollback()
+
+        assert transaction.content == "first"
+        assert test_file.read_text() == "first"
+        assert os.listdir(tmp_path) == ["test_calc.py"]
+
+    def test_content_is_read_once(self, tmp_path, mocker):
+        """Test that the committed content is only read again after the file changed on disk."""
+        test_file = tmp_path / "test_calc.py"
+        test_file.write_text("original")
+        transaction = TestFileTransaction(str(test_file))
+        read = mocker.patch("cover_agent.test_file_transaction.open", wraps=open, create=True)
+
+        assert transaction.content == "original"
+        transaction.write("candidate")
+        transaction.rollback()
+        assert transaction.content == "original"
+        assert read.call_count == 1
+
+        test_file.write_text("edited elsewhere")
+        assert transaction.content == "edited elsewhere"
+        assert read.call_count == 2
+
+    def test_unchanged_candidate_is_not_written(self, tmp_path):
+        """Test that writing the content the file already holds costs no write."""
+        test_file = tmp_path / "test_calc.py"
+        test_file.write_text("original")
+        transaction = TestFileTransaction(str(test_file))
+
+        transaction.write("original")
+        transaction.write("candidate")
+        transaction.write("candidate")
+
+        assert transaction.writes == 1
+
+    def test_rollback_without_hard_links(self, tmp_path, mocker):
+        """Test that rollback writes the committed content back where no snapshot link could be made."""
+        mocker.patch("cover_agent.test_file_transaction.os.link", side_effect=OSError("not supported"))
+        test_file = tmp_path / "test_calc.py"
+        test_file.write_text("original")
+        test_file.chmod(0o640)
+        transaction = TestFileTransaction(str(test_file))
+
+        transaction.write("candidate")
+        transaction.rollback()
+
+        assert test_file.read_text() == "original"
+        assert transaction.writes == 2
+        assert test_file.stat().st_mode & 0o777 == 0o640
+        assert os.listdir(tmp_path) == ["test_calc.py"]
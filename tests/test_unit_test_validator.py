@@ -1,13 +1,18 @@
+import asyncio
 import datetime
 import os
 import tempfile
 
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import AsyncMock, MagicMock, mock_open, patch
 
 import pytest
 
+from cover_agent.adaptive_concurrency import CHECKOUT_POOL, HEAVY_POOL, LIGHT_POOL, AdaptiveConcurrencyController
+from cover_agent.coverage_aggregate import CoverageAggregate
 from cover_agent.coverage_processor import CoverageProcessor
-from cover_agent.runner import Runner
+from cover_agent.diff_coverage import DiffCoverageEngine
+from cover_agent.line_coverage import LineCoverage
+from cover_agent.runner import CommandResult, Runner
 from cover_agent.settings.config_schema import CoverageType
 from cover_agent.unit_test_validator import UnitTestValidator
 
@@ -400,6 +405,8 @@ class TestUnitValidator:
                 included_files=[],
                 use_report_coverage_feature_flag=False,
             )
+            # Exercise the diff-cover JSON path
+            generator.diff_coverage_engine = None
             with (
                 patch.object(generator, "generate_diff_coverage_report"),
                 patch.object(CoverageProcessor, "process_coverage_report", return_value=([], [], 0.8)),
@@ -541,3 +548,579 @@ class TestUnitValidator:
             ):
                 generator.generate_diff_coverage_report()
                 mock_logger_error.assert_called_once_with("Error running diff-cover: Mock exception")
+
+    def test_post_process_coverage_report_formats_line_ranges(self):
+        """
+        Test that `post_process_coverage_report` renders covered and missed lines as compact ranges
+        and keeps the bitmaps for later comparisons.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_source_file:
+            generator = UnitTestValidator(
+                source_file_path=temp_source_file.name,
+                test_file_path="test_test.py",
+                code_coverage_report_path="coverage.xml",
+                test_command="pytest",
+                test_command_dir=os.getcwd(),
+                llm_model="gpt-3",
+                agent_completion=MagicMock(),
+                max_run_time_sec=30,
+                desired_coverage=90,
+                comparison_branch="main",
+                coverage_type=CoverageType.COBERTURA,
+                diff_coverage=False,
+                num_attempts=1,
+                additional_instructions="",
+                included_files=[],
+                use_report_coverage_feature_flag=False,
+            )
+            with patch.object(
+                CoverageProcessor, "process_coverage_report", return_value=([1, 2, 3, 7], [4, 5], 4 / 6)
+            ):
+                generator.post_process_coverage_report(datetime.datetime.now())
+
+            assert generator.code_coverage_report == (
+                "Lines covered: 1-3,7\nLines missed: 4-5\nPercentage covered: 66.67%"
+            )
+            assert generator.last_lines_covered == [1, 2, 3, 7]
+            assert generator.last_lines_missed == [4, 5]
+
+    def _make_delta_validator(self, source_file_path, test_file_path="test_test.py"):
+        generator = UnitTestValidator(
+            source_file_path=source_file_path,
+            test_file_path=test_file_path,
+            code_coverage_report_path="coverage.xml",
+            test_command="pytest",
+            test_command_dir=os.getcwd(),
+            llm_model="gpt-3",
+            agent_completion=MagicMock(),
+            max_run_time_sec=30,
+            desired_coverage=90,
+            comparison_branch="main",
+            coverage_type=CoverageType.COBERTURA,
+            diff_coverage=False,
+            num_attempts=1,
+            additional_instructions="",
+            included_files=[],
+            use_report_coverage_feature_flag=False,
+            semaphore=asyncio.Semaphore(1),
+        )
+        generator.current_coverage = 0.5
+        generator.test_headers_indentation = 4
+        generator.relevant_line_number_to_insert_tests_after = 100
+        generator.relevant_line_number_to_insert_imports_after = 10
+        generator.prompt = {"user": "test prompt"}
+        generator.verified_lines_covered = LineCoverage([1, 2])
+        return generator
+
+    @pytest.mark.asyncio
+    async def test_validate_test_accepts_new_lines_at_equal_percentage(self, tmp_path):
+        """
+        Test that a passing test is accepted when it covers a line that was not covered before,
+        even if the rounded percentage did not move, and that the newly covered lines are recorded.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_source_file:
+            test_file = tmp_path / "test_test.py"
+            test_file.write_text("original content")
+            generator = self._make_delta_validator(temp_source_file.name, str(test_file))
+            test_to_validate = {"test_name": "test_new_branch", "test_code": "def test_new_branch(): assert True"}
+
+            with (
+                patch.object(Runner, "async_run_command", AsyncMock(return_value=("", "", 0, 0))),
+                patch.object(CoverageProcessor, "aprocess_coverage_report", AsyncMock(return_value=([1, 2, 3], [4, 5, 6], 0.5))),
+            ):
+                result = await generator.validate_test(test_to_validate)
+
+            assert result["status"] == "PASS"
+            assert result["new_lines_covered"] == "3"
+            assert generator.verified_lines_covered == [1, 2, 3]
+            assert generator.test_coverage_deltas == [{"test_name": "test_new_branch", "new_lines_covered": "3"}]
+
+    @pytest.mark.asyncio
+    async def test_validate_test_rejects_when_no_new_lines_covered(self, tmp_path):
+        """
+        Test that a passing test is rejected when it covers no line beyond the verified state,
+        even if the reported percentage went up.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_source_file:
+            test_file = tmp_path / "test_test.py"
+            test_file.write_text("original content")
+            generator = self._make_delta_validator(temp_source_file.name, str(test_file))
+            test_to_validate = {"test_name": "test_same_lines", "test_code": "def test_same_lines(): assert True"}
+
+            with (
+                patch.object(Runner, "async_run_command", AsyncMock(return_value=("", "", 0, 0))),
+                patch.object(CoverageProcessor, "aprocess_coverage_report", AsyncMock(return_value=([1, 2], [3], 0.67))),
+            ):
+                result = await generator.validate_test(test_to_validate)
+
+            assert result["status"] == "FAIL"
+            assert "Coverage did not increase" in result["reason"]
+            assert generator.verified_lines_covered == [1, 2]
+            assert test_file.read_text() == "original content"
+
+    def test_coverage_report_lists_newly_covered_lines_after_acceptance(self):
+        """
+        Test that once tests have been accepted, the prompt report lists only the newly covered lines
+        and the remaining missed lines instead of the full covered list.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_source_file:
+            generator = self._make_delta_validator(temp_source_file.name)
+            generator.session_new_lines_covered = LineCoverage([3])
+            with patch.object(CoverageProcessor, "process_coverage_report", return_value=([1, 2, 3], [4, 5], 0.6)):
+                generator.post_process_coverage_report(datetime.datetime.now())
+
+            assert generator.code_coverage_report == (
+                "Lines newly covered by accepted tests: 3\nLines missed: 4-5\nPercentage covered: 60.0%"
+            )
+
+    def test_post_process_coverage_report_with_in_process_diff_coverage(self):
+        """
+        Test that with the in-process diff engine the parsed report is intersected with the changed lines,
+        diff-cover is not run, and git is only queried once across several evaluations.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_source_file:
+            generator = UnitTestValidator(
+                source_file_path=temp_source_file.name,
+                test_file_path="test_test.py",
+                code_coverage_report_path="coverage.xml",
+                test_command="pytest",
+                test_command_dir=os.getcwd(),
+                llm_model="gpt-3",
+                agent_completion=MagicMock(),
+                diff_coverage=True,
+                max_run_time_sec=30,
+                desired_coverage=90,
+                comparison_branch="main",
+                coverage_type="cobertura",
+                num_attempts=1,
+                additional_instructions="",
+                included_files=[],
+                use_report_coverage_feature_flag=False,
+            )
+            diff_reporter = MagicMock()
+            diff_reporter.src_paths_changed.return_value = [os.path.basename(temp_source_file.name), "other.py"]
+            diff_reporter.lines_changed.side_effect = lambda path: [2, 3, 4] if path != "other.py" else [1]
+            generator.diff_coverage_engine = DiffCoverageEngine("main", diff_reporter=diff_reporter)
+
+            with (
+                patch.object(generator, "generate_diff_coverage_report") as mock_generate,
+                patch.object(CoverageProcessor, "process_coverage_report", return_value=([1, 2, 3], [4, 5], 0.6)),
+            ):
+                first, _ = generator.post_process_coverage_report(datetime.datetime.now())
+                second, _ = generator.post_process_coverage_report(datetime.datetime.now())
+
+            assert first == second == 2 / 3
+            assert generator.last_lines_covered == [2, 3]
+            assert generator.last_lines_missed == [4]
+            mock_generate.assert_not_called()
+            diff_reporter.src_paths_changed.assert_called_once()
+
+    def test_post_process_coverage_report_with_coverage_aggregate(self):
+        """
+        Test that a CoverageAggregate returned for the whole report is used through its running totals.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_source_file:
+            generator = UnitTestValidator(
+                source_file_path=temp_source_file.name,
+                test_file_path="test_test.py",
+                code_coverage_report_path="coverage.xml",
+                test_command="pytest",
+                test_command_dir=os.getcwd(),
+                llm_model="gpt-3",
+                agent_completion=MagicMock(),
+                max_run_time_sec=30,
+                desired_coverage=90,
+                comparison_branch="main",
+                coverage_type=CoverageType.COBERTURA,
+                diff_coverage=False,
+                num_attempts=1,
+                additional_instructions="",
+                included_files=[],
+                use_report_coverage_feature_flag=True,
+            )
+            aggregate = CoverageAggregate()
+            aggregate.update(
+                {temp_source_file.name: b"1", "other.py": b"1"},
+                lambda filenames: {
+                    temp_source_file.name: (LineCoverage([1]), LineCoverage([2, 3]), 1 / 3),
+                    "other.py": (LineCoverage([1, 2, 3]), LineCoverage(), 1.0),
+                },
+            )
+            with patch.object(CoverageProcessor, "process_coverage_report", return_value=aggregate):
+                percentage_covered, coverage_percentages = generator.post_process_coverage_report(
+                    datetime.datetime.now()
+                )
+
+            assert percentage_covered == 4 / 6
+            assert coverage_percentages == {temp_source_file.name: 1 / 3, "other.py": 1.0}
+            assert generator.last_source_file_coverage == 1 / 3
+
+    @pytest.mark.asyncio
+    async def test_apost_process_coverage_report_uses_async_processor(self):
+        """
+        Test that the async post-processing awaits the coverage processor's async API instead of parsing inline.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_source_file:
+            generator = self._make_delta_validator(temp_source_file.name)
+            with (
+                patch.object(CoverageProcessor, "process_coverage_report") as mock_sync,
+                patch.object(
+                    CoverageProcessor, "aprocess_coverage_report", AsyncMock(return_value=([1, 2], [3, 4], 0.5))
+                ) as mock_async,
+            ):
+                percentage_covered, _ = await generator.apost_process_coverage_report(0)
+
+            assert percentage_covered == 0.5
+            mock_async.assert_awaited_once_with(time_of_test_command=0)
+            mock_sync.assert_not_called()
+            assert generator.code_coverage_report.startswith("Lines covered: 1-2\n")
+
+    def _make_workspace_validator(self, project_root):
+        source_file = project_root / "src.py"
+        source_file.write_text("def f():\n    return 1\n")
+        test_file = project_root / "test_src.py"
+        test_file.write_text("import src\n\ndef test_f():\n    assert src.f() == 1\n")
+        generator = UnitTestValidator(
+            source_file_path=str(source_file),
+            test_file_path=str(test_file),
+            code_coverage_report_path=str(project_root / "coverage.xml"),
+            test_command="pytest",
+            test_command_dir=str(project_root),
+            llm_model="gpt-3",
+            agent_completion=MagicMock(),
+            max_run_time_sec=30,
+            desired_coverage=90,
+            comparison_branch="main",
+            coverage_type=CoverageType.COBERTURA,
+            diff_coverage=False,
+            num_attempts=1,
+            additional_instructions="",
+            included_files=[],
+            use_report_coverage_feature_flag=False,
+            project_root=str(project_root),
+            semaphore=asyncio.Semaphore(1),
+            generate_log_files=False,
+        )
+        generator.current_coverage = 0.5
+        generator.relevant_line_number_to_insert_tests_after = 4
+        generator.relevant_line_number_to_insert_imports_after = 1
+        generator.verified_lines_covered = LineCoverage([1])
+        return generator
+
+    @pytest.mark.asyncio
+    async def test_validate_tests_in_workspaces_merges_accepted_tests(self, tmp_path):
+        """
+        Test that candidates run in their own workspaces without touching the test file, that a failing
+        candidate and a candidate covering no new line are rejected, and that the accepted candidate is
+        merged into the test file and verified with a single run in the project.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        generated_tests = [
+            {"test_name": "test_a", "test_code": "def test_a():\n    assert src.f()", "new_imports_code": "import os"},
+            {"test_name": "test_b", "test_code": "def test_b():\n    assert src.f()"},
+            {"test_name": "test_c", "test_code": "def test_c():\n    assert False"},
+        ]
+        run_dirs = []
+
+        async def fake_run(command, cwd, **kwargs):
+            run_dirs.append(cwd)
+            content = (tmp_path / "test_src.py").read_text() if cwd == str(tmp_path) else open(
+                os.path.join(cwd, "test_src.py")
+            ).read()
+            return "", "", 1 if "test_c" in content else 0, 0
+
+        async def fake_coverage(processor, time_of_test_command):
+            # test_a and test_b both cover line 2 of the source file
+            content = open(os.path.join(processor.test_command_dir, "test_src.py")).read()
+            covered = [1, 2] if "test_a" in content or "test_b" in content else [1]
+            return covered, [line for line in [1, 2] if line not in covered], len(covered) / 2
+
+        with (
+            patch.object(Runner, "async_run_command", side_effect=fake_run),
+            patch.object(CoverageProcessor, "aprocess_coverage_report", autospec=True, side_effect=fake_coverage),
+        ):
+            results = await generator.validate_tests_in_workspaces(generated_tests, parallel_workers=3)
+
+        try:
+            assert [result["status"] for result in results] == ["PASS", "FAIL", "FAIL"]
+            assert "Coverage did not increase" in results[1]["reason"]
+            assert results[2]["reason"] == "Test failed"
+            assert results[0]["new_lines_covered"] == "2"
+
+            test_content = (tmp_path / "test_src.py").read_text()
+            assert "import os" in test_content and "def test_a" in test_content
+            assert "test_b" not in test_content and "test_c" not in test_content
+            assert run_dirs.count(str(tmp_path)) == 1
+            assert len(generator.workspaces) == 3
+            assert generator.relevant_line_number_to_insert_tests_after == 5
+            assert generator.current_coverage == 1.0
+            assert generator.verified_lines_covered == [1, 2]
+        finally:
+            generator.cleanup_workspaces()
+        assert generator.workspaces == []
+
+    @pytest.mark.asyncio
+    async def test_validate_tests_in_workspaces_falls_back_when_merge_fails(self, tmp_path):
+        """
+        Test that when the merged tests fail in the project the test file is rolled back and the accepted
+        candidates are validated one by one with validate_test.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        generated_tests = [
+            {"test_name": "test_a", "test_code": "def test_a():\n    assert src.f()"},
+            {"test_name": "test_b", "test_code": "def test_b():\n    assert src.f()"},
+        ]
+        original_content = (tmp_path / "test_src.py").read_text()
+
+        async def fake_run(command, cwd, **kwargs):
+            return "", "", 1 if cwd == str(tmp_path) else 0, 0
+
+        async def fake_coverage(processor, time_of_test_command):
+            content = open(os.path.join(processor.test_command_dir, "test_src.py")).read()
+            return ([1, 2] if "test_a" in content else [1, 3]), [], 1.0
+
+        fallback_result = {"status": "FAIL", "reason": "Test failed"}
+        with (
+            patch.object(Runner, "async_run_command", side_effect=fake_run),
+            patch.object(CoverageProcessor, "aprocess_coverage_report", autospec=True, side_effect=fake_coverage),
+            patch.object(generator, "validate_test", AsyncMock(return_value=fallback_result)) as mock_validate,
+        ):
+            results = await generator.validate_tests_in_workspaces(generated_tests, parallel_workers=2)
+        generator.cleanup_workspaces()
+
+        assert results == [fallback_result, fallback_result]
+        assert mock_validate.await_count == 2
+        assert (tmp_path / "test_src.py").read_text() == original_content
+        assert generator.relevant_line_number_to_insert_tests_after == 4
+
+    @pytest.mark.asyncio
+    async def test_validate_tests_is_sequential_without_parallel_workers(self, tmp_path):
+        """
+        Test that validate_tests validates the tests one after another with validate_test when the
+        [validation] settings allow a single worker.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        generated_tests = [{"test_name": "test_a"}, {"test_name": "test_b"}]
+        settings = MagicMock()
+        settings.get.return_value = {"parallel_workers": 1}
+        with (
+            patch("cover_agent.unit_test_validator.get_settings", return_value=settings),
+            patch.object(generator, "validate_test", AsyncMock(return_value={"status": "PASS"})) as mock_validate,
+            patch.object(generator, "validate_tests_in_workspaces") as mock_parallel,
+        ):
+            results = await generator.validate_tests(generated_tests)
+
+        assert results == [{"status": "PASS"}, {"status": "PASS"}]
+        assert mock_validate.await_count == 2
+        mock_parallel.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_validate_tests_in_batch_drops_failed_tests_and_reruns(self, tmp_path):
+        """
+        Test that all tests are run together with a JUnit XML report, that a test reported as failed is
+        dropped and the survivors re-run once, and that the passing run's coverage accepts the survivors.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        generated_tests = [
+            {"test_name": "test_a", "test_code": "def test_a():\n    assert src.f()"},
+            {"test_name": "test_b", "test_code": "def test_b():\n    assert False"},
+        ]
+        commands = []
+
+        async def fake_run(command, cwd, **kwargs):
+            commands.append(command)
+            content = (tmp_path / "test_src.py").read_text()
+            failing = "test_b" in content
+            (tmp_path / "cover-agent-junit.xml").write_text(
+                "<testsuite>"
+                + "".join(
+                    f'<testcase name="{name}"/>'
+                    if name != "test_b"
+                    else '<testcase name="test_b"><failure message="assert False"/></testcase>'
+                    for name in ["test_f", "test_a", "test_b"]
+                    if f"def {name}" in content
+                )
+                + "</testsuite>"
+            )
+            return "", "", 1 if failing else 0, 0
+
+        with (
+            patch.object(Runner, "async_run_command", side_effect=fake_run),
+            patch.object(CoverageProcessor, "aprocess_coverage_report", AsyncMock(return_value=([1, 2], [], 1.0))),
+        ):
+            results = await generator.validate_tests_in_batch(generated_tests)
+
+        assert [result["status"] for result in results] == ["PASS", "FAIL"]
+        assert results[1]["reason"] == "Test failed"
+        assert results[1]["stderr"] == "assert False"
+        assert len(commands) == 2
+        assert commands[0] == f"pytest --junitxml={tmp_path / 'cover-agent-junit.xml'}"
+        test_content = (tmp_path / "test_src.py").read_text()
+        assert "def test_a" in test_content and "test_b" not in test_content
+        assert generator.current_coverage == 1.0
+        assert generator.test_coverage_deltas == [{"test_name": "test_a", "new_lines_covered": "2"}]
+
+    @pytest.mark.asyncio
+    async def test_validate_tests_in_batch_falls_back_when_failure_is_unattributed(self, tmp_path):
+        """
+        Test that when a failed batch run reports no failing generated test, the test file is rolled back
+        and the tests are validated one by one.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        generated_tests = [
+            {"test_name": "test_a", "test_code": "def test_a():\n    assert src.f()"},
+            {"test_name": "test_b", "test_code": "def test_b(:"},
+        ]
+        original_content = (tmp_path / "test_src.py").read_text()
+
+        async def fake_run(command, cwd, **kwargs):
+            (tmp_path / "cover-agent-junit.xml").write_text(
+                '<testsuite><testcase name="test_src"><error message="SyntaxError"/></testcase></testsuite>'
+            )
+            return "", "", 2, 0
+
+        fallback_result = {"status": "FAIL", "reason": "Test failed"}
+        with (
+            patch.object(Runner, "async_run_command", side_effect=fake_run),
+            patch.object(generator, "validate_test", AsyncMock(return_value=fallback_result)) as mock_validate,
+        ):
+            results = await generator.validate_tests_in_batch(generated_tests)
+
+        assert results == [fallback_result, fallback_result]
+        assert mock_validate.await_count == 2
+        assert (tmp_path / "test_src.py").read_text() == original_content
+
+    def test_supports_batch_validation_requires_distinct_names(self, tmp_path):
+        """
+        Test that batching needs a distinct test name for every generated test and a JUnit report.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        assert generator._supports_batch_validation([{"test_name": "test_a"}, {"test_name": "Suite.test_b()"}])
+        assert not generator._supports_batch_validation([{"test_name": "test_a"}, {"test_name": "test_a"}])
+        assert not generator._supports_batch_validation([{"test_name": "test_a"}, {}])
+        generator.test_command = "mvn test"
+        assert not generator._supports_batch_validation([{"test_name": "test_a"}, {"test_name": "test_b"}])
+
+    @pytest.mark.asyncio
+    async def test_validate_tests_in_batch_accepts_by_per_test_coverage(self, tmp_path):
+        """
+        Test that with per-test coverage from the batch run, a test that adds no line beyond the earlier
+        tests is rejected and removed from the test file without running the tests again.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        generated_tests = [
+            {"test_name": "test_a", "test_code": "def test_a():\n    assert src.f()"},
+            {"test_name": "test_b", "test_code": "def test_b():\n    assert src.f()"},
+            {"test_name": "test_c", "test_code": "def test_c():\n    assert src.f()"},
+        ]
+        contexts = {"test_a": LineCoverage([2]), "test_b": LineCoverage([1, 2]), "test_c": LineCoverage([3])}
+
+        with (
+            patch.object(Runner, "async_run_command", AsyncMock(return_value=("", "", 0, 0))) as mock_run,
+            patch.object(CoverageProcessor, "aprocess_coverage_report", AsyncMock(return_value=([1, 2, 3], [], 1.0))),
+            patch.object(CoverageProcessor, "parse_test_contexts", return_value=contexts),
+        ):
+            results = await generator.validate_tests_in_batch(generated_tests)
+
+        assert [result["status"] for result in results] == ["PASS", "FAIL", "PASS"]
+        assert "Coverage did not increase" in results[1]["reason"]
+        assert mock_run.await_count == 1
+        test_content = (tmp_path / "test_src.py").read_text()
+        assert "def test_a" in test_content and "def test_c" in test_content and "test_b" not in test_content
+        assert generator.test_coverage_deltas == [
+            {"test_name": "test_a", "new_lines_covered": "2"},
+            {"test_name": "test_c", "new_lines_covered": "3"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_validate_test_reports_timed_out_run(self, tmp_path):
+        """
+        Test that a generated test whose run hit the time limit is rejected as timed out rather than failed.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_source_file:
+            test_file = tmp_path / "test_test.py"
+            test_file.write_text("original content")
+            generator = self._make_delta_validator(temp_source_file.name, str(test_file))
+            timed_out = CommandResult("", "Command timed out", -1, 0, timed_out=True)
+
+            with (
+                patch.object(Runner, "async_run_command", AsyncMock(return_value=timed_out)) as mock_run,
+                patch.object(generator, "extract_error_message", AsyncMock(return_value="")),
+            ):
+                result = await generator.validate_test({"test_name": "test_loop", "test_code": "def test_loop(): pass"})
+
+            assert result["status"] == "FAIL"
+            assert result["reason"] == "Test timed out"
+            assert test_file.read_text() == "original content"
+            assert mock_run.await_args.kwargs["max_run_time_sec"] == 30
+
+    @pytest.mark.asyncio
+    async def test_run_coverage_uses_seeded_baseline_once(self, tmp_path):
+        """
+        Test that a baseline handed over from the shared suite run replaces the first run_coverage's test run,
+        and that later calls run the test command again.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        assert generator.seed_baseline_coverage((LineCoverage([1]), LineCoverage([2]), 0.5))
+
+        with patch.object(generator, "run_test_command", AsyncMock()) as mock_run:
+            await generator.run_coverage()
+            mock_run.assert_not_called()
+        assert generator.current_coverage == 0.5
+        assert generator.verified_lines_covered == LineCoverage([1])
+        assert "2" in generator.code_coverage_report
+        assert generator.seeded_baseline is None
+
+        generator.use_report_coverage_feature_flag = True
+        assert not generator.seed_baseline_coverage((LineCoverage([1]), LineCoverage([2]), 0.5))
+
+    def test_execution_slot_picks_pool_of_command(self, tmp_path):
+        """
+        Test that a validator given an adaptive concurrency controller holds the pool for its kind of test
+        command, and a plain semaphore otherwise.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        semaphore = asyncio.Semaphore(1)
+        generator.semaphore = semaphore
+        assert generator._execution_slot() is semaphore
+
+        controller = AdaptiveConcurrencyController.from_settings({})
+        generator.semaphore = controller
+        assert generator._execution_slot() is controller.pools[LIGHT_POOL]
+        assert generator._execution_slot("./mvnw test") is controller.pools[HEAVY_POOL]
+
+        controller = AdaptiveConcurrencyController.from_settings({}, isolated_builds=True)
+        generator.semaphore = controller
+        assert generator._execution_slot("./mvnw test") is controller.pools[CHECKOUT_POOL]
+        assert generator._execution_slot("./mvnw test", isolated=True) is controller.pools[HEAVY_POOL]
+
+    @pytest.mark.asyncio
+    async def test_get_coverage_reuses_verified_run_after_rejections(self, tmp_path):
+        """
+        Test that get_coverage takes the coverage of the last verified run while rejected tests left the test
+        file as that run measured it, and runs the test command again once the test file changed.
+        """
+        generator = self._make_workspace_validator(tmp_path)
+        generator.reuse_verified_coverage = True
+        generator.agent_completion.analyze_test_failure.return_value = ("", 0, 0, "")
+        with (
+            patch.object(Runner, "async_run_command", AsyncMock(return_value=("", "", 0, 0))) as mock_run,
+            patch.object(CoverageProcessor, "aprocess_coverage_report", AsyncMock(return_value=([1], [2, 3], 0.33))),
+        ):
+            await generator.get_coverage()
+            assert mock_run.await_count == 1
+
+            result = await generator.validate_test(
+                {"test_name": "test_same", "test_code": "def test_same():\n    assert src.f()"}
+            )
+            assert result["status"] == "FAIL"
+            assert mock_run.await_count == 2
+
+            _, _, _, report = await generator.get_coverage()
+            assert mock_run.await_count == 2
+            assert generator.current_coverage == 0.33
+            assert "Lines missed: 2-3" in report
+
+            (tmp_path / "test_src.py").write_text("import src\n")
+            await generator.get_coverage()
+            assert mock_run.await_count == 3
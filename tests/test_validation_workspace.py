@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from cover_agent.validation_workspace import ValidationWorkspace
+
+
+class TestValidationWorkspace:
+    """Test suite for the ValidationWorkspace class."""
+
+    def test_copies_project_and_maps_paths(self, tmp_path):
+        """
+        Test that the workspace is a copy of the project without the ignored entries, and that paths and
+        commands referring to the project root are mapped into it.
+        """
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "pkg" / "test_a.py").write_text("original")
+        (tmp_path / ".git").mkdir()
+        workspace = ValidationWorkspace(str(tmp_path), ignore_patterns=[".git"], generate_log_files=False)
+        try:
+            mapped = workspace.path(str(tmp_path / "pkg" / "test_a.py"))
+            assert mapped.startswith(workspace.root)
+            with open(mapped, "w") as test_file:
+                test_file.write("candidate")
+            assert (tmp_path / "pkg" / "test_a.py").read_text() == "original"
+            assert not os.path.exists(os.path.join(workspace.root, ".git"))
+            assert workspace.command(f"pytest {tmp_path}/pkg") == f"pytest {workspace.root}/pkg"
+        finally:
+            workspace.cleanup()
+        assert not os.path.exists(workspace.root)
+
+    def test_path_outside_project_root_raises(self, tmp_path):
+        """
+        Test that mapping a path outside the project root raises a ValueError.
+        """
+        (tmp_path / "project").mkdir()
+        workspace = ValidationWorkspace(str(tmp_path / "project"), generate_log_files=False)
+        try:
+            assert not workspace.contains(str(tmp_path / "other.py"))
+            with pytest.raises(ValueError):
+                workspace.path(str(tmp_path / "other.py"))
+        finally:
+            workspace.cleanup()
+
+    def test_links_environments_and_refreshes_changed_files(self, tmp_path):
+        """
+        Test that environment directories are linked instead of copied, and that refresh() copies files changed
+        or added in the project, removes deleted ones and leaves files written only in the workspace alone.
+        """
+        project = tmp_path / "project"
+        (project / ".venv").mkdir(parents=True)
+        (project / "target").mkdir()
+        (project / "target" / "Calc.class").write_text("stale")
+        (project / "test_a.py").write_text("a1")
+        (project / "test_b.py").write_text("b1")
+        workspace = ValidationWorkspace(
+            str(project), ignore_patterns=["target"], link_patterns=[".venv"], generate_log_files=False
+        )
+        try:
+            assert os.path.islink(workspace.path(str(project / ".venv")))
+            assert not os.path.exists(workspace.path(str(project / "target")))
+            assert workspace.refresh() == 0
+
+            (project / "test_a.py").write_text("a2, accepted elsewhere")
+            (project / "test_c.py").write_text("c1")
+            (project / "test_b.py").unlink()
+            with open(os.path.join(workspace.root, "coverage.xml"), "w") as report:
+                report.write("<coverage/>")
+
+            assert workspace.refresh() == 3
+            with open(workspace.path(str(project / "test_a.py"))) as test_file:
+                assert test_file.read() == "a2, accepted elsewhere"
+            assert os.path.exists(workspace.path(str(project / "test_c.py")))
+            assert not os.path.exists(workspace.path(str(project / "test_b.py")))
+            assert os.path.exists(os.path.join(workspace.root, "coverage.xml"))
+        finally:
+            workspace.cleanup()
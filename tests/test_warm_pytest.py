@@ -0,0 +1,147 @@
+import asyncio
+import sys
+
+import pytest
+import pytest_asyncio
+
+from cover_agent.runner import Runner
+from cover_agent.warm_pytest import WarmPytestPool, WarmPytestWorker
+
+pytestmark = pytest.mark.skipif(not WarmPytestWorker.supported(), reason="The warm pytest worker needs fork")
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A tiny project with one passing, one failing and one hanging test."""
+    (tmp_path / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+    (tmp_path / "test_calc.py").write_text(
+        "import time\n"
+        "from calc import add\n\n"
+        "def test_add():\n"
+        "    print('adding')\n"
+        "    assert add(1, 2) == 3\n\n"
+        "def test_wrong():\n"
+        "    assert add(1, 2) == 4\n\n"
+        "def test_hang():\n"
+        "    time.sleep(60)\n"
+    )
+    return tmp_path
+
+
+@pytest_asyncio.fixture
+async def worker(project):
+    worker = WarmPytestWorker(str(project), python=sys.executable, generate_log_files=False)
+    yield worker
+    await worker.stop()
+
+
+class TestWarmPytestWorker:
+    def test_pytest_args(self):
+        """
+        Test that plain pytest invocations are recognised, with "python -m pytest" asking for the working
+        directory on sys.path, and that anything needing a shell or another runner is not.
+        """
+        assert WarmPytestWorker.pytest_args("pytest tests -k 'add or sub'") == (["tests", "-k", "add or sub"], False)
+        assert WarmPytestWorker.pytest_args("/venv/bin/python3 -m pytest -q") == (["-q"], True)
+        assert WarmPytestWorker.pytest_args("pytest tests && echo done") is None
+        assert WarmPytestWorker.pytest_args("FOO=1 pytest") is None
+        assert WarmPytestWorker.pytest_args("python -m unittest") is None
+        assert WarmPytestWorker.pytest_args("mvn test") is None
+        assert WarmPytestWorker.pytest_args("pytest 'unclosed") is None
+
+    @pytest.mark.asyncio
+    async def test_runs_tests_in_warm_worker(self, project, worker):
+        """
+        Test that passing and failing runs report pytest's exit code and output, and that the second run reuses
+        the already started worker.
+        """
+        stdout, stderr, exit_code, _ = await worker.run(
+            "python -m pytest test_calc.py -k test_add -s", str(project), max_run_time_sec=30
+        )
+        assert exit_code == 0
+        assert "adding" in stdout
+        assert "1 passed" in stdout
+        process = worker.process
+
+        result = await worker.run("python -m pytest test_calc.py -k test_wrong", str(project), max_run_time_sec=30)
+        assert result.exit_code == 1
+        assert "assert 3 == 4" in result.stdout
+        assert worker.process is process
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_child_and_keeps_worker(self, project, worker):
+        """Test that a hanging test is killed after the time limit while the worker stays usable."""
+        result = await worker.run("python -m pytest test_calc.py -k test_hang", str(project), max_run_time_sec=2)
+        assert result.timed_out
+        assert result.status == "timed_out"
+
+        result = await worker.run("python -m pytest test_calc.py -k test_add", str(project), max_run_time_sec=30)
+        assert result.exit_code == 0
+
+    @pytest.mark.asyncio
+    async def test_changed_module_restarts_worker(self, project, worker):
+        """Test that a change to a module loaded by the worker sends that run the cold path and stops the worker."""
+        assert (await worker.run("python -m pytest test_calc.py -k test_add", str(project), max_run_time_sec=30))
+        loaded_module = next(iter(worker._module_mtimes))
+        worker._module_mtimes[loaded_module] -= 10
+
+        assert await worker.run("python -m pytest test_calc.py -k test_add", str(project), max_run_time_sec=30) is None
+        assert worker.process is None
+
+    @pytest.mark.asyncio
+    async def test_preloaded_project_module_disables_worker(self, project, monkeypatch):
+        """Test that a worker whose preloads import project modules is not used, as their coverage would be lost."""
+        monkeypatch.setenv("PYTHONPATH", str(project))
+        worker = WarmPytestWorker(str(project), python=sys.executable, preload=("calc",), generate_log_files=False)
+
+        assert await worker.run("pytest test_calc.py", str(project)) is None
+        assert worker.disabled
+        assert worker.process is None
+
+    @pytest.mark.asyncio
+    async def test_runner_falls_back_to_cold_run(self, project, worker):
+        """Test that Runner runs commands the worker does not take as usual."""
+        stdout, _, exit_code, _ = await Runner.async_run_command(
+            "echo cold", max_run_time_sec=10, cwd=str(project), warm_worker=worker
+        )
+        assert stdout.strip() == "cold"
+        assert exit_code == 0
+        assert worker.process is None
+
+
+class TestWarmPytestPool:
+    @pytest.mark.asyncio
+    async def test_concurrent_runs_use_separate_workers(self, project):
+        """Test that concurrent runs each get a worker and that a run finding every worker busy goes cold."""
+        pool = WarmPytestPool(str(project), python=sys.executable, size=2, generate_log_files=False)
+        command = "python -m pytest test_calc.py -k test_add"
+        try:
+            results = await asyncio.gather(*(pool.run(command, str(project), max_run_time_sec=30) for _ in range(3)))
+
+            assert [result.exit_code for result in results if result is not None] == [0, 0]
+            assert results.count(None) == 1
+            assert len(pool.workers) == 2
+            assert len({worker.process.pid for worker in pool.workers}) == 2
+        finally:
+            await pool.stop()
+
+    @pytest.mark.asyncio
+    async def test_idle_worker_is_reused(self, project):
+        """Test that sequential runs reuse the idle worker instead of starting another."""
+        pool = WarmPytestPool(str(project), python=sys.executable, size=2, generate_log_files=False)
+        command = "python -m pytest test_calc.py -k test_add"
+        try:
+            assert (await pool.run(command, str(project), max_run_time_sec=30)).exit_code == 0
+            assert (await pool.run(command, str(project), max_run_time_sec=30)).exit_code == 0
+            assert len(pool.workers) == 1
+        finally:
+            await pool.stop()
+
+    def test_for_project_shares_pool(self, project):
+        """Test that validators of one project share a pool sized by the first of them."""
+        try:
+            pool = WarmPytestWorker.for_project(str(project), sys.executable, [], size=3, generate_log_files=False)
+            assert WarmPytestWorker.for_project(str(project), sys.executable, [], size=1) is pool
+            assert pool.size == 3
+        finally:
+            WarmPytestWorker._shared = {}
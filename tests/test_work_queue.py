@@ -0,0 +1,115 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from cover_agent.work_queue import DONE, PENDING, RUNNING, WorkQueue, WorkUnit
+
+
+def _context(source_file="app.py"):
+    return {
+        "source_file": source_file,
+        "included_files": ["util.py"],
+        "all_included_files": [("util.py", "helper", 12, 0, 4)],
+        "input_tokens": 10,
+        "output_tokens": 2,
+    }
+
+
+class TestWorkQueue:
+    def test_claims_by_priority_once(self, tmp_path):
+        """Test that units are claimed highest priority first and that no unit is claimed twice."""
+        queue = WorkQueue(str(tmp_path / "queue.db"))
+        queue.put(1, "test_low.py", _context(), priority=1.0)
+        queue.put(2, "test_high.py", _context(), priority=5.0)
+
+        first = queue.claim("worker-a")
+        second = WorkQueue(str(tmp_path / "queue.db")).claim("worker-b")
+
+        assert (first.test_file, first.worker, first.status) == ("test_high.py", "worker-a", RUNNING)
+        assert second.test_file == "test_low.py"
+        assert queue.claim("worker-a") is None
+        assert first.context["all_included_files"] == [("util.py", "helper", 12, 0, 4)]
+
+    def test_drained_after_close_and_completion(self, tmp_path):
+        """Test that workers are told to stop only once the queue is closed and every unit is done."""
+        queue = WorkQueue(str(tmp_path / "queue.db"))
+        unit_id = queue.put(1, "test_app.py", _context())
+        assert not queue.drained()
+
+        queue.close()
+        unit = queue.claim("worker-a")
+        assert not queue.drained()
+
+        assert queue.complete(unit_id, ("test_app.py", 1, 1, True, [2], [1], True, None), "content", claim=unit.claim)
+        assert queue.drained()
+        assert queue.counts() == {PENDING: 0, RUNNING: 0, DONE: 1}
+        assert [unit.test_file for unit in queue.take_unreported()] == ["test_app.py"]
+        assert queue.take_unreported() == []
+
+        queue.reopen()
+        assert not queue.drained()
+
+    def test_stale_units_are_requeued_then_failed(self, tmp_path):
+        """
+        Test that units of a worker without heartbeats go back to pending, that the lost worker's result is dropped,
+        and that a unit tried max_attempts times fails.
+        """
+        queue = WorkQueue(str(tmp_path / "queue.db"))
+        unit_id = queue.put(1, "test_app.py", _context())
+
+        def expire():
+            with queue.Session() as session:
+                session.execute(update(WorkUnit).values(heartbeat_at=datetime.now() - timedelta(seconds=60)))
+                session.commit()
+
+        lost = queue.claim("worker-a")
+        expire()
+        assert len(queue.requeue_stale(lease_sec=30, max_attempts=2)) == 1
+        assert not queue.complete(unit_id, ("test_app.py", 0, 0, False, [], [], True, None), claim=lost.claim)
+
+        queue.claim("worker-b")
+        queue.heartbeat("worker-b")
+        assert queue.requeue_stale(lease_sec=30, max_attempts=2) == []
+        expire()
+        queue.requeue_stale(lease_sec=30, max_attempts=2)
+
+        (failed,) = queue.results()
+        assert failed.result_tuple[6] is False
+        assert "stopped responding" in failed.result_tuple[7]
+
+    @pytest.mark.asyncio
+    async def test_heartbeats_keep_long_unit_claimed(self, tmp_path):
+        """Test that heartbeats sent from their own task keep a unit claimed while the worker is busy with it."""
+        queue = WorkQueue(str(tmp_path / "queue.db"))
+        queue.put(1, "test_app.py", _context())
+        queue.claim("worker-a")
+        with queue.Session() as session:
+            session.execute(update(WorkUnit).values(heartbeat_at=datetime.now() - timedelta(seconds=60)))
+            session.commit()
+
+        heartbeats = asyncio.create_task(queue.send_heartbeats("worker-a", interval_sec=0.05))
+        await asyncio.sleep(0.3)
+        heartbeats.cancel()
+
+        assert queue.requeue_stale(lease_sec=30) == []
+        assert queue.counts()[RUNNING] == 1
+
+    def test_reset_and_resume(self, tmp_path):
+        """Test that a resumed queue keeps the units of the earlier run and a reset one drops them."""
+        path = str(tmp_path / "queue.db")
+        WorkQueue(path).put(1, "test_app.py", _context())
+
+        assert WorkQueue(path).test_files() == {"test_app.py"}
+        assert WorkQueue(path, reset=True).test_files() == set()
+
+    def test_paths_resolve_in_each_checkout(self, tmp_path):
+        """Test that paths inside the project are queued relative to its root and outside ones stay absolute."""
+        root = str(tmp_path / "coordinator")
+        assert WorkQueue.relative(os.path.join(root, "tests", "test_app.py"), root) == os.path.join("tests", "test_app.py")
+        assert WorkQueue.relative("/usr/lib/python3/os.py", root) == "/usr/lib/python3/os.py"
+        assert WorkQueue.absolute(os.path.join("tests", "test_app.py"), "/worker") == "/worker/tests/test_app.py"
+        assert WorkQueue.absolute("/usr/lib/python3/os.py", "/worker") == "/usr/lib/python3/os.py"
+